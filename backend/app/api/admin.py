@@ -7,6 +7,7 @@ from app.core.security import get_current_user, get_current_admin_user
 from app.core.database import get_db
 from app.schemas.admin import AdminAnalytics, EmergencyStats, UserStats
 from app.models.emergency import Emergency
+from app.core.rollups import active_users, rollup_counts, summarize_counts
 from app.models.user import User
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select, func, and_
@@ -22,48 +23,31 @@ async def get_admin_analytics(
     try:
         since_date = datetime.utcnow() - timedelta(days=days)
         
-        # Total emergencies
-        total_stmt = select(func.count()).where(
-            Emergency.created_at >= since_date
-        )
-        total_result = await db.execute(total_stmt)
-        total = total_result.scalar()
-        
-        # Confirmed emergencies
-        confirmed_stmt = select(func.count()).where(
-            Emergency.is_confirmed == True,
-            Emergency.created_at >= since_date
-        )
-        confirmed_result = await db.execute(confirmed_stmt)
-        confirmed = confirmed_result.scalar()
-        
-        # By type
-        type_stmt = select(
-            Emergency.detection_type,
-            func.count(Emergency.detection_type)
-        ).where(
-            Emergency.created_at >= since_date
-        ).group_by(Emergency.detection_type)
-        
-        type_result = await db.execute(type_stmt)
-        by_type = {row[0]: row[1] for row in type_result.all()}
-        
-        # User stats
-        user_stmt = select(
-            func.count(User.id),
-            func.count(distinct(Emergency.user_id))
-        ).where(
+        # Emergency counts come from the daily rollup; user counts ride along
+        # as scalar subqueries so the dashboard costs a single round trip
+        active_count_query = active_users(since_date).scalar_subquery()
+        new_users = select(func.count(User.id)).where(
             User.created_at >= since_date
-        )
-        user_result = await db.execute(user_stmt)
-        user_count, active_users = user_result.first()
+        ).scalar_subquery()
+        
+        stmt = rollup_counts(since_date).add_columns(active_count_query, new_users)
+        rows = (await db.execute(stmt)).all()
+        if rows:
+            counts = summarize_counts(row[:3] for row in rows)
+            active_count, user_count = rows[0][3], rows[0][4]
+        else:
+            # No emergencies in the period, so there are no rows to carry the
+            # user count
+            counts = summarize_counts([])
+            active_count = 0
+            user_count = (await db.execute(select(new_users))).scalar()
         
         return {
-            "total_emergencies": total or 0,
-            "confirmed_emergencies": confirmed or 0,
-            "emergencies_by_type": by_type,
+            "total_emergencies": counts["total"],
+            "confirmed_emergencies": counts["confirmed"],
+            "emergencies_by_type": counts["by_type"],
             "total_users": user_count or 0,
-            "active_users": active_users or 0,
+            "active_users": active_count or 0,
             "time_period_days": days
         }
         
@@ -72,15 +56,3 @@ async def get_admin_analytics(
             status_code=500, 
             detail=f"Error getting admin analytics: {str(e)}"
         )
-
-async def get_current_admin_user(
-    current_user=Depends(get_current_user),
-    db: AsyncSession = Depends(get_db)
-):
-    # In a real app, check if user has admin privileges
-    if not current_user.is_admin:
-        raise HTTPException(
-            status_code=403,
-            detail="Admin privileges required"
-        )
-    return current_user
\ No newline at end of file
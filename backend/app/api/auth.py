@@ -1,14 +1,14 @@
 from fastapi import APIRouter, Depends, HTTPException, status
-from fastapi.security import OAuth2PasswordBearer, OAuth2PasswordRequestForm
+from fastapi.security import OAuth2PasswordRequestForm
 from sqlalchemy.ext.asyncio import AsyncSession
 from datetime import timedelta
 
 from app.core.database import get_db
 from app.core.security import (
-    get_password_hash, 
-    verify_password, 
+    hash_password_async,
+    verify_and_update_password,
     create_access_token,
-    decode_access_token
+    PasswordHasherBusyError
 )
 from app.schemas.auth import UserCreate, UserInDB, Token, User
 from app.config import settings
@@ -16,7 +16,12 @@ from app.models.user import User as UserModel
 
 router = APIRouter()
 
-oauth2_scheme = OAuth2PasswordBearer(tokenUrl=f"{settings.API_V1_STR}/auth/token")
+def _hasher_busy():
+    return HTTPException(
+        status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+        detail="Authentication is busy, please retry shortly",
+        headers={"Retry-After": "1"},
+    )
 
 @router.post("/auth/register", response_model=User)
 async def register(user: UserCreate, db: AsyncSession = Depends(get_db)):
@@ -29,7 +34,10 @@ async def register(user: UserCreate, db: AsyncSession = Depends(get_db)):
         )
     
     # Create new user
-    hashed_password = get_password_hash(user.password)
+    try:
+        hashed_password = await hash_password_async(user.password)
+    except PasswordHasherBusyError:
+        raise _hasher_busy()
     db_user = UserModel(
         email=user.email,
         hashed_password=hashed_password,
@@ -37,6 +45,7 @@ async def register(user: UserCreate, db: AsyncSession = Depends(get_db)):
         phone_number=user.phone_number
     )
     await db_user.save(db)
+    await db.commit()
     return db_user
 
 @router.post("/auth/token", response_model=Token)
@@ -45,39 +54,28 @@ async def login_for_access_token(
     db: AsyncSession = Depends(get_db)
 ):
     user = await UserModel.get_by_email(db, form_data.username)
-    if not user or not verify_password(form_data.password, user.hashed_password):
+    valid, new_hash = False, None
+    if user:
+        try:
+            valid, new_hash = await verify_and_update_password(form_data.password, user.hashed_password)
+        except PasswordHasherBusyError:
+            raise _hasher_busy()
+    if not valid:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Incorrect email or password",
             headers={"WWW-Authenticate": "Bearer"},
         )
     
+    # Stored hash predates the current BCRYPT_ROUNDS: upgrade it while we
+    # have the plaintext
+    if new_hash:
+        user.hashed_password = new_hash
+        await db.commit()
+    
     access_token_expires = timedelta(minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES)
     access_token = create_access_token(
         data={"sub": user.email},
         expires_delta=access_token_expires
     )
     return {"access_token": access_token, "token_type": "bearer"}
-
-async def get_current_user(
-    token: str = Depends(oauth2_scheme),
-    db: AsyncSession = Depends(get_db)
-):
-    credentials_exception = HTTPException(
-        status_code=status.HTTP_401_UNAUTHORIZED,
-        detail="Could not validate credentials",
-        headers={"WWW-Authenticate": "Bearer"},
-    )
-    payload = decode_access_token(token)
-    if not payload:
-        raise credentials_exception
-    
-    email: str = payload.get("sub")
-    if email is None:
-        raise credentials_exception
-    
-    user = await UserModel.get_by_email(db, email)
-    if user is None:
-        raise credentials_exception
-    
-    return user
\ No newline at end of file
@@ -1,56 +1,192 @@
-from fastapi import APIRouter, UploadFile, File, Depends, HTTPException
+from fastapi import APIRouter, UploadFile, File, Depends, HTTPException, Query, WebSocket, WebSocketDisconnect, status
 from fastapi.responses import JSONResponse
 from typing import Optional
-import tempfile
-import os
+from datetime import datetime
+import asyncio
 
+from app.config import settings
 from app.core.ai_models import ai_models
-from app.core.security import get_current_user
-from app.schemas.distress import DistressDetectionResult
+from app.core.audio import (
+    decode_upload,
+    resample,
+    pcm16_to_float32,
+    SlidingWindow,
+    AudioDecodeError,
+    AudioTooLargeError
+)
+from app.core.security import get_current_user, get_user_from_token
+from app.schemas.distress import DistressDetectionResult, DistressStreamEvent
 from app.models.emergency import Emergency
-from app.core.database import get_db
+from app.core.database import get_db, async_session
 from sqlalchemy.ext.asyncio import AsyncSession
 
 router = APIRouter()
 
+DISTRESS_THRESHOLD = 0.7
+
+def summarize_distress(result):
+    # Determine if distress was detected
+    return {
+        "is_distress": any(p['label'] == 'distress' and p['score'] > DISTRESS_THRESHOLD for p in result),
+        "confidence": max(p['score'] for p in result),
+        "details": result
+    }
+
 @router.post("/distress/predict", response_model=DistressDetectionResult)
 async def predict_distress(
     audio_file: UploadFile = File(...),
     current_user=Depends(get_current_user),
     db: AsyncSession = Depends(get_db)
 ):
+    # Decode the upload straight into a float32 buffer at the model's
+    # sampling rate; the clip never touches the disk
     try:
-        # Save the uploaded file temporarily
-        with tempfile.NamedTemporaryFile(delete=False, suffix=".wav") as temp_audio:
-            temp_audio.write(await audio_file.read())
-            temp_path = temp_audio.name
-        
-        # Process the audio file
-        result = await ai_models.detect_distress(temp_path)
-        
-        # Clean up the temp file
-        os.unlink(temp_path)
-        
-        # Determine if distress was detected
-        is_distress = any(p['label'] == 'distress' and p['score'] > 0.7 for p in result)
+        sampling_rate = await ai_models.get_sampling_rate()
+        audio = await decode_upload(
+            audio_file,
+            sampling_rate,
+            max_bytes=settings.MAX_AUDIO_UPLOAD_BYTES,
+            chunk_size=settings.AUDIO_READ_CHUNK_BYTES
+        )
+    except AudioTooLargeError as e:
+        raise HTTPException(status_code=413, detail=str(e))
+    except AudioDecodeError as e:
+        raise HTTPException(status_code=400, detail=f"Could not decode audio: {str(e)}")
+    
+    try:
+        # Process the audio
+        result = await ai_models.detect_distress(audio)
+        summary = summarize_distress(result)
         
         # Log this detection in the database
         emergency = Emergency(
             user_id=current_user.id,
             detection_type="audio",
             detection_data={"result": result},
-            is_confirmed=is_distress
+            is_confirmed=summary["is_distress"]
         )
         await emergency.save(db)
+        await db.commit()
         
-        return {
-            "is_distress": is_distress,
-            "confidence": max(p['score'] for p in result),
-            "details": result
-        }
+        return summary
         
     except Exception as e:
         raise HTTPException(
             status_code=500, 
             detail=f"Error processing audio: {str(e)}"
-        )
\ No newline at end of file
+        )
+
+@router.websocket("/distress/stream")
+async def stream_distress(
+    websocket: WebSocket,
+    token: str = Query(...),
+    sample_rate: Optional[int] = Query(None, ge=8000, le=48000)
+):
+    # Clients stream little-endian 16-bit mono PCM as binary frames. The model
+    # runs on overlapping windows of the most recent audio and an event is
+    # pushed whenever the distress state flips.
+    # No session is held for the life of the stream, which would pin a pooled
+    # connection per client; each write opens its own.
+    async with async_session() as db:
+        current_user = await get_user_from_token(db, token)
+    if current_user is None:
+        await websocket.close(code=status.WS_1008_POLICY_VIOLATION)
+        return
+    await websocket.accept()
+    
+    model_rate = await ai_models.get_sampling_rate()
+    input_rate = sample_rate or model_rate
+    window = SlidingWindow(int(settings.DISTRESS_STREAM_WINDOW_SECONDS * model_rate))
+    hop = int(settings.DISTRESS_STREAM_HOP_SECONDS * model_rate)
+    new_audio = asyncio.Event()
+    
+    async def receive_audio():
+        # Frames need not end on a sample boundary: an odd trailing byte is
+        # kept and prefixed to the next frame
+        leftover = b""
+        while True:
+            frame = await websocket.receive_bytes()
+            if len(frame) > settings.DISTRESS_STREAM_MAX_FRAME_BYTES:
+                await websocket.close(code=status.WS_1009_MESSAGE_TOO_BIG)
+                return
+            data = leftover + frame
+            usable = len(data) - len(data) % 2
+            leftover = data[usable:]
+            if not usable:
+                continue
+            window.extend(resample(pcm16_to_float32(data[:usable]), input_rate, model_rate))
+            if window.full and window.pending >= hop:
+                new_audio.set()
+    
+    async def analyze_audio():
+        # Only the newest window is evaluated, so a slow model never builds a
+        # backlog: frames that arrive during inference are folded into the next window
+        emergency = None
+        calm_windows = 0
+        while True:
+            await new_audio.wait()
+            new_audio.clear()
+            offset = window.total / model_rate
+            # Live windows never repeat, so they bypass the result cache
+            result = await ai_models.detect_distress(window.snapshot(), use_cache=False)
+            summary = summarize_distress(result)
+            
+            if summary["is_distress"]:
+                calm_windows = 0
+                if emergency is not None:
+                    continue
+                emergency = Emergency(
+                    user_id=current_user.id,
+                    detection_type="audio_stream",
+                    detection_data={"result": result, "stream_offset_seconds": offset},
+                    is_confirmed=True
+                )
+                async with async_session() as db:
+                    await emergency.save(db)
+                    await db.commit()
+                event = "distress"
+            else:
+                if emergency is None:
+                    continue
+                # Require a few calm windows in a row before clearing, so a
+                # borderline score does not flap between states
+                calm_windows += 1
+                if calm_windows < settings.DISTRESS_STREAM_CLEAR_WINDOWS:
+                    continue
+                async with async_session() as db:
+                    stored = await db.get(Emergency, emergency.id)
+                    if stored is not None:
+                        stored.resolved_at = datetime.utcnow()
+                        await db.commit()
+                event = "clear"
+            
+            await websocket.send_json(DistressStreamEvent(
+                event=event,
+                emergency_id=str(emergency.id),
+                stream_offset_seconds=offset,
+                result=summary
+            ).dict())
+            if event == "clear":
+                emergency = None
+                calm_windows = 0
+    
+    tasks = [
+        asyncio.create_task(receive_audio()),
+        asyncio.create_task(analyze_audio())
+    ]
+    try:
+        done, _ = await asyncio.wait(tasks, return_when=asyncio.FIRST_COMPLETED)
+        for task in done:
+            task.result()
+    except WebSocketDisconnect:
+        pass
+    except Exception as e:
+        # Tell the client the stream failed instead of leaving it hanging
+        print(f"Distress stream failed: {e!r}")
+        try:
+            await websocket.close(code=status.WS_1011_INTERNAL_ERROR)
+        except Exception:
+            pass
+    finally:
+        for task in tasks:
+            task.cancel()
@@ -1,27 +1,61 @@
-from fastapi import APIRouter, Depends, HTTPException
-from fastapi.responses import JSONResponse
+from fastapi import APIRouter, Depends, HTTPException, Query, Response
+from fastapi.responses import JSONResponse, StreamingResponse
 from typing import List, Optional
 from datetime import datetime, timedelta
 
 from app.core.security import get_current_user
-from app.core.database import get_db
+from app.core.database import get_db, async_session
+from app.core.pagination import encode_cursor, decode_cursor, InvalidCursorError
+from app.config import settings
 from app.schemas.history import EmergencyHistory, AnalyticsResponse
 from app.models.emergency import Emergency
+from app.core.rollups import rollup_counts, summarize_counts
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select, func
 
 router = APIRouter()
 
+HISTORY_COLUMNS = [
+    Emergency.id,
+    Emergency.detection_type,
+    Emergency.is_confirmed,
+    Emergency.created_at,
+    Emergency.location_lat,
+    Emergency.location_lng
+]
+
 @router.get("/history/emergencies", response_model=List[EmergencyHistory])
 async def get_emergency_history(
+    response: Response,
     days: Optional[int] = 30,
+    limit: int = Query(50, ge=1, le=500),
+    cursor: Optional[str] = None,
+    stream: bool = False,
     current_user=Depends(get_current_user),
     db: AsyncSession = Depends(get_db)
 ):
+    # Pages are newest first; pass the X-Next-Cursor header of one page as
+    # `cursor` to get the next. With stream=true the whole window is sent as
+    # NDJSON from a server-side cursor, so memory stays flat however long the
+    # history is.
     try:
-        since_date = datetime.utcnow() - timedelta(days=days)
-        emergencies = await Emergency.get_by_user(db, current_user.id, since_date)
-        return emergencies
+        after = decode_cursor(cursor) if cursor else None
+    except InvalidCursorError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    
+    since_date = datetime.utcnow() - timedelta(days=days)
+    stmt = Emergency.history_query(current_user.id, since_date, after, columns=HISTORY_COLUMNS)
+    if stream:
+        return StreamingResponse(stream_history(stmt), media_type="application/x-ndjson")
+    
+    try:
+        # Columns rather than entities: nothing lands in the identity map
+        rows = (await db.execute(stmt.limit(limit + 1))).all()
+        if len(rows) > limit:
+            rows = rows[:limit]
+            last = rows[-1]
+            response.headers["X-Next-Cursor"] = encode_cursor(last.created_at, last.id)
+        return [EmergencyHistory(**row._mapping) for row in rows]
         
     except Exception as e:
         raise HTTPException(
@@ -29,6 +63,13 @@ async def get_emergency_history(
             detail=f"Error getting emergency history: {str(e)}"
         )
 
+async def stream_history(stmt):
+    # Own session: the response outlives the request's dependencies
+    async with async_session() as db:
+        result = await db.stream(stmt.execution_options(yield_per=settings.HISTORY_STREAM_BATCH_SIZE))
+        async for partition in result.partitions():
+            yield "".join(EmergencyHistory(**row._mapping).json() + "\n" for row in partition)
+
 @router.get("/history/analytics", response_model=AnalyticsResponse)
 async def get_analytics(
     days: Optional[int] = 30,
@@ -38,39 +79,15 @@ async def get_analytics(
     try:
         since_date = datetime.utcnow() - timedelta(days=days)
         
-        # Get total emergencies
-        total_stmt = select(func.count()).where(
-            Emergency.user_id == current_user.id,
-            Emergency.created_at >= since_date
-        )
-        total_result = await db.execute(total_stmt)
-        total = total_result.scalar()
-        
-        # Get confirmed emergencies
-        confirmed_stmt = select(func.count()).where(
-            Emergency.user_id == current_user.id,
-            Emergency.is_confirmed == True,
-            Emergency.created_at >= since_date
-        )
-        confirmed_result = await db.execute(confirmed_stmt)
-        confirmed = confirmed_result.scalar()
-        
-        # Get by type
-        type_stmt = select(
-            Emergency.detection_type,
-            func.count(Emergency.detection_type)
-        ).where(
-            Emergency.user_id == current_user.id,
-            Emergency.created_at >= since_date
-        ).group_by(Emergency.detection_type)
-        
-        type_result = await db.execute(type_stmt)
-        by_type = {row[0]: row[1] for row in type_result.all()}
+        # One GROUP BY over the daily rollup (plus the rest of the first day
+        # from emergencies) instead of three scans of emergencies
+        result = await db.execute(rollup_counts(since_date, user_id=current_user.id))
+        counts = summarize_counts(result.all())
         
         return {
-            "total_emergencies": total or 0,
-            "confirmed_emergencies": confirmed or 0,
-            "by_type": by_type,
+            "total_emergencies": counts["total"],
+            "confirmed_emergencies": counts["confirmed"],
+            "by_type": counts["by_type"],
             "time_period_days": days
         }
         
@@ -1,11 +1,26 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Query, WebSocket, WebSocketDisconnect, status
 from fastapi.responses import JSONResponse
 from typing import Optional
+from datetime import datetime, timezone
+import asyncio
 
-from app.core.security import get_current_user
-from app.core.database import get_db
-from app.schemas.location import LocationUpdate, LocationResponse
-from app.models.user import UserLocation
+from app.core.security import get_current_user, get_user_from_token
+from app.core.database import get_db, async_session
+from app.core.spatial_index import volunteer_index
+from app.core.location_buffer import location_buffer
+from app.core.location_hub import location_hub
+from app.core.location_history import location_history, to_epoch_ms
+from app.core.utils import simplify_track
+from app.config import settings
+from app.models.emergency import Emergency
+from app.schemas.location import (
+    LocationUpdate,
+    LocationResponse,
+    LocationBatchUpdate,
+    LocationBatchResponse,
+    LocationStreamEvent,
+    LocationTrackResponse
+)
 from sqlalchemy.ext.asyncio import AsyncSession
 
 router = APIRouter()
@@ -13,33 +28,53 @@ router = APIRouter()
 @router.post("/location/update", response_model=LocationResponse)
 async def update_location(
     location: LocationUpdate,
-    current_user=Depends(get_current_user),
-    db: AsyncSession = Depends(get_db)
+    current_user=Depends(get_current_user)
 ):
     try:
-        # Update or create user location
-        user_location = await UserLocation.get_by_user(db, current_user.id)
-        if user_location:
-            user_location.latitude = location.latitude
-            user_location.longitude = location.longitude
-            user_location.accuracy = location.accuracy
-            user_location.timestamp = location.timestamp
-        else:
-            user_location = UserLocation(
-                user_id=current_user.id,
-                latitude=location.latitude,
-                longitude=location.longitude,
-                accuracy=location.accuracy,
-                timestamp=location.timestamp
-            )
-        
-        await user_location.save(db)
+        # Acknowledged once buffered; location_buffer writes it within
+        # LOCATION_FLUSH_INTERVAL_SECONDS
+        location_history.append(current_user.id, float(location.latitude), float(location.longitude), location.timestamp)
+        record_fix(current_user.id, location)
+        return {
+            "success": True,
+            "latitude": location.latitude,
+            "longitude": location.longitude,
+            "timestamp": location.timestamp
+        }
         
+    except Exception as e:
+        raise HTTPException(
+            status_code=500, 
+            detail=f"Error updating location: {str(e)}"
+        )
+
+@router.post("/location/batch", response_model=LocationBatchResponse)
+async def update_location_batch(
+    batch: LocationBatchUpdate,
+    current_user=Depends(get_current_user)
+):
+    # Devices that were offline or report at high rate send their fixes in one
+    # request; all of them go to the history, only the newest one ends up in
+    # user_locations
+    if not batch.fixes:
+        raise HTTPException(status_code=422, detail="No location fixes given")
+    if len(batch.fixes) > settings.LOCATION_BATCH_MAX_FIXES:
+        raise HTTPException(
+            status_code=413,
+            detail=f"At most {settings.LOCATION_BATCH_MAX_FIXES} fixes per batch"
+        )
+    
+    try:
+        for fix in batch.fixes:
+            location_history.append(current_user.id, float(fix.latitude), float(fix.longitude), fix.timestamp)
+        newest = max(batch.fixes, key=lambda fix: fix.timestamp)
+        record_fix(current_user.id, newest)
         return {
             "success": True,
-            "latitude": user_location.latitude,
-            "longitude": user_location.longitude,
-            "timestamp": user_location.timestamp
+            "accepted": len(batch.fixes),
+            "latitude": newest.latitude,
+            "longitude": newest.longitude,
+            "timestamp": newest.timestamp
         }
         
     except Exception as e:
@@ -48,6 +83,22 @@ async def update_location(
             detail=f"Error updating location: {str(e)}"
         )
 
+def record_fix(user_id: str, location: LocationUpdate):
+    if location_buffer.add(
+        user_id,
+        location.latitude,
+        location.longitude,
+        location.accuracy,
+        location.timestamp
+    ):
+        location_hub.publish(location_buffer.get(user_id))
+        volunteer_index.move(
+            user_id,
+            float(location.latitude),
+            float(location.longitude),
+            location.timestamp
+        )
+
 @router.get("/location/user/{user_id}", response_model=LocationResponse)
 async def get_user_location(
     user_id: str,
@@ -56,7 +107,15 @@ async def get_user_location(
 ):
     try:
         # In a real app, add authorization checks here
-        user_location = await UserLocation.get_by_user(db, user_id)
+        # The hub only sees fixes reported to this process; another worker may
+        # have written a newer one, so the newer of the two wins
+        user_location = await location_buffer.latest(db, user_id)
+        live = location_hub.get(user_id)
+        if live is not None and (
+            user_location is None
+            or to_epoch_ms(live.timestamp) >= to_epoch_ms(user_location.timestamp)
+        ):
+            user_location = live
         if not user_location:
             raise HTTPException(
                 status_code=404,
@@ -74,4 +133,117 @@ async def get_user_location(
         raise HTTPException(
             status_code=500, 
             detail=f"Error getting location: {str(e)}"
-        )
\ No newline at end of file
+        )
+
+@router.get("/location/history/{user_id}", response_model=LocationTrackResponse)
+async def get_location_history(
+    user_id: str,
+    start: datetime,
+    end: Optional[datetime] = None,
+    simplify_m: Optional[float] = Query(None, gt=0),
+    current_user=Depends(get_current_user),
+    db: AsyncSession = Depends(get_db)
+):
+    end = end or datetime.now(timezone.utc)
+    span_ms = to_epoch_ms(end) - to_epoch_ms(start)
+    if span_ms <= 0:
+        raise HTTPException(status_code=422, detail="end must be after start")
+    if span_ms > settings.LOCATION_HISTORY_MAX_RANGE_HOURS * 3600 * 1000:
+        raise HTTPException(
+            status_code=422,
+            detail=f"At most {settings.LOCATION_HISTORY_MAX_RANGE_HOURS} hours per request"
+        )
+    
+    try:
+        # In a real app, add authorization checks here
+        times, lats, lngs = await location_history.read(db, user_id, start, end)
+        if simplify_m:
+            keep = simplify_track(lats, lngs, simplify_m)
+            times, lats, lngs = times[keep], lats[keep], lngs[keep]
+        
+        return {
+            "user_id": user_id,
+            "points": len(times),
+            "timestamps": times.tolist(),
+            "latitudes": lats.tolist(),
+            "longitudes": lngs.tolist()
+        }
+        
+    except Exception as e:
+        raise HTTPException(
+            status_code=500, 
+            detail=f"Error getting location history: {str(e)}"
+        )
+
+@router.websocket("/location/stream")
+async def stream_locations(
+    websocket: WebSocket,
+    token: str = Query(...),
+    user_id: Optional[str] = Query(None),
+    emergency_id: Optional[str] = Query(None)
+):
+    # Pushes a LocationStreamEvent for every new fix of the tracked user, or of
+    # the user an emergency was raised for. Fixes are only seen by the worker
+    # process that received them, so multi-worker deployments need sticky
+    # routing of both reporters and subscribers.
+    # The lookups use their own short session, closed before the socket is
+    # accepted: a session held for the life of the stream would pin a pooled
+    # connection (and an open read transaction) per subscriber.
+    user_ids = set()
+    async with async_session() as db:
+        current_user = await get_user_from_token(db, token)
+        if current_user is not None:
+            # In a real app, add authorization checks here
+            if user_id:
+                user_ids.add(user_id)
+            if emergency_id:
+                emergency = await db.get(Emergency, emergency_id)
+                if emergency is not None:
+                    user_ids.add(emergency.user_id)
+    if current_user is None or not user_ids:
+        await websocket.close(code=status.WS_1008_POLICY_VIOLATION)
+        return
+    await websocket.accept()
+    
+    subscription = location_hub.subscribe(user_ids)
+    
+    async def send_fixes():
+        # While a send is in flight newer fixes coalesce in the subscription,
+        # so a slow client gets fewer, fresher updates; one that stops reading
+        # altogether is disconnected
+        while True:
+            for fix in await subscription.next_batch():
+                event = LocationStreamEvent(
+                    user_id=fix.user_id,
+                    latitude=fix.latitude,
+                    longitude=fix.longitude,
+                    accuracy=fix.accuracy,
+                    timestamp=fix.timestamp
+                )
+                try:
+                    await asyncio.wait_for(
+                        websocket.send_text(event.json()),
+                        settings.LOCATION_STREAM_SEND_TIMEOUT_SECONDS
+                    )
+                except asyncio.TimeoutError:
+                    await websocket.close(code=status.WS_1013_TRY_AGAIN_LATER)
+                    return
+    
+    async def watch_disconnect():
+        while True:
+            await websocket.receive_text()
+    
+    tasks = [
+        asyncio.create_task(send_fixes()),
+        asyncio.create_task(watch_disconnect())
+    ]
+    try:
+        done, _ = await asyncio.wait(tasks, return_when=asyncio.FIRST_COMPLETED)
+        for task in done:
+            task.result()
+    except WebSocketDisconnect:
+        pass
+    finally:
+        location_hub.unsubscribe(subscription)
+        for task in tasks:
+            task.cancel()
@@ -0,0 +1,23 @@
+from fastapi import APIRouter, Header, HTTPException
+from fastapi.responses import PlainTextResponse
+from typing import Optional
+import hmac
+
+from app.config import settings
+from app.core.metrics import registry, CONTENT_TYPE
+
+router = APIRouter()
+
+# Route names, latencies and SQL volumes describe the deployment, so scrapers
+# authenticate with METRICS_TOKEN as a bearer token. Without a token the
+# endpoint is not mounted at all.
+@router.get("/metrics", response_class=PlainTextResponse, include_in_schema=False)
+async def get_metrics(authorization: Optional[str] = Header(None)):
+    expected = f"Bearer {settings.METRICS_TOKEN}"
+    if not settings.METRICS_TOKEN or not hmac.compare_digest((authorization or "").encode(), expected.encode()):
+        raise HTTPException(
+            status_code=401,
+            detail="Invalid metrics token",
+            headers={"WWW-Authenticate": "Bearer"}
+        )
+    return PlainTextResponse(registry.render(), media_type=CONTENT_TYPE)
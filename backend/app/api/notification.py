@@ -1,10 +1,11 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, Header, HTTPException
 from fastapi.responses import JSONResponse
 from typing import List, Optional
 
 from app.core.security import get_current_user
-from app.core.notifications import notification_service
+from app.core.outbox import outbox_dispatcher
 from app.core.database import get_db
+from app.models.notification import NotificationOutbox
 from app.schemas.notification import NotificationCreate, NotificationResponse
 from sqlalchemy.ext.asyncio import AsyncSession
 
@@ -13,31 +14,38 @@ router = APIRouter()
 @router.post("/notification/send", response_model=NotificationResponse)
 async def send_notification(
     notification: NotificationCreate,
+    idempotency_key: Optional[str] = Header(None),
     current_user=Depends(get_current_user),
     db: AsyncSession = Depends(get_db)
 ):
+    if notification.notification_type not in ("sms", "push", "email"):
+        raise HTTPException(
+            status_code=400,
+            detail="Invalid notification type"
+        )
+    
     try:
-        success = False
-        if notification.notification_type == "sms":
-            success = await notification_service.send_sms(
+        # Delivery happens in the background outbox workers. Repeating the
+        # same alert queues it again unless the client retries with the same
+        # Idempotency-Key, which is scoped to the caller.
+        queued = await NotificationOutbox.enqueue(
+            db,
+            [(
+                notification.notification_type,
                 notification.recipient,
-                notification.message
-            )
-        elif notification.notification_type == "push":
-            success = await notification_service.send_push_notification(
-                [notification.recipient],
                 notification.title or "Emergency Alert",
                 notification.message
-            )
-        else:
-            raise HTTPException(
-                status_code=400,
-                detail="Invalid notification type"
-            )
-            
+            )],
+            idempotency_key=f"user:{current_user.id}:{idempotency_key}" if idempotency_key else None
+        )
+        await db.commit()
+        outbox_dispatcher.notify()
+        
         return {
-            "success": success,
-            "notification_type": notification.notification_type
+            "success": True,
+            "notification_type": notification.notification_type,
+            "notification_id": queued[0] if queued else None,
+            "status": "queued"
         }
         
     except Exception as e:
@@ -1,52 +1,91 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, Header, HTTPException
 from fastapi.responses import JSONResponse
 from typing import Optional
 
 from app.core.security import get_current_user
 from app.core.database import get_db
+from app.core.utils import to_minor_units, from_minor_units
 from app.schemas.payment import PaymentCreate, PaymentResponse, WalletBalance
 from app.models.payment import Wallet, Transaction
 from sqlalchemy.ext.asyncio import AsyncSession
 
 router = APIRouter()
 
+async def _replay(db, user_id: str, idempotency_key: str, amount_minor: int, currency: str):
+    # The stored result of an earlier request with this key, if any
+    previous = await Transaction.get_by_idempotency_key(db, user_id, idempotency_key)
+    if previous is None:
+        return None
+    if previous.amount_minor != amount_minor or previous.currency != currency:
+        raise HTTPException(
+            status_code=409,
+            detail="Idempotency-Key was already used for a different payment"
+        )
+    return {
+        "success": True,
+        "transaction_id": str(previous.id),
+        "new_balance": str(from_minor_units(previous.balance_after_minor, previous.currency)),
+        "replayed": True
+    }
+
 @router.post("/payment/add-funds", response_model=PaymentResponse)
 async def add_funds(
     payment: PaymentCreate,
+    idempotency_key: Optional[str] = Header(None),
     current_user=Depends(get_current_user),
     db: AsyncSession = Depends(get_db)
 ):
+    try:
+        amount_minor = to_minor_units(payment.amount, payment.currency)
+    except ValueError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+    if amount_minor <= 0:
+        raise HTTPException(status_code=422, detail="Amount must be positive")
+    
     try:
         # In a real app, integrate with payment gateway here
         # For now, we'll just simulate a successful payment
+        if idempotency_key:
+            replay = await _replay(db, current_user.id, idempotency_key, amount_minor, payment.currency)
+            if replay:
+                return replay
         
-        # Get or create wallet
-        wallet = await Wallet.get_by_user(db, current_user.id)
-        if not wallet:
-            wallet = Wallet(user_id=current_user.id, balance=0)
-            await wallet.save(db)
-        
-        # Create transaction
-        transaction = Transaction(
+        # Credit the wallet atomically (creating it on first deposit) and
+        # append the ledger entry; both commit together
+        new_balance = await Wallet.credit(db, current_user.id, amount_minor, payment.currency)
+        if new_balance is None:
+            await db.rollback()
+            raise HTTPException(
+                status_code=400,
+                detail=f"Wallet does not hold {payment.currency}"
+            )
+        transaction_id = await Transaction.append(
+            db,
             user_id=current_user.id,
-            amount=payment.amount,
+            amount_minor=amount_minor,
+            balance_after_minor=new_balance,
             currency=payment.currency,
             payment_method=payment.payment_method,
             status="completed",
-            transaction_type="deposit"
+            transaction_type="deposit",
+            idempotency_key=idempotency_key
         )
-        await transaction.save(db)
-        
-        # Update wallet balance
-        wallet.balance += payment.amount
-        await wallet.save(db)
+        if transaction_id is None:
+            # A concurrent request with the same key committed first; its
+            # credit stands and this one is rolled back
+            await db.rollback()
+            return await _replay(db, current_user.id, idempotency_key, amount_minor, payment.currency)
+        await db.commit()
         
         return {
             "success": True,
-            "transaction_id": str(transaction.id),
-            "new_balance": wallet.balance
+            "transaction_id": transaction_id,
+            "new_balance": str(from_minor_units(new_balance, payment.currency)),
+            "replayed": False
         }
         
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(
             status_code=500, 
@@ -61,11 +100,11 @@ async def get_wallet_balance(
     try:
         wallet = await Wallet.get_by_user(db, current_user.id)
         if not wallet:
-            return {"balance": 0, "currency": "USD"}
+            return {"balance": str(from_minor_units(0, "USD")), "currency": "USD"}
             
         return {
-            "balance": wallet.balance,
-            "currency": "USD"
+            "balance": str(from_minor_units(wallet.balance_minor, wallet.currency)),
+            "currency": wallet.currency
         }
         
     except Exception as e:
@@ -0,0 +1,79 @@
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
+from fastapi.responses import PlainTextResponse
+from typing import Optional
+from datetime import datetime
+import asyncio
+
+from app.core.security import get_current_admin_user
+from app.core.profiler import profiler, ProfileSession, ProfilerBusyError, MODES, cpu_mode_available
+from app.config import settings
+
+router = APIRouter()
+
+@router.post("/admin/profile", response_class=PlainTextResponse)
+async def capture_profile(
+    request: Request,
+    mode: str = "wall",
+    seconds: float = Query(10.0, gt=0),
+    route: Optional[str] = None,
+    requests: Optional[int] = Query(None, ge=1),
+    interval_ms: float = 10.0,
+    admin_user=Depends(get_current_admin_user)
+):
+    # Samples this worker process for `seconds`, or until `requests` requests
+    # (matching the `route` template, if given) have completed, and returns
+    # the collapsed stacks: `flamegraph.pl profile.txt > profile.svg`, or
+    # open the file in speedscope. "wall" counts samples, including requests
+    # suspended on an await; "cpu" weights them by CPU microseconds used.
+    if mode not in MODES:
+        raise HTTPException(status_code=422, detail=f"mode must be one of {', '.join(MODES)}")
+    if mode == "cpu" and not cpu_mode_available():
+        raise HTTPException(status_code=422, detail="cpu mode needs per-thread CPU clocks, which this platform lacks")
+    if seconds > settings.PROFILER_MAX_SECONDS:
+        raise HTTPException(status_code=422, detail=f"seconds must be at most {settings.PROFILER_MAX_SECONDS:g}")
+    if interval_ms < settings.PROFILER_MIN_INTERVAL_MS:
+        raise HTTPException(status_code=422, detail=f"interval_ms must be at least {settings.PROFILER_MIN_INTERVAL_MS:g}")
+    
+    routes = None
+    if route is not None:
+        routes = [r for r in request.app.routes if getattr(r, "path", None) == route]
+        if not routes:
+            raise HTTPException(status_code=404, detail=f"No route {route}")
+    
+    session = ProfileSession(
+        mode,
+        interval_ms / 1000.0,
+        routes=routes,
+        max_requests=requests,
+        route_paths={r.endpoint: r.path for r in request.app.routes if hasattr(r, "endpoint")},
+        max_stacks=settings.PROFILER_MAX_STACKS,
+        max_depth=settings.PROFILER_MAX_DEPTH,
+        max_overhead=settings.PROFILER_MAX_OVERHEAD
+    )
+    try:
+        profiler.start(session)
+    except ProfilerBusyError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    
+    try:
+        try:
+            await asyncio.wait_for(session.finished.wait(), seconds)
+        except asyncio.TimeoutError:
+            pass
+        finally:
+            await profiler.stop()
+        
+        summary = session.summary()
+        headers = {
+            f"X-Profile-{key.replace('_', '-').title()}": str(value)
+            for key, value in summary.items() if value is not None
+        }
+        filename = f"profile-{mode}-{datetime.utcnow():%Y%m%dT%H%M%SZ}.collapsed"
+        headers["Content-Disposition"] = f'attachment; filename="{filename}"'
+        return PlainTextResponse(session.collapsed(), headers=headers)
+        
+    except Exception as e:
+        raise HTTPException(
+            status_code=500, 
+            detail=f"Error capturing profile: {str(e)}"
+        )
@@ -1,24 +1,46 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, Header, HTTPException
 from fastapi.responses import JSONResponse
 from typing import Optional
 
 from app.core.security import get_current_user
-from app.core.notifications import notification_service
+from app.core.outbox import outbox_dispatcher
 from app.core.database import get_db
 from app.schemas.sos import SOSCreate, SOSResponse
 from app.models.emergency import Emergency
+from app.models.notification import NotificationOutbox
 from app.models.user import User
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.ext.asyncio import AsyncSession
 
 router = APIRouter()
 
+async def _replay(db, user_id: str, idempotency_key: str):
+    # The emergency an earlier SOS with this key created, if any
+    previous = await Emergency.get_by_idempotency_key(db, user_id, idempotency_key)
+    if previous is None:
+        return None
+    return {
+        "success": True,
+        "emergency_id": str(previous.id),
+        "notifications_sent": await NotificationOutbox.count_for_emergency(db, previous.id),
+        "replayed": True
+    }
+
 @router.post("/sos/trigger", response_model=SOSResponse)
 async def trigger_sos(
     sos_data: SOSCreate,
+    idempotency_key: Optional[str] = Header(None),
     current_user=Depends(get_current_user),
     db: AsyncSession = Depends(get_db)
 ):
     try:
+        # A client retrying after a timeout sends the same Idempotency-Key and
+        # gets the first emergency back instead of raising a second alarm
+        if idempotency_key:
+            replay = await _replay(db, current_user.id, idempotency_key)
+            if replay:
+                return replay
+        
         # Create emergency record
         emergency = Emergency(
             user_id=current_user.id,
@@ -26,28 +48,47 @@ async def trigger_sos(
             is_confirmed=True,
             location_lat=sos_data.location_lat,
             location_lng=sos_data.location_lng,
-            additional_info=sos_data.additional_info
+            additional_info=sos_data.additional_info,
+            idempotency_key=idempotency_key
         )
-        await emergency.save(db)
+        # Flushed now: the outbox rows reference it
+        try:
+            await emergency.save(db, flush=True)
+        except IntegrityError:
+            # A concurrent retry with the same key got there first
+            await db.rollback()
+            replay = await _replay(db, current_user.id, idempotency_key)
+            if replay:
+                return replay
+            raise
         
         # Get user's emergency contacts
         user = await User.get(db, current_user.id)
         contacts = user.emergency_contacts if user.emergency_contacts else []
         
-        # Send notifications
-        messages_sent = 0
-        for contact in contacts:
-            if contact.get("phone"):
-                message = f"EMERGENCY: {user.full_name} has triggered an SOS. Location: {sos_data.location_lat},{sos_data.location_lng}. Additional info: {sos_data.additional_info}"
-                if await notification_service.send_sms(contact["phone"], message):
-                    messages_sent += 1
+        # Queue notifications in the same transaction as the emergency; the
+        # outbox workers deliver them, so provider latency never delays the SOS
+        message = f"EMERGENCY: {user.full_name} has triggered an SOS. Location: {sos_data.location_lat},{sos_data.location_lng}. Additional info: {sos_data.additional_info}"
+        queued = await NotificationOutbox.enqueue(
+            db,
+            [
+                ("sms", contact["phone"], None, message)
+                for contact in contacts
+                if contact.get("phone")
+            ],
+            emergency_id=emergency.id,
+            idempotency_key=f"sos:{current_user.id}:{idempotency_key}" if idempotency_key else None
+        )
+        await db.commit()
+        outbox_dispatcher.notify()
         
         # TODO: Notify nearby responders via push notification
         
         return {
             "success": True,
             "emergency_id": str(emergency.id),
-            "notifications_sent": messages_sent
+            "notifications_sent": len(queued),
+            "replayed": False
         }
         
     except Exception as e:
@@ -1,16 +1,17 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Query
 from fastapi.responses import JSONResponse
 from typing import List, Optional
 from datetime import datetime
 
 from app.core.security import get_current_user
 from app.core.database import get_db
-from app.schemas.volunteer import VolunteerCreate, VolunteerResponse, NearbyVolunteers
+from app.core.spatial_index import volunteer_index, IndexedVolunteer
+from app.core.location_buffer import location_buffer
+from app.schemas.volunteer import VolunteerCreate, VolunteerStatusUpdate, VolunteerResponse, NearbyVolunteers
 from app.models.volunteer import Volunteer
 from app.models.user import UserLocation
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select, func
-import math
 
 router = APIRouter()
 
@@ -37,6 +38,19 @@ async def register_volunteer(
             availability=volunteer_data.availability
         )
         await volunteer.save(db)
+        await db.commit()
+        
+        # Keep the nearby index in sync with the new volunteer
+        if volunteer.is_active:
+            location = await location_buffer.latest(db, current_user.id)
+            if location:
+                volunteer_index.upsert(
+                    volunteer.user_id,
+                    float(location.latitude),
+                    float(location.longitude),
+                    volunteer.qualifications,
+                    location.timestamp
+                )
         
         return {
             "success": True,
@@ -49,44 +63,80 @@ async def register_volunteer(
             detail=f"Error registering volunteer: {str(e)}"
         )
 
+@router.put("/volunteer/status", response_model=VolunteerResponse)
+async def update_volunteer_status(
+    status_data: VolunteerStatusUpdate,
+    current_user=Depends(get_current_user),
+    db: AsyncSession = Depends(get_db)
+):
+    try:
+        volunteer = await Volunteer.get_by_user(db, current_user.id)
+        if not volunteer:
+            raise HTTPException(
+                status_code=404,
+                detail="Not registered as volunteer"
+            )
+        
+        volunteer.is_active = status_data.is_active
+        if status_data.qualifications is not None:
+            volunteer.qualifications = status_data.qualifications
+        await db.commit()
+        
+        # Going off duty drops out of nearby searches right away, not on the
+        # next index refresh
+        location = await location_buffer.latest(db, current_user.id) if volunteer.is_active else None
+        if location:
+            volunteer_index.upsert(
+                volunteer.user_id,
+                float(location.latitude),
+                float(location.longitude),
+                volunteer.qualifications,
+                location.timestamp
+            )
+        else:
+            volunteer_index.remove(volunteer.user_id)
+        
+        return {
+            "success": True,
+            "volunteer_id": str(volunteer.id)
+        }
+        
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(
+            status_code=500, 
+            detail=f"Error updating volunteer status: {str(e)}"
+        )
+
 @router.get("/volunteer/nearby", response_model=NearbyVolunteers)
 async def get_nearby_volunteers(
     latitude: float,
     longitude: float,
     radius_km: float = 5.0,
+    limit: Optional[int] = Query(None, ge=1, le=500),
+    qualifications: Optional[List[str]] = Query(None),
     current_user=Depends(get_current_user),
     db: AsyncSession = Depends(get_db)
 ):
     try:
-        # Get all active volunteers with their locations
-        stmt = select(
-            Volunteer,
-            UserLocation
-        ).join(
-            UserLocation,
-            Volunteer.user_id == UserLocation.user_id
-        ).where(
-            Volunteer.is_active == True
+        # Only the grid cells overlapping the search radius are scanned, and
+        # response objects are built for the closest `limit` matches only
+        matches = volunteer_index.within(
+            latitude, longitude, radius_km,
+            limit=limit,
+            qualifications=qualifications
         )
+        nearby = [
+            {
+                "user_id": entry.user_id,
+                "distance_km": distance,
+                "qualifications": entry.qualifications,
+                "last_updated": entry.last_updated
+            }
+            for distance, entry in matches
+        ]
         
-        result = await db.execute(stmt)
-        volunteers = result.all()
-        
-        # Filter by distance
-        nearby = []
-        for volunteer, location in volunteers:
-            distance = haversine(
-                latitude, longitude,
-                location.latitude, location.longitude
-            )
-            if distance <= radius_km:
-                nearby.append({
-                    "user_id": volunteer.user_id,
-                    "distance_km": distance,
-                    "qualifications": volunteer.qualifications,
-                    "last_updated": location.timestamp
-                })
-                
         return {
             "count": len(nearby),
             "volunteers": nearby,
@@ -101,19 +151,19 @@ async def get_nearby_volunteers(
             detail=f"Error finding nearby volunteers: {str(e)}"
         )
 
-def haversine(lat1, lon1, lat2, lon2):
-    # Calculate distance between two points on Earth in kilometers
-    R = 6371.0  # Earth radius in km
-    
-    lat1_rad = math.radians(lat1)
-    lon1_rad = math.radians(lon1)
-    lat2_rad = math.radians(lat2)
-    lon2_rad = math.radians(lon2)
-    
-    dlon = lon2_rad - lon1_rad
-    dlat = lat2_rad - lat1_rad
-    
-    a = math.sin(dlat / 2)**2 + math.cos(lat1_rad) * math.cos(lat2_rad) * math.sin(dlon / 2)**2
-    c = 2 * math.atan2(math.sqrt(a), math.sqrt(1 - a))
-    
-    return R * c
\ No newline at end of file
+async def load_volunteer_index(db: AsyncSession):
+    # Rebuild the in-memory index from all active volunteers with a known
+    # location. Changes this process makes while the query runs are kept.
+    since_version = volunteer_index.version
+    result = await db.execute(Volunteer.active_with_locations())
+    volunteer_index.replace(
+        (IndexedVolunteer(
+            volunteer.user_id,
+            float(location.latitude),
+            float(location.longitude),
+            volunteer.qualifications,
+            location.timestamp
+        )
+        for volunteer, location in result.all()),
+        since_version=since_version
+    )
@@ -6,21 +6,129 @@ class Settings(BaseSettings):
     API_V1_STR: str = "/api/v1"
     
     # Database
-    DATABASE_URL: str = "sqlite:///./ers.db"
+    DATABASE_URL: str = "sqlite+aiosqlite:///./ers.db"
+    DATABASE_PROFILE: Optional[str] = None  # "sqlite" or "server"; inferred from the URL when unset
+    DATABASE_ECHO: bool = False
+    DB_POOL_SIZE: int = 10
+    DB_MAX_OVERFLOW: int = 20
+    DB_POOL_TIMEOUT_SECONDS: float = 30.0
+    DB_POOL_RECYCLE_SECONDS: int = 1800
+    SQLITE_POOL_SIZE: int = 5
+    SQLITE_BUSY_TIMEOUT_MS: int = 5000
+    SQLITE_MMAP_SIZE_BYTES: int = 256 * 1024 * 1024
+    SQLITE_CACHE_SIZE_KIB: int = 64 * 1024
+    SQLITE_STATEMENT_CACHE_SIZE: int = 256
     
     # Security
     SECRET_KEY: str = "your-secret-key-here"
     ACCESS_TOKEN_EXPIRE_MINUTES: int = 60 * 24 * 7  # 1 week
+    PRINCIPAL_CACHE_TTL_SECONDS: int = 60
+    PRINCIPAL_CACHE_MAX_ENTRIES: int = 10000
+    TOKEN_CACHE_MAX_ENTRIES: int = 50000
+    BCRYPT_ROUNDS: int = 12
+    PASSWORD_HASH_WORKERS: int = 2
+    PASSWORD_HASH_MAX_PENDING: int = 64
+    
+    # Metrics: Prometheus text format at /metrics (served only when
+    # METRICS_TOKEN is set; scrapers send it as a bearer token), and a log line
+    # (with the request's SQL breakdown) for requests slower than SLOW_REQUEST_LOG_MS
+    METRICS_ENABLED: bool = True
+    METRICS_TOKEN: Optional[str] = None
+    SLOW_REQUEST_LOG_MS: Optional[float] = None
+    SLOW_REQUEST_LOG_TOP_STATEMENTS: int = 5
+    
+    # On-demand sampling profiler (admin API)
+    PROFILER_ENABLED: bool = True
+    PROFILER_MAX_SECONDS: float = 120.0
+    PROFILER_MIN_INTERVAL_MS: float = 1.0
+    PROFILER_MAX_OVERHEAD: float = 0.02  # share of wall time the sampler may hold the GIL
+    PROFILER_MAX_STACKS: int = 10000
+    PROFILER_MAX_DEPTH: int = 128
     
     # Hugging Face
     HF_API_TOKEN: Optional[str] = None
     HF_MODEL_NAME: str = "facebook/wav2vec2-base-960h"
+    EMOTION_MODEL_NAME: str = "finiteautomata/bertweet-base-emotion-analysis"
+    
+    # Inference backend: "torch", "torch_int8" (dynamic quantization) or "onnx"
+    INFERENCE_BACKEND: str = "torch"
+    INFERENCE_THREADS: Optional[int] = None
+    ONNX_MODEL_DIR: str = "./onnx_models"
+    
+    # Inference worker processes (0 runs inference on a thread in the API process)
+    INFERENCE_WORKERS: int = 0
+    INFERENCE_WORKER_START_METHOD: str = "forkserver"  # or "spawn"; "fork" is unsafe once threads run
+    INFERENCE_WORKER_HEALTH_INTERVAL_SECONDS: float = 5.0
+    INFERENCE_WORKER_HANG_SECONDS: float = 60.0
+    
+    # Inference result cache
+    INFERENCE_CACHE_MAX_BYTES: int = 16 * 1024 * 1024
+    INFERENCE_CACHE_TTL_SECONDS: int = 600
+    
+    # Distress inference micro-batching
+    DISTRESS_BATCH_MAX_SIZE: int = 8
+    DISTRESS_BATCH_MAX_WAIT_MS: int = 10
+    MAX_AUDIO_UPLOAD_BYTES: int = 10 * 1024 * 1024
+    AUDIO_READ_CHUNK_BYTES: int = 64 * 1024
+    
+    # Streaming distress monitoring
+    DISTRESS_STREAM_WINDOW_SECONDS: float = 2.0
+    DISTRESS_STREAM_HOP_SECONDS: float = 0.5
+    DISTRESS_STREAM_CLEAR_WINDOWS: int = 3
+    DISTRESS_STREAM_MAX_FRAME_BYTES: int = 64 * 1024
+    
+    # Emergency history
+    HISTORY_STREAM_BATCH_SIZE: int = 500
+    
+    # Volunteer spatial index
+    VOLUNTEER_INDEX_CELL_DEG: float = 0.05
+    VOLUNTEER_INDEX_REFRESH_SECONDS: int = 300
+    
+    # Location write-behind buffer
+    LOCATION_FLUSH_INTERVAL_SECONDS: float = 1.0
+    LOCATION_FLUSH_MAX_PENDING: int = 5000
+    LOCATION_FLUSH_ROWS_PER_STATEMENT: int = 500
+    LOCATION_BATCH_MAX_FIXES: int = 500
+    
+    # Live location subscriptions
+    LOCATION_STREAM_MAX_PENDING: int = 256
+    LOCATION_STREAM_SEND_TIMEOUT_SECONDS: float = 10.0
+    LOCATION_HUB_MAX_USERS: int = 100000
+    
+    # Location history (trajectories)
+    LOCATION_HISTORY_BUCKET_SECONDS: int = 3600
+    LOCATION_HISTORY_SEAL_AFTER_SECONDS: float = 300.0
+    LOCATION_HISTORY_SIMPLIFY_AFTER_SECONDS: float = 24 * 3600
+    LOCATION_HISTORY_SIMPLIFY_TOLERANCE_M: float = 10.0
+    LOCATION_HISTORY_FLUSH_INTERVAL_SECONDS: float = 60.0
+    LOCATION_HISTORY_MAX_RANGE_HOURS: int = 7 * 24
     
     # Twilio (for SMS)
     TWILIO_ACCOUNT_SID: Optional[str] = None
     TWILIO_AUTH_TOKEN: Optional[str] = None
     TWILIO_PHONE_NUMBER: Optional[str] = None
     
+    # SMS delivery: "twilio" or "fake" (records messages locally)
+    SMS_PROVIDER: str = "twilio"
+    SMS_MAX_CONCURRENCY: int = 10
+    SMS_SEND_TIMEOUT_SECONDS: float = 5.0
+    FAKE_SMS_LATENCY_MS: int = 0
+    
+    # Push (Firebase Cloud Messaging) and email (SendGrid)
+    FCM_SERVER_KEY: Optional[str] = None
+    SENDGRID_API_KEY: Optional[str] = None
+    EMAIL_FROM_ADDRESS: Optional[str] = None
+    NOTIFICATION_HTTP_TIMEOUT_SECONDS: float = 10.0
+    
+    # Notification outbox delivery
+    OUTBOX_WORKERS: int = 2
+    OUTBOX_BATCH_SIZE: int = 50
+    OUTBOX_POLL_INTERVAL_SECONDS: float = 1.0
+    OUTBOX_MAX_ATTEMPTS: int = 8
+    OUTBOX_BACKOFF_BASE_SECONDS: float = 2.0
+    OUTBOX_BACKOFF_MAX_SECONDS: float = 600.0
+    OUTBOX_LEASE_SECONDS: float = 60.0
+    
     class Config:
         case_sensitive = True
         env_file = ".env"
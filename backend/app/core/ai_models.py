@@ -1,39 +1,149 @@
-from transformers import pipeline
+from concurrent.futures import ThreadPoolExecutor
 from app.config import settings
+from app.core.inference_backends import build_pipeline, load_model_info, model_revision
+from app.core.cache import InferenceCache
+from app.core.inference_pool import InferenceWorkerPool
+from app.core.inference_scheduler import BatchScheduler
+from app.core.metrics import INFERENCE_SECONDS, INFERENCE_BATCH_SIZE, timed, charged
+import asyncio
 import torch
 
 class AIModels:
     def __init__(self):
         self.distress_model = None
         self.emotion_model = None
+        self.sampling_rate = None
+        self.loaded = False
+        self._load_lock = None
+        self.model_versions = {}
         
-    async def load_models(self):
-        # Load distress detection model
-        self.distress_model = pipeline(
-            "audio-classification", 
-            model=settings.HF_MODEL_NAME,
-            token=settings.HF_API_TOKEN
+        # Retried uploads of the same clip or text are answered from here
+        self.cache = InferenceCache(
+            max_bytes=settings.INFERENCE_CACHE_MAX_BYTES,
+            ttl=settings.INFERENCE_CACHE_TTL_SECONDS
         )
         
+        # Distress clips are batched and run either on a single inference
+        # thread or, with INFERENCE_WORKERS > 0, in separate worker processes
+        self.executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="inference")
+        self.pool = None
+        self.distress_scheduler = BatchScheduler(
+            self._run_distress_batch,
+            max_batch_size=settings.DISTRESS_BATCH_MAX_SIZE,
+            max_wait_ms=settings.DISTRESS_BATCH_MAX_WAIT_MS,
+            max_concurrency=max(1, settings.INFERENCE_WORKERS)
+        )
+        
+    def _build_pipelines(self):
+        # Load distress detection model
+        self.distress_model = build_pipeline("audio-classification", settings.HF_MODEL_NAME)
+        
         # Load emotion detection model
-        self.emotion_model = pipeline(
-            "text-classification",
-            model="finiteautomata/bertweet-base-emotion-analysis",
-            token=settings.HF_API_TOKEN
+        self.emotion_model = build_pipeline("text-classification", settings.EMOTION_MODEL_NAME)
+        
+        # Cached results are only reused for the exact same weights and backend
+        self.sampling_rate = self.distress_model.feature_extractor.sampling_rate
+        for name, model in (("distress", self.distress_model), ("emotion", self.emotion_model)):
+            self.model_versions[name] = model_revision(model.model.config)
+    
+    def _load_model_info(self):
+        self.sampling_rate, self.model_versions = load_model_info(
+            settings.HF_MODEL_NAME,
+            settings.EMOTION_MODEL_NAME
         )
     
-    async def detect_distress(self, audio_file):
-        if not self.distress_model:
+    async def load_models(self):
+        if self._load_lock is None:
+            self._load_lock = asyncio.Lock()
+        async with self._load_lock:
+            if self.loaded:
+                return
+            loop = asyncio.get_running_loop()
+            if settings.INFERENCE_WORKERS == 0:
+                await loop.run_in_executor(self.executor, self._build_pipelines)
+            else:
+                # Each worker loads its own copy of the models (workers are
+                # not forked, so nothing is shared); this process only reads
+                # their metadata and never holds the weights
+                await loop.run_in_executor(self.executor, self._load_model_info)
+                self.pool = InferenceWorkerPool(
+                    settings.INFERENCE_WORKERS,
+                    start_method=settings.INFERENCE_WORKER_START_METHOD,
+                    threads_per_worker=settings.INFERENCE_THREADS,
+                    health_interval=settings.INFERENCE_WORKER_HEALTH_INTERVAL_SECONDS,
+                    hang_seconds=settings.INFERENCE_WORKER_HANG_SECONDS
+                )
+                await self.pool.start()
+            self.loaded = True
+    
+    async def close(self):
+        await self.distress_scheduler.close()
+        if self.pool is not None:
+            await self.pool.close()
+            self.pool = None
+    
+    async def get_sampling_rate(self) -> int:
+        if not self.loaded:
+            await self.load_models()
+        return self.sampling_rate
+    
+    def _classify_audio_batch(self, audio_files):
+        with torch.no_grad():
+            return self.distress_model(audio_files, batch_size=len(audio_files))
+    
+    async def _run_distress_batch(self, audio_files):
+        INFERENCE_BATCH_SIZE.observe(len(audio_files), "distress")
+        with timed(INFERENCE_SECONDS, "distress"):
+            if self.pool is not None:
+                return await self.pool.submit("distress", audio_files)
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(self.executor, self._classify_audio_batch, audio_files)
+    
+    async def _run_emotion(self, text):
+        INFERENCE_BATCH_SIZE.observe(1, "emotion")
+        with timed(INFERENCE_SECONDS, "emotion"):
+            if self.pool is not None:
+                return await self.pool.submit("emotion", text)
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(self.executor, self._classify_text, text)
+    
+    def _classify_text(self, text):
+        with torch.no_grad():
+            return self.emotion_model(text)
+    
+    async def detect_distress(self, audio_file, use_cache: bool = True):
+        # Batches run in the scheduler's task; the requesting call is charged
+        # for its whole wait, queueing included
+        with charged("inference_seconds"):
+            return await self._detect_distress(audio_file, use_cache)
+    
+    async def _detect_distress(self, audio_file, use_cache: bool):
+        if not self.loaded:
             await self.load_models()
         
-        result = self.distress_model(audio_file)
+        if not use_cache:
+            return await self.distress_scheduler.submit(audio_file)
+        
+        key = self.cache.key(settings.HF_MODEL_NAME, self.model_versions["distress"], audio_file)
+        result = self.cache.get(key)
+        if result is None:
+            result = await self.distress_scheduler.submit(audio_file)
+            self.cache.set(key, result)
         return result
     
     async def detect_emotion(self, text):
-        if not self.emotion_model:
+        with charged("inference_seconds"):
+            return await self._detect_emotion(text)
+    
+    async def _detect_emotion(self, text):
+        if not self.loaded:
             await self.load_models()
         
-        result = self.emotion_model(text)
+        key = self.cache.key(settings.EMOTION_MODEL_NAME, self.model_versions["emotion"], text)
+        result = self.cache.get(key)
+        if result is None:
+            result = await self._run_emotion(text)
+            self.cache.set(key, result)
         return result
 
-ai_models = AIModels()
\ No newline at end of file
+ai_models = AIModels()
@@ -0,0 +1,158 @@
+import asyncio
+import struct
+from typing import Tuple
+
+import numpy as np
+
+WAVE_FORMAT_PCM = 0x0001
+WAVE_FORMAT_IEEE_FLOAT = 0x0003
+WAVE_FORMAT_EXTENSIBLE = 0xFFFE
+
+class AudioDecodeError(ValueError):
+    pass
+
+class AudioTooLargeError(ValueError):
+    pass
+
+async def read_upload(upload, max_bytes: int, chunk_size: int = 64 * 1024) -> bytearray:
+    # Read the upload in chunks so an oversized clip is rejected before it is
+    # fully buffered, and no intermediate bytes objects pile up
+    data = bytearray()
+    while True:
+        chunk = await upload.read(chunk_size)
+        if not chunk:
+            break
+        if len(data) + len(chunk) > max_bytes:
+            raise AudioTooLargeError(f"Audio upload exceeds {max_bytes} bytes")
+        data += chunk
+    if not data:
+        raise AudioDecodeError("Empty audio upload")
+    return data
+
+def _parse_wav(data) -> Tuple[int, int, int, int, memoryview]:
+    view = memoryview(data)
+    fmt = None
+    samples = None
+    offset = 12
+    while offset + 8 <= len(view):
+        chunk_id = bytes(view[offset:offset + 4])
+        chunk_size = struct.unpack_from("<I", view, offset + 4)[0]
+        body = view[offset + 8:offset + 8 + chunk_size]
+        if chunk_id == b"fmt ":
+            fmt = struct.unpack_from("<HHIIHH", body)
+            if fmt[0] == WAVE_FORMAT_EXTENSIBLE and len(body) >= 26:
+                fmt = (struct.unpack_from("<H", body, 24)[0],) + fmt[1:]
+        elif chunk_id == b"data":
+            samples = body
+        offset += 8 + chunk_size + (chunk_size & 1)
+    if fmt is None or samples is None:
+        raise AudioDecodeError("Malformed WAV file")
+    audio_format, channels, rate, _, _, bits = fmt
+    return audio_format, channels, rate, bits, samples
+
+def _wav_to_float32(data) -> Tuple[np.ndarray, int]:
+    audio_format, channels, rate, bits, samples = _parse_wav(data)
+    if channels < 1 or rate < 1 or bits not in (8, 16, 24, 32, 64):
+        raise AudioDecodeError("Malformed WAV header")
+    usable = len(samples) - len(samples) % (channels * bits // 8)
+    samples = samples[:usable]
+
+    # np.frombuffer views the upload buffer directly; only the float32
+    # conversion below allocates
+    if audio_format == WAVE_FORMAT_IEEE_FLOAT and bits == 32:
+        audio = np.frombuffer(samples, dtype="<f4")
+    elif audio_format == WAVE_FORMAT_IEEE_FLOAT and bits == 64:
+        audio = np.frombuffer(samples, dtype="<f8").astype(np.float32)
+    elif audio_format == WAVE_FORMAT_PCM and bits == 16:
+        audio = np.frombuffer(samples, dtype="<i2").astype(np.float32) / 32768.0
+    elif audio_format == WAVE_FORMAT_PCM and bits == 32:
+        audio = (np.frombuffer(samples, dtype="<i4") / 2147483648.0).astype(np.float32)
+    elif audio_format == WAVE_FORMAT_PCM and bits == 8:
+        audio = (np.frombuffer(samples, dtype=np.uint8).astype(np.float32) - 128.0) / 128.0
+    elif audio_format == WAVE_FORMAT_PCM and bits == 24:
+        raw = np.frombuffer(samples, dtype=np.uint8).reshape(-1, 3).astype(np.int32)
+        ints = raw[:, 0] | (raw[:, 1] << 8) | (raw[:, 2] << 16)
+        ints = np.where(ints >= 1 << 23, ints - (1 << 24), ints)
+        audio = ints.astype(np.float32) / 8388608.0
+    else:
+        raise AudioDecodeError(f"Unsupported WAV encoding (format {audio_format}, {bits} bit)")
+
+    if channels > 1:
+        audio = audio[:len(audio) - len(audio) % channels].reshape(-1, channels).mean(axis=1)
+    return audio, rate
+
+def resample(audio: np.ndarray, from_rate: int, to_rate: int) -> np.ndarray:
+    # Linear interpolation is enough for the speech-band models we run
+    if from_rate == to_rate or len(audio) == 0:
+        return audio
+    length = int(round(len(audio) * to_rate / from_rate))
+    positions = np.arange(length, dtype=np.float64) * (from_rate / to_rate)
+    return np.interp(positions, np.arange(len(audio)), audio).astype(np.float32)
+
+def decode_audio(data, sampling_rate: int) -> np.ndarray:
+    # Decode an in-memory clip to mono float32 at `sampling_rate`. WAV is
+    # parsed in place; other containers are piped through ffmpeg over
+    # stdin/stdout, so nothing touches the disk either way.
+    if len(data) >= 12 and data[:4] == b"RIFF" and data[8:12] == b"WAVE":
+        try:
+            audio, rate = _wav_to_float32(data)
+        except AudioDecodeError:
+            raise
+        except (struct.error, ValueError, ZeroDivisionError) as e:
+            # Truncated chunks and inconsistent headers surface as these
+            raise AudioDecodeError(f"Malformed WAV file: {e}")
+        return np.ascontiguousarray(resample(audio, rate, sampling_rate), dtype=np.float32)
+
+    from transformers.pipelines.audio_utils import ffmpeg_read
+    try:
+        return ffmpeg_read(bytes(data), sampling_rate)
+    except ValueError as e:
+        raise AudioDecodeError(str(e))
+
+async def decode_upload(upload, sampling_rate: int, max_bytes: int, chunk_size: int = 64 * 1024) -> np.ndarray:
+    data = await read_upload(upload, max_bytes, chunk_size)
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(None, decode_audio, data, sampling_rate)
+
+def pcm16_to_float32(frame) -> np.ndarray:
+    # Callers carry an odd trailing byte over to the next frame; dropping it
+    # would shift every later sample by one byte
+    if len(frame) % 2:
+        raise ValueError("16-bit PCM needs an even number of bytes")
+    return np.frombuffer(frame, dtype="<i2").astype(np.float32) / 32768.0
+
+class SlidingWindow:
+    # Ring buffer holding the most recent `size` samples of a stream.
+    # `pending` counts samples that arrived since the last snapshot.
+    def __init__(self, size: int):
+        self.size = size
+        self.buffer = np.zeros(size, dtype=np.float32)
+        self.pos = 0
+        self.filled = 0
+        self.pending = 0
+        self.total = 0
+
+    @property
+    def full(self) -> bool:
+        return self.filled == self.size
+
+    def extend(self, samples: np.ndarray):
+        n = len(samples)
+        self.total += n
+        self.pending += n
+        if n >= self.size:
+            self.buffer[:] = samples[-self.size:]
+            self.pos = 0
+            self.filled = self.size
+            return
+        head = min(n, self.size - self.pos)
+        self.buffer[self.pos:self.pos + head] = samples[:head]
+        self.buffer[:n - head] = samples[head:]
+        self.pos = (self.pos + n) % self.size
+        self.filled = min(self.size, self.filled + n)
+
+    def snapshot(self) -> np.ndarray:
+        self.pending = 0
+        if not self.full:
+            return self.buffer[:self.filled].copy()
+        return np.concatenate((self.buffer[self.pos:], self.buffer[:self.pos]))
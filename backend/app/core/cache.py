@@ -0,0 +1,146 @@
+import hashlib
+import sys
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Hashable, Optional
+
+import numpy as np
+
+_MISSING = object()
+
+class LRUCache:
+    # Least-recently-used cache bounded by entry count and/or approximate bytes,
+    # with a default TTL that individual entries can override. Expired entries
+    # are dropped lazily on access and when space is needed.
+    def __init__(
+        self,
+        max_entries: Optional[int] = None,
+        max_bytes: Optional[int] = None,
+        ttl: Optional[float] = None,
+        sizeof: Callable[[Any], int] = sys.getsizeof,
+        clock: Callable[[], float] = time.monotonic
+    ):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.sizeof = sizeof
+        self.clock = clock
+        self.entries: "OrderedDict[Hashable, tuple]" = OrderedDict()
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def __len__(self):
+        return len(self.entries)
+
+    def __contains__(self, key):
+        return self.get(key, _MISSING, count=False) is not _MISSING
+
+    def get(self, key: Hashable, default: Any = None, count: bool = True) -> Any:
+        entry = self.entries.get(key)
+        if entry is not None:
+            value, expires_at, _ = entry
+            if expires_at is None or expires_at > self.clock():
+                self.entries.move_to_end(key)
+                if count:
+                    self.hits += 1
+                return value
+            self._drop(key)
+        if count:
+            self.misses += 1
+        return default
+
+    def set(self, key: Hashable, value: Any, ttl: Optional[float] = None, expires_at: Optional[float] = None):
+        # expires_at is in the cache clock's timebase; ttl is relative to now
+        if expires_at is None:
+            ttl = self.ttl if ttl is None else ttl
+            expires_at = self.clock() + ttl if ttl is not None else None
+        size = self.sizeof(value)
+        if self.max_bytes is not None and size > self.max_bytes:
+            return
+        if key in self.entries:
+            self._drop(key)
+        self.entries[key] = (value, expires_at, size)
+        self.bytes += size
+        self._shrink()
+
+    def invalidate(self, key: Hashable):
+        if key in self.entries:
+            self._drop(key)
+
+    def invalidate_where(self, predicate: Callable[[Hashable, Any], bool]):
+        for key in [k for k, (v, _, _) in self.entries.items() if predicate(k, v)]:
+            self._drop(key)
+
+    def clear(self):
+        self.entries.clear()
+        self.bytes = 0
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self.entries),
+            "bytes": self.bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_ratio": self.hits / lookups if lookups else 0.0,
+        }
+
+    def _drop(self, key: Hashable):
+        _, _, size = self.entries.pop(key)
+        self.bytes -= size
+
+    def _over_budget(self) -> bool:
+        return (
+            (self.max_entries is not None and len(self.entries) > self.max_entries)
+            or (self.max_bytes is not None and self.bytes > self.max_bytes)
+        )
+
+    def _shrink(self):
+        if not self._over_budget():
+            return
+        # Expired entries go first, then the least recently used ones
+        now = self.clock()
+        for key in [k for k, (_, expires_at, _) in self.entries.items()
+                    if expires_at is not None and expires_at <= now]:
+            self._drop(key)
+        while self._over_budget():
+            _, (_, _, size) = self.entries.popitem(last=False)
+            self.bytes -= size
+            self.evictions += 1
+
+def content_digest(data: Any) -> str:
+    # Stable digest of audio buffers, raw bytes or text
+    digest = hashlib.blake2b(digest_size=20)
+    if isinstance(data, np.ndarray):
+        digest.update(str(data.dtype).encode())
+        digest.update(np.ascontiguousarray(data).data)
+    elif isinstance(data, (bytes, bytearray, memoryview)):
+        digest.update(data)
+    else:
+        digest.update(str(data).encode("utf-8"))
+    return digest.hexdigest()
+
+def result_size(value: Any) -> int:
+    # Rough byte size of a pipeline result (lists of label/score dicts)
+    return len(repr(value))
+
+class InferenceCache:
+    # Content-addressed cache of model outputs: identical audio or text sent to
+    # the same model/version skips inference entirely
+    def __init__(self, max_bytes: int, ttl: float, max_entries: Optional[int] = None):
+        self.cache = LRUCache(max_entries=max_entries, max_bytes=max_bytes, ttl=ttl, sizeof=result_size)
+
+    def key(self, model: str, version: str, data: Any) -> tuple:
+        return (model, version, content_digest(data))
+
+    def get(self, key: tuple):
+        return self.cache.get(key)
+
+    def set(self, key: tuple, result: Any):
+        self.cache.set(key, result)
+
+    def stats(self) -> dict:
+        return self.cache.stats()
@@ -1,14 +1,128 @@
+from sqlalchemy import Date, DateTime, event
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.compiler import compiles
 from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession
 from sqlalchemy.orm import sessionmaker, declarative_base
+from sqlalchemy.pool import AsyncAdaptedQueuePool
+from sqlalchemy.sql.expression import FunctionElement
 from app.config import settings
+from app.core.metrics import instrument_engine
+from typing import Optional
 
 SQLALCHEMY_DATABASE_URL = settings.DATABASE_URL
 
-engine = create_async_engine(SQLALCHEMY_DATABASE_URL, future=True, echo=True)
+def _sqlite_profile(url) -> dict:
+    options = {
+        "connect_args": {
+            # sqlite3's own busy handler and prepared statement cache
+            "timeout": settings.SQLITE_BUSY_TIMEOUT_MS / 1000.0,
+            "cached_statements": settings.SQLITE_STATEMENT_CACHE_SIZE,
+        }
+    }
+    if url.database and url.database != ":memory:":
+        # The aiosqlite default (NullPool) reopens the file and re-applies the
+        # pragmas on every checkout; keep a few connections warm instead
+        options.update(
+            poolclass=AsyncAdaptedQueuePool,
+            pool_size=settings.SQLITE_POOL_SIZE,
+            max_overflow=0,
+            pool_timeout=settings.DB_POOL_TIMEOUT_SECONDS
+        )
+    return options
+
+def _server_profile(url) -> dict:
+    return {
+        "pool_size": settings.DB_POOL_SIZE,
+        "max_overflow": settings.DB_MAX_OVERFLOW,
+        "pool_timeout": settings.DB_POOL_TIMEOUT_SECONDS,
+        "pool_recycle": settings.DB_POOL_RECYCLE_SECONDS,
+        "pool_pre_ping": True,
+    }
+
+ENGINE_PROFILES = {
+    "sqlite": _sqlite_profile,
+    "server": _server_profile,
+}
+
+def _apply_sqlite_pragmas(dbapi_connection, connection_record):
+    # WAL lets readers run alongside the writer, and with synchronous=NORMAL a
+    # commit no longer waits on fsync (the WAL is still crash-safe)
+    cursor = dbapi_connection.cursor()
+    for pragma in (
+        "PRAGMA journal_mode=WAL",
+        "PRAGMA synchronous=NORMAL",
+        f"PRAGMA mmap_size={settings.SQLITE_MMAP_SIZE_BYTES}",
+        f"PRAGMA busy_timeout={settings.SQLITE_BUSY_TIMEOUT_MS}",
+        f"PRAGMA cache_size=-{settings.SQLITE_CACHE_SIZE_KIB}",
+        "PRAGMA temp_store=MEMORY",
+    ):
+        cursor.execute(pragma)
+    cursor.close()
+
+def engine_profile(url: str, profile: Optional[str] = None) -> str:
+    profile = profile or settings.DATABASE_PROFILE
+    if profile is None:
+        profile = "sqlite" if make_url(url).get_backend_name() == "sqlite" else "server"
+    if profile not in ENGINE_PROFILES:
+        raise ValueError(f"Unknown database profile {profile!r}, expected one of {tuple(ENGINE_PROFILES)}")
+    return profile
+
+def build_engine(url: str = SQLALCHEMY_DATABASE_URL, profile: Optional[str] = None, echo: Optional[bool] = None):
+    profile = engine_profile(url, profile)
+    engine = create_async_engine(
+        url,
+        future=True,
+        echo=settings.DATABASE_ECHO if echo is None else echo,
+        **ENGINE_PROFILES[profile](make_url(url))
+    )
+    if profile == "sqlite":
+        event.listen(engine.sync_engine, "connect", _apply_sqlite_pragmas)
+    if settings.METRICS_ENABLED:
+        instrument_engine(engine)
+    return engine
+
+engine = build_engine()
 async_session = sessionmaker(engine, expire_on_commit=False, class_=AsyncSession)
 
 Base = declarative_base()
 
+class utc_now(FunctionElement):
+    # Server-side timestamp default. SQLite stores datetimes as text and
+    # CURRENT_TIMESTAMP has no fractional seconds, while SQLAlchemy writes six
+    # digits; mixing the two breaks comparisons against bound datetimes (a
+    # keyset cursor would match its own row), so SQLite gets the same format
+    type = DateTime(timezone=True)
+    inherit_cache = True
+
+@compiles(utc_now)
+def _utc_now(element, compiler, **kw):
+    return "CURRENT_TIMESTAMP"
+
+@compiles(utc_now, "sqlite")
+def _utc_now_sqlite(element, compiler, **kw):
+    return "(strftime('%Y-%m-%d %H:%M:%f000', 'now'))"
+
+class utc_date(FunctionElement):
+    # The UTC calendar day of a timestamp column. Plain date() on a Postgres
+    # timestamptz uses the session time zone; SQLite stores UTC text already
+    type = Date()
+    inherit_cache = True
+
+@compiles(utc_date)
+def _utc_date(element, compiler, **kw):
+    return "date(timezone('UTC', %s))" % compiler.process(element.clauses, **kw)
+
+@compiles(utc_date, "sqlite")
+def _utc_date_sqlite(element, compiler, **kw):
+    return "date(%s)" % compiler.process(element.clauses, **kw)
+
 async def get_db():
+    # One session and one transaction per request. Endpoints stage their
+    # changes and commit once when done; a request that fails before its
+    # commit is rolled back as a unit.
     async with async_session() as session:
-        yield session
\ No newline at end of file
+        try:
+            yield session
+        except Exception:
+            await session.rollback()
+            raise
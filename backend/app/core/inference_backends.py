@@ -0,0 +1,89 @@
+import os
+from transformers import pipeline, AutoConfig, AutoFeatureExtractor, AutoTokenizer
+from app.config import settings
+import torch
+
+try:
+    import onnxruntime
+    from optimum.onnxruntime import ORTModelForAudioClassification, ORTModelForSequenceClassification
+    ORT_MODEL_CLASSES = {
+        "audio-classification": ORTModelForAudioClassification,
+        "text-classification": ORTModelForSequenceClassification,
+    }
+except ImportError:
+    onnxruntime = None
+    ORT_MODEL_CLASSES = {}
+
+BACKENDS = ("torch", "torch_int8", "onnx")
+
+def _build_torch(task: str, model_name: str):
+    return pipeline(task, model=model_name, token=settings.HF_API_TOKEN)
+
+def _build_torch_int8(task: str, model_name: str):
+    # Dynamic quantization: Linear weights are stored as int8 and activations
+    # are quantized on the fly, which is where wav2vec2/BERT spend their time on CPU
+    classifier = _build_torch(task, model_name)
+    classifier.model = torch.quantization.quantize_dynamic(
+        classifier.model,
+        {torch.nn.Linear},
+        dtype=torch.qint8
+    )
+    return classifier
+
+def _build_onnx(task: str, model_name: str):
+    if task not in ORT_MODEL_CLASSES:
+        raise RuntimeError("The onnx backend requires `pip install optimum[onnxruntime]`")
+    model_class = ORT_MODEL_CLASSES[task]
+
+    session_options = onnxruntime.SessionOptions()
+    session_options.graph_optimization_level = onnxruntime.GraphOptimizationLevel.ORT_ENABLE_ALL
+    if settings.INFERENCE_THREADS:
+        session_options.intra_op_num_threads = settings.INFERENCE_THREADS
+
+    # Export once and reuse the ONNX graph on later starts
+    export_dir = os.path.join(settings.ONNX_MODEL_DIR, model_name.replace("/", "__"))
+    if os.path.exists(os.path.join(export_dir, "model.onnx")):
+        model = model_class.from_pretrained(export_dir, session_options=session_options)
+    else:
+        model = model_class.from_pretrained(
+            model_name,
+            export=True,
+            token=settings.HF_API_TOKEN,
+            session_options=session_options
+        )
+        model.save_pretrained(export_dir)
+
+    if task == "audio-classification":
+        preprocessor = {"feature_extractor": AutoFeatureExtractor.from_pretrained(model_name, token=settings.HF_API_TOKEN)}
+    else:
+        preprocessor = {"tokenizer": AutoTokenizer.from_pretrained(model_name, token=settings.HF_API_TOKEN)}
+    return pipeline(task, model=model, **preprocessor)
+
+BUILDERS = {
+    "torch": _build_torch,
+    "torch_int8": _build_torch_int8,
+    "onnx": _build_onnx,
+}
+
+def build_pipeline(task: str, model_name: str, backend: str = None):
+    backend = backend or settings.INFERENCE_BACKEND
+    if backend not in BUILDERS:
+        raise ValueError(f"Unknown inference backend {backend!r}, expected one of {BACKENDS}")
+    if settings.INFERENCE_THREADS:
+        torch.set_num_threads(settings.INFERENCE_THREADS)
+    return BUILDERS[backend](task, model_name)
+
+def model_revision(config) -> str:
+    # Hub commit the weights came from; "local" for models loaded from disk
+    return f"{settings.INFERENCE_BACKEND}:{getattr(config, '_commit_hash', None) or 'local'}"
+
+def load_model_info(audio_model: str, text_model: str):
+    # What the API process needs when inference runs in worker processes:
+    # the audio sampling rate and the model revisions, read from the
+    # preprocessor and config files without loading any weights
+    feature_extractor = AutoFeatureExtractor.from_pretrained(audio_model, token=settings.HF_API_TOKEN)
+    versions = {
+        "distress": model_revision(AutoConfig.from_pretrained(audio_model, token=settings.HF_API_TOKEN)),
+        "emotion": model_revision(AutoConfig.from_pretrained(text_model, token=settings.HF_API_TOKEN)),
+    }
+    return feature_extractor.sampling_rate, versions
@@ -0,0 +1,221 @@
+import asyncio
+import itertools
+import multiprocessing
+import queue
+import threading
+import time
+from typing import Any, Dict, Optional
+
+class InferenceWorkerError(RuntimeError):
+    pass
+
+def _worker_main(worker_id: int, threads: Optional[int], requests, responses):
+    # Entry point of a worker process; each worker loads its own copy of the
+    # models (the API process never loads them when the pool is enabled)
+    import torch
+    from app.core.ai_models import ai_models
+
+    torch.set_num_threads(threads or 1)
+    if not ai_models.distress_model:
+        ai_models._build_pipelines()
+    handlers = {
+        "ping": lambda payload: "pong",
+        "distress": ai_models._classify_audio_batch,
+        "emotion": ai_models._classify_text,
+    }
+    responses.put((None, True, "ready"))
+
+    while True:
+        message = requests.get()
+        if message is None:
+            return
+        request_id, kind, payload = message
+        try:
+            responses.put((request_id, True, handlers[kind](payload)))
+        except Exception as e:
+            responses.put((request_id, False, f"{type(e).__name__}: {e}"))
+
+class WorkerHandle:
+    def __init__(self, worker_id: int, process, requests, responses):
+        self.worker_id = worker_id
+        self.process = process
+        self.requests = requests
+        self.responses = responses
+        self.in_flight: Dict[int, float] = {}
+        self.ready = None
+        self.stopped = threading.Event()
+        self.reader = None
+        self.restarts = 0
+
+class InferenceWorkerPool:
+    # Runs model inference in separate processes so CPU-bound torch work never
+    # holds the API process's GIL. Requests go to the least-loaded worker and
+    # are answered through asyncio futures. A monitor task pings idle workers,
+    # and restarts any that exited or sat on a request past `hang_seconds`,
+    # failing that worker's in-flight requests.
+    def __init__(
+        self,
+        workers: int,
+        start_method: str = "forkserver",
+        threads_per_worker: Optional[int] = None,
+        health_interval: float = 5.0,
+        hang_seconds: float = 60.0,
+        startup_timeout: float = 300.0
+    ):
+        self.size = workers
+        # The API process already runs the event loop, executor threads and
+        # the torch thread pool, whose locks a forked child can inherit held.
+        # forkserver forks workers from a clean single-threaded server (with
+        # torch preimported); spawn is the fallback where it is unavailable.
+        if start_method not in multiprocessing.get_all_start_methods():
+            start_method = "spawn"
+        self.context = multiprocessing.get_context(start_method)
+        if start_method == "forkserver":
+            self.context.set_forkserver_preload(["torch"])
+        self.threads_per_worker = threads_per_worker
+        self.health_interval = health_interval
+        self.hang_seconds = hang_seconds
+        self.startup_timeout = startup_timeout
+        self.workers: Dict[int, WorkerHandle] = {}
+        self.pending: Dict[int, asyncio.Future] = {}
+        self.ids = itertools.count()
+        self.loop = None
+        self.monitor = None
+
+    async def start(self):
+        self.loop = asyncio.get_running_loop()
+        for worker_id in range(self.size):
+            self._spawn(worker_id)
+        await asyncio.wait_for(
+            asyncio.gather(*(worker.ready for worker in self.workers.values())),
+            self.startup_timeout
+        )
+        self.monitor = self.loop.create_task(self._monitor())
+
+    async def close(self):
+        if self.monitor is not None:
+            self.monitor.cancel()
+        for worker in self.workers.values():
+            worker.requests.put(None)
+        await asyncio.gather(*(self._stop(worker, graceful=True) for worker in self.workers.values()))
+        self.workers.clear()
+
+    def stats(self) -> dict:
+        return {
+            worker.worker_id: {
+                "pid": worker.process.pid,
+                "alive": worker.process.is_alive(),
+                "in_flight": len(worker.in_flight),
+                "restarts": worker.restarts,
+            }
+            for worker in self.workers.values()
+        }
+
+    async def submit(self, kind: str, payload: Any, timeout: Optional[float] = None) -> Any:
+        alive = [w for w in self.workers.values() if w.process.is_alive() and w.ready.done()]
+        if not alive:
+            raise InferenceWorkerError("No inference workers available")
+        worker = min(alive, key=lambda w: len(w.in_flight))
+        return await self._submit_to(worker, kind, payload, timeout)
+
+    async def _submit_to(self, worker: WorkerHandle, kind: str, payload: Any, timeout: Optional[float] = None):
+        request_id = next(self.ids)
+        future = self.loop.create_future()
+        self.pending[request_id] = future
+        worker.in_flight[request_id] = time.monotonic()
+        try:
+            # multiprocessing.Queue.put hands off to a feeder thread and never blocks the loop
+            worker.requests.put((request_id, kind, payload))
+            return await asyncio.wait_for(future, timeout)
+        finally:
+            self.pending.pop(request_id, None)
+            worker.in_flight.pop(request_id, None)
+
+    def _spawn(self, worker_id: int):
+        requests = self.context.Queue()
+        responses = self.context.Queue()
+        process = self.context.Process(
+            target=_worker_main,
+            args=(worker_id, self.threads_per_worker, requests, responses),
+            name=f"inference-worker-{worker_id}",
+            daemon=True
+        )
+        process.start()
+
+        previous = self.workers.get(worker_id)
+        worker = WorkerHandle(worker_id, process, requests, responses)
+        worker.restarts = previous.restarts + 1 if previous else 0
+        worker.ready = self.loop.create_future()
+        # One reader thread per worker: a crashed worker can only corrupt its
+        # own response queue, which is thrown away on restart
+        worker.reader = threading.Thread(
+            target=self._read_responses,
+            args=(worker,),
+            name=f"inference-reader-{worker_id}",
+            daemon=True
+        )
+        worker.reader.start()
+        self.workers[worker_id] = worker
+
+    def _read_responses(self, worker: WorkerHandle):
+        while not worker.stopped.is_set():
+            try:
+                message = worker.responses.get(timeout=0.5)
+            except queue.Empty:
+                continue
+            except (EOFError, OSError):
+                return
+            self.loop.call_soon_threadsafe(self._resolve, worker, *message)
+
+    def _resolve(self, worker: WorkerHandle, request_id, ok: bool, value: Any):
+        if request_id is None:
+            if not worker.ready.done():
+                worker.ready.set_result(True)
+            return
+        future = self.pending.get(request_id)
+        if future is None or future.done():
+            return
+        if ok:
+            future.set_result(value)
+        else:
+            future.set_exception(InferenceWorkerError(value))
+
+    async def _stop(self, worker: WorkerHandle, graceful: bool = False):
+        if graceful:
+            await self.loop.run_in_executor(None, worker.process.join, 5)
+        if worker.process.is_alive():
+            worker.process.kill()
+            await self.loop.run_in_executor(None, worker.process.join, 5)
+        worker.stopped.set()
+        for request_id in list(worker.in_flight):
+            future = self.pending.get(request_id)
+            if future is not None and not future.done():
+                future.set_exception(InferenceWorkerError(
+                    f"Inference worker {worker.worker_id} died while handling the request"
+                ))
+        if worker.ready is not None and not worker.ready.done():
+            worker.ready.cancel()
+
+    async def _restart(self, worker: WorkerHandle, reason: str):
+        print(f"Restarting inference worker {worker.worker_id}: {reason}")
+        await self._stop(worker)
+        self._spawn(worker.worker_id)
+
+    async def _monitor(self):
+        while True:
+            await asyncio.sleep(self.health_interval)
+            now = time.monotonic()
+            for worker in list(self.workers.values()):
+                try:
+                    if not worker.process.is_alive():
+                        await self._restart(worker, f"exited with code {worker.process.exitcode}")
+                    elif worker.in_flight:
+                        oldest = min(worker.in_flight.values())
+                        if now - oldest > self.hang_seconds:
+                            await self._restart(worker, f"no response for {now - oldest:.0f}s")
+                    elif worker.ready.done():
+                        await self._submit_to(worker, "ping", None, timeout=self.hang_seconds)
+                except asyncio.TimeoutError:
+                    await self._restart(worker, "health check timed out")
+                except Exception as e:
+                    print(f"Inference worker {worker.worker_id} health check failed: {e}")
@@ -0,0 +1,111 @@
+import asyncio
+from concurrent.futures import Executor
+from typing import Any, Awaitable, Callable, List, Optional, Tuple, Union
+
+class BatchScheduler:
+    # Dynamic micro-batching: concurrent submit() calls are queued and handed to
+    # `run_batch` together, once `max_batch_size` items are waiting or the oldest
+    # item has waited `max_wait_ms`. A blocking run_batch runs on `executor`, so
+    # the event loop keeps serving other requests while a batch is in flight; a
+    # coroutine function (e.g. one that hands off to worker processes) is awaited.
+    def __init__(
+        self,
+        run_batch: Callable[[List[Any]], Union[List[Any], Awaitable[List[Any]]]],
+        max_batch_size: int = 8,
+        max_wait_ms: float = 10,
+        executor: Optional[Executor] = None,
+        max_concurrency: int = 1
+    ):
+        self.run_batch = run_batch
+        self.max_batch_size = max(1, max_batch_size)
+        self.max_wait = max_wait_ms / 1000.0
+        self.executor = executor
+        self.max_concurrency = max(1, max_concurrency)
+        self.queue: Optional[asyncio.Queue] = None
+        self.slots: Optional[asyncio.Semaphore] = None
+        self.worker: Optional[asyncio.Task] = None
+
+    def _ensure_started(self):
+        if self.worker is None or self.worker.done():
+            self.queue = asyncio.Queue()
+            self.slots = asyncio.Semaphore(self.max_concurrency)
+            self.worker = asyncio.get_running_loop().create_task(self._run())
+
+    async def submit(self, item: Any) -> Any:
+        self._ensure_started()
+        future = asyncio.get_running_loop().create_future()
+        self.queue.put_nowait((item, future))
+        return await future
+
+    async def close(self):
+        if self.worker is not None:
+            self.worker.cancel()
+            try:
+                await self.worker
+            except asyncio.CancelledError:
+                pass
+            self.worker = None
+
+    async def _collect(self) -> List[Tuple[Any, asyncio.Future]]:
+        loop = asyncio.get_running_loop()
+        batch = [await self.queue.get()]
+        deadline = loop.time() + self.max_wait
+        while len(batch) < self.max_batch_size:
+            if not self.queue.empty():
+                batch.append(self.queue.get_nowait())
+                continue
+            timeout = deadline - loop.time()
+            if timeout <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(self.queue.get(), timeout))
+            except asyncio.TimeoutError:
+                break
+        # Callers that gave up (e.g. client disconnected) are dropped from the batch
+        return [(item, future) for item, future in batch if not future.done()]
+
+    async def _execute(self, items: List[Any]) -> List[Any]:
+        if asyncio.iscoroutinefunction(self.run_batch):
+            return await self.run_batch(items)
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self.executor, self.run_batch, items)
+
+    async def _run(self):
+        # Up to max_concurrency batches are in flight; while they run, the
+        # next batch keeps filling up in the queue
+        while True:
+            await self.slots.acquire()
+            try:
+                batch = await self._collect()
+            except BaseException:
+                self.slots.release()
+                raise
+            if not batch:
+                self.slots.release()
+                continue
+            asyncio.get_running_loop().create_task(self._dispatch(batch))
+
+    async def _dispatch(self, batch: List[Tuple[Any, asyncio.Future]]):
+        try:
+            items = [item for item, _ in batch]
+            try:
+                results = await self._execute(items)
+            except Exception:
+                # One bad input must not fail everyone it was batched with:
+                # retry the items one by one so only the culprit sees the error
+                for item, future in batch:
+                    try:
+                        result = (await self._execute([item]))[0]
+                    except Exception as e:
+                        if not future.done():
+                            future.set_exception(e)
+                    else:
+                        if not future.done():
+                            future.set_result(result)
+                return
+
+            for (_, future), result in zip(batch, results):
+                if not future.done():
+                    future.set_result(result)
+        finally:
+            self.slots.release()
@@ -0,0 +1,158 @@
+from sqlalchemy import text
+from sqlalchemy.dialects import postgresql, sqlite
+from app.config import settings
+from app.core.database import async_session
+from app.models.user import UserLocation
+from datetime import datetime
+from typing import Dict, List, Optional
+import asyncio
+import uuid
+
+class BufferedFix:
+    __slots__ = ("user_id", "latitude", "longitude", "accuracy", "timestamp")
+
+    def __init__(self, user_id: str, latitude, longitude, accuracy, timestamp: datetime):
+        self.user_id = user_id
+        self.latitude = latitude
+        self.longitude = longitude
+        self.accuracy = accuracy
+        self.timestamp = timestamp
+
+class LocationWriteBuffer:
+    # Write-behind buffer for user_locations. Devices report far more often than
+    # anyone reads, so only the newest fix per user is kept in memory and all of
+    # them are written with one bulk UPSERT per flush instead of a SELECT,
+    # INSERT/UPDATE and commit per fix. Flushes run every `flush_interval`
+    # seconds, as soon as `max_pending` users are waiting, and on shutdown, so
+    # at most one interval of fixes is lost if the process dies.
+    def __init__(self, session_factory, flush_interval: float, max_pending: int, rows_per_statement: int):
+        self.session_factory = session_factory
+        self.flush_interval = flush_interval
+        self.max_pending = max_pending
+        self.rows_per_statement = rows_per_statement
+        self.pending: Dict[str, BufferedFix] = {}
+        self.task: Optional[asyncio.Task] = None
+        self.wakeup: Optional[asyncio.Event] = None
+        self.lock: Optional[asyncio.Lock] = None
+        self.flushed = 0
+        self.coalesced = 0
+
+    def start(self):
+        self.wakeup = asyncio.Event()
+        self.lock = asyncio.Lock()
+        self.task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self.task is not None:
+            self.task.cancel()
+            await asyncio.gather(self.task, return_exceptions=True)
+            self.task = None
+        await self.flush()
+
+    def add(self, user_id: str, latitude, longitude, accuracy, timestamp: datetime) -> bool:
+        # Returns False when a newer fix for the user is already buffered
+        current = self.pending.get(user_id)
+        if current is not None:
+            if current.timestamp > timestamp:
+                return False
+            self.coalesced += 1
+        self.pending[user_id] = BufferedFix(user_id, latitude, longitude, accuracy, timestamp)
+        if len(self.pending) >= self.max_pending and self.wakeup is not None:
+            self.wakeup.set()
+        return True
+
+    def get(self, user_id: str) -> Optional[BufferedFix]:
+        return self.pending.get(user_id)
+
+    async def latest(self, db, user_id: str):
+        # Buffered fixes are newer than anything in the table
+        return self.get(user_id) or await UserLocation.get_by_user(db, user_id)
+
+    def stats(self) -> dict:
+        return {"pending": len(self.pending), "flushed": self.flushed, "coalesced": self.coalesced}
+
+    async def _run(self):
+        while True:
+            try:
+                await asyncio.wait_for(self.wakeup.wait(), self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            self.wakeup.clear()
+            try:
+                await self.flush()
+            except Exception as e:
+                print(f"Location flush failed: {e}")
+
+    async def flush(self) -> int:
+        if self.lock is None:
+            self.lock = asyncio.Lock()
+        async with self.lock:
+            batch, self.pending = self.pending, {}
+            if not batch:
+                return 0
+            try:
+                async with self.session_factory() as db:
+                    fixes = list(batch.values())
+                    for start in range(0, len(fixes), self.rows_per_statement):
+                        await db.execute(self._upsert(db, fixes[start:start + self.rows_per_statement]))
+                    await db.commit()
+            except BaseException:
+                # Put the batch back unless a newer fix arrived meanwhile
+                for user_id, fix in batch.items():
+                    current = self.pending.get(user_id)
+                    if current is None or current.timestamp < fix.timestamp:
+                        self.pending[user_id] = fix
+                raise
+            self.flushed += len(batch)
+            return len(batch)
+
+    def _upsert(self, db, fixes: List[BufferedFix]):
+        table = UserLocation.__table__
+        insert = postgresql.insert if db.bind.dialect.name == "postgresql" else sqlite.insert
+        stmt = insert(table).values([
+            {
+                "id": str(uuid.uuid4()),
+                "user_id": fix.user_id,
+                "latitude": fix.latitude,
+                "longitude": fix.longitude,
+                "accuracy": fix.accuracy,
+                "timestamp": fix.timestamp,
+            }
+            for fix in fixes
+        ])
+        # A fix that lost the race against a newer row (e.g. written by another
+        # worker process) leaves that row alone
+        return stmt.on_conflict_do_update(
+            index_elements=["user_id"],
+            set_={
+                "latitude": stmt.excluded.latitude,
+                "longitude": stmt.excluded.longitude,
+                "accuracy": stmt.excluded.accuracy,
+                "timestamp": stmt.excluded.timestamp,
+            },
+            where=table.c.timestamp <= stmt.excluded.timestamp
+        )
+
+async def ensure_location_upsert_index(conn):
+    # The UPSERT needs a unique index on user_id (declared on the model, so
+    # fresh databases already have it). Databases created before it may hold
+    # several rows per user: those users keep their newest row, superseded
+    # ones are deleted, and every other row is left alone.
+    await conn.execute(text(
+        "DELETE FROM user_locations WHERE id IN ("
+        " SELECT id FROM ("
+        "  SELECT id, ROW_NUMBER() OVER (PARTITION BY user_id ORDER BY timestamp DESC, id DESC) AS rn"
+        "  FROM user_locations"
+        "  WHERE user_id IN (SELECT user_id FROM user_locations GROUP BY user_id HAVING COUNT(*) > 1)"
+        " ) ranked WHERE rn > 1"
+        ")"
+    ))
+    index = next(index for index in UserLocation.__table__.indexes if index.name == "ux_user_locations_user_id")
+    await conn.run_sync(lambda sync_conn: index.create(sync_conn, checkfirst=True))
+
+location_buffer = LocationWriteBuffer(
+    async_session,
+    flush_interval=settings.LOCATION_FLUSH_INTERVAL_SECONDS,
+    max_pending=settings.LOCATION_FLUSH_MAX_PENDING,
+    rows_per_statement=settings.LOCATION_FLUSH_ROWS_PER_STATEMENT
+)
@@ -0,0 +1,238 @@
+from array import array
+from sqlalchemy import select, and_
+from app.config import settings
+from app.core.database import async_session
+from app.core.utils import simplify_track
+from app.models.location_track import LocationTrack
+from datetime import datetime, timezone
+from typing import Dict, List, Optional, Tuple
+import asyncio
+import time
+
+import numpy as np
+
+Track = Tuple[np.ndarray, np.ndarray, np.ndarray]  # (epoch ms, latitudes, longitudes)
+
+def to_epoch_ms(timestamp: datetime) -> int:
+    # Naive datetimes are UTC, like the rest of the API
+    if timestamp.tzinfo is None:
+        timestamp = timestamp.replace(tzinfo=timezone.utc)
+    return int(timestamp.timestamp() * 1000)
+
+def empty_track() -> Track:
+    return np.empty(0, np.int64), np.empty(0, np.float32), np.empty(0, np.float32)
+
+class TrackBucket:
+    # Points of one user within one time bucket, in time order, held in packed
+    # arrays: ~12 bytes per point instead of an object per fix
+    __slots__ = ("user_id", "start_ms", "lats", "lngs", "deltas", "last_ms")
+
+    def __init__(self, user_id: str, start_ms: int):
+        self.user_id = user_id
+        self.start_ms = start_ms
+        self.lats = array("f")
+        self.lngs = array("f")
+        self.deltas = array("I")
+        self.last_ms = start_ms
+
+    def __len__(self):
+        return len(self.deltas)
+
+    def append(self, t_ms: int, lat: float, lng: float):
+        if t_ms < self.last_ms:
+            # Late fix: rare, so it takes the slow path of re-encoding the bucket
+            times, lats, lngs = self.columns()
+            i = int(np.searchsorted(times, t_ms, side="right"))
+            self.load(np.insert(times, i, t_ms), np.insert(lats, i, lat), np.insert(lngs, i, lng))
+            return
+        self.deltas.append(t_ms - self.last_ms)
+        self.lats.append(lat)
+        self.lngs.append(lng)
+        self.last_ms = t_ms
+
+    def columns(self) -> Track:
+        # Copies: a numpy view would pin the arrays and make append() fail
+        times = self.start_ms + np.cumsum(np.frombuffer(self.deltas, dtype=np.uint32), dtype=np.int64)
+        return times, np.array(self.lats, dtype=np.float32), np.array(self.lngs, dtype=np.float32)
+
+    def load(self, times: np.ndarray, lats: np.ndarray, lngs: np.ndarray):
+        self.deltas = array("I", np.diff(times, prepend=self.start_ms).astype(np.uint32).tobytes())
+        self.lats = array("f", lats.astype(np.float32).tobytes())
+        self.lngs = array("f", lngs.astype(np.float32).tobytes())
+        self.last_ms = int(times[-1]) if len(times) else self.start_ms
+
+def decode_track(start_ms: int, lat_blob: bytes, lng_blob: bytes, delta_blob: bytes) -> Track:
+    times = start_ms + np.cumsum(np.frombuffer(delta_blob, dtype="<u4"), dtype=np.int64)
+    return times, np.frombuffer(lat_blob, dtype="<f4"), np.frombuffer(lng_blob, dtype="<f4")
+
+def encode_track(start_ms: int, times: np.ndarray, lats: np.ndarray, lngs: np.ndarray) -> Tuple[bytes, bytes, bytes]:
+    deltas = np.diff(times, prepend=start_ms).astype("<u4")
+    return lats.astype("<f4").tobytes(), lngs.astype("<f4").tobytes(), deltas.tobytes()
+
+def merge_tracks(tracks: List[Track]) -> Track:
+    tracks = [track for track in tracks if len(track[0])]
+    if not tracks:
+        return empty_track()
+    if len(tracks) == 1:
+        return tracks[0]
+    times = np.concatenate([t for t, _, _ in tracks])
+    order = np.argsort(times, kind="stable")
+    return (
+        times[order],
+        np.concatenate([lat for _, lat, _ in tracks])[order],
+        np.concatenate([lng for _, _, lng in tracks])[order],
+    )
+
+def slice_track(track: Track, start_ms: int, end_ms: int) -> Track:
+    times, lats, lngs = track
+    lo, hi = np.searchsorted(times, [start_ms, end_ms], side="left")
+    return times[lo:hi], lats[lo:hi], lngs[lo:hi]
+
+class LocationHistoryStore:
+    # Per-user trajectories split into fixed time buckets. The current buckets
+    # live in memory; once a bucket has been closed for `seal_after` seconds it
+    # is written to location_tracks as packed blobs and dropped from memory.
+    # Buckets older than `simplify_after` are reduced with Douglas-Peucker
+    # (`tolerance_m`), which keeps the shape of a track at a fraction of the points.
+    def __init__(self, session_factory, bucket_seconds: int, seal_after: float,
+                 simplify_after: float, tolerance_m: float, flush_interval: float):
+        self.session_factory = session_factory
+        self.bucket_ms = int(bucket_seconds * 1000)
+        self.seal_after_ms = int(seal_after * 1000)
+        self.simplify_after_ms = int(simplify_after * 1000)
+        self.tolerance_m = tolerance_m
+        self.flush_interval = flush_interval
+        self.buckets: Dict[Tuple[str, int], TrackBucket] = {}
+        self.sealing: Dict[Tuple[str, int], TrackBucket] = {}
+        self.task: Optional[asyncio.Task] = None
+
+    def start(self):
+        self.task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self.task is not None:
+            self.task.cancel()
+            await asyncio.gather(self.task, return_exceptions=True)
+            self.task = None
+        await self.persist(everything=True)
+
+    def append(self, user_id: str, latitude: float, longitude: float, timestamp: datetime):
+        t_ms = to_epoch_ms(timestamp)
+        start_ms = t_ms - t_ms % self.bucket_ms
+        bucket = self.buckets.get((user_id, start_ms))
+        if bucket is None:
+            bucket = self.buckets[(user_id, start_ms)] = TrackBucket(user_id, start_ms)
+        bucket.append(t_ms, latitude, longitude)
+
+    def point_count(self) -> int:
+        return sum(len(bucket) for bucket in self.buckets.values())
+
+    def read_memory(self, user_id: str, start_ms: int, end_ms: int) -> List[Track]:
+        tracks = []
+        first = start_ms - start_ms % self.bucket_ms
+        for bucket_start in range(first, end_ms, self.bucket_ms):
+            for buckets in (self.buckets, self.sealing):
+                bucket = buckets.get((user_id, bucket_start))
+                if bucket is not None and len(bucket):
+                    tracks.append(slice_track(bucket.columns(), start_ms, end_ms))
+        return tracks
+
+    async def read(self, db, user_id: str, start: datetime, end: datetime) -> Track:
+        # Column arrays for [start, end), from persisted blobs plus the
+        # in-memory buckets; no per-point objects are created
+        start_ms, end_ms = to_epoch_ms(start), to_epoch_ms(end)
+        result = await db.execute(LocationTrack.range_query(user_id, start_ms, end_ms, self.bucket_ms))
+        tracks = [
+            slice_track(decode_track(*row), start_ms, end_ms)
+            for row in result.all()
+        ]
+        tracks.extend(self.read_memory(user_id, start_ms, end_ms))
+        return merge_tracks(tracks)
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(self.flush_interval)
+            try:
+                await self.persist()
+                await self.compact()
+            except Exception as e:
+                print(f"Location history flush failed: {e}")
+
+    async def persist(self, everything: bool = False) -> int:
+        # Late fixes for a bucket that is being written start a new in-memory
+        # bucket, which is merged into the stored row on the next pass
+        cutoff = int(time.time() * 1000) - self.seal_after_ms
+        keys = [
+            key for key in self.buckets
+            if everything or key[1] + self.bucket_ms <= cutoff
+        ]
+        if not keys:
+            return 0
+        for key in keys:
+            self.sealing[key] = self.buckets.pop(key)
+        try:
+            await self._write([self.sealing[key] for key in keys])
+        except BaseException:
+            for key in keys:
+                bucket = self.sealing.pop(key)
+                late = self.buckets.get(key)
+                if late is not None:
+                    times, lats, lngs = merge_tracks([bucket.columns(), late.columns()])
+                    bucket.load(times, lats, lngs)
+                self.buckets[key] = bucket
+            raise
+        for key in keys:
+            self.sealing.pop(key, None)
+        return len(keys)
+
+    async def _write(self, buckets: List[TrackBucket]):
+        async with self.session_factory() as db:
+            existing = await db.execute(
+                select(LocationTrack).where(and_(
+                    LocationTrack.user_id.in_({b.user_id for b in buckets}),
+                    LocationTrack.bucket_start_ms.in_({b.start_ms for b in buckets})
+                ))
+            )
+            stored = {(row.user_id, row.bucket_start_ms): row for row in existing.scalars().all()}
+            for bucket in buckets:
+                row = stored.get((bucket.user_id, bucket.start_ms))
+                track = bucket.columns()
+                if row is None:
+                    row = LocationTrack(user_id=bucket.user_id, bucket_start_ms=bucket.start_ms, simplified=False)
+                    db.add(row)
+                else:
+                    track = merge_tracks([
+                        decode_track(row.bucket_start_ms, row.latitudes, row.longitudes, row.time_deltas),
+                        track
+                    ])
+                    # The late points are unsimplified; compaction runs again
+                    row.simplified = False
+                self._store(row, track)
+            await db.commit()
+
+    async def compact(self, limit: int = 500) -> int:
+        cutoff = int(time.time() * 1000) - self.simplify_after_ms
+        async with self.session_factory() as db:
+            result = await db.execute(LocationTrack.compaction_query(cutoff, self.bucket_ms, limit))
+            rows = result.scalars().all()
+            for row in rows:
+                times, lats, lngs = decode_track(row.bucket_start_ms, row.latitudes, row.longitudes, row.time_deltas)
+                keep = simplify_track(lats, lngs, self.tolerance_m)
+                self._store(row, (times[keep], lats[keep], lngs[keep]))
+                row.simplified = True
+            await db.commit()
+            return len(rows)
+
+    def _store(self, row: LocationTrack, track: Track):
+        times, lats, lngs = track
+        row.latitudes, row.longitudes, row.time_deltas = encode_track(row.bucket_start_ms, times, lats, lngs)
+        row.point_count = len(times)
+
+location_history = LocationHistoryStore(
+    async_session,
+    bucket_seconds=settings.LOCATION_HISTORY_BUCKET_SECONDS,
+    seal_after=settings.LOCATION_HISTORY_SEAL_AFTER_SECONDS,
+    simplify_after=settings.LOCATION_HISTORY_SIMPLIFY_AFTER_SECONDS,
+    tolerance_m=settings.LOCATION_HISTORY_SIMPLIFY_TOLERANCE_M,
+    flush_interval=settings.LOCATION_HISTORY_FLUSH_INTERVAL_SECONDS
+)
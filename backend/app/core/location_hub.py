@@ -0,0 +1,85 @@
+from collections import OrderedDict
+from app.config import settings
+from typing import Dict, Iterable, List, Optional, Set
+import asyncio
+
+class LocationSubscription:
+    # Mailbox of one subscriber holding at most one fix per tracked user. A
+    # consumer that falls behind only ever receives the newest position of each
+    # user; superseded fixes are dropped instead of queueing up.
+    def __init__(self, user_ids: Set[str], max_pending: int):
+        self.user_ids = user_ids
+        self.max_pending = max_pending
+        self.pending: "OrderedDict[str, object]" = OrderedDict()
+        self.ready = asyncio.Event()
+        self.coalesced = 0
+
+    def offer(self, fix):
+        if fix.user_id in self.pending:
+            self.coalesced += 1
+        elif len(self.pending) >= self.max_pending:
+            self.pending.popitem(last=False)
+            self.coalesced += 1
+        self.pending[fix.user_id] = fix
+        self.ready.set()
+
+    async def next_batch(self) -> List[object]:
+        await self.ready.wait()
+        self.ready.clear()
+        batch = list(self.pending.values())
+        self.pending.clear()
+        return batch
+
+class LocationHub:
+    # Latest known position of users reporting to this process, and the live
+    # subscribers to each of them. Fixes are pushed to subscribers as they
+    # arrive, so responders no longer poll the database. At most `max_users`
+    # positions are kept; the least recently updated are dropped first.
+    def __init__(self, max_pending: int, max_users: int):
+        self.max_pending = max_pending
+        self.max_users = max_users
+        self.latest: "OrderedDict[str, object]" = OrderedDict()
+        self.subscribers: Dict[str, Set[LocationSubscription]] = {}
+
+    def get(self, user_id: str):
+        return self.latest.get(user_id)
+
+    def publish(self, fix):
+        current = self.latest.get(fix.user_id)
+        if current is not None and current.timestamp > fix.timestamp:
+            return
+        self.latest[fix.user_id] = fix
+        self.latest.move_to_end(fix.user_id)
+        while len(self.latest) > self.max_users:
+            self.latest.popitem(last=False)
+        for subscription in self.subscribers.get(fix.user_id, ()):
+            subscription.offer(fix)
+
+    def subscribe(self, user_ids: Iterable[str]) -> LocationSubscription:
+        subscription = LocationSubscription(set(user_ids), self.max_pending)
+        for user_id in subscription.user_ids:
+            self.subscribers.setdefault(user_id, set()).add(subscription)
+            # New subscribers start from the last known position
+            if user_id in self.latest:
+                subscription.offer(self.latest[user_id])
+        return subscription
+
+    def unsubscribe(self, subscription: LocationSubscription):
+        for user_id in subscription.user_ids:
+            subscribers = self.subscribers.get(user_id)
+            if subscribers is None:
+                continue
+            subscribers.discard(subscription)
+            if not subscribers:
+                del self.subscribers[user_id]
+
+    def stats(self) -> dict:
+        return {
+            "tracked_users": len(self.latest),
+            "subscribed_users": len(self.subscribers),
+        }
+
+location_hub = LocationHub(
+    max_pending=settings.LOCATION_STREAM_MAX_PENDING,
+    max_users=settings.LOCATION_HUB_MAX_USERS
+)
@@ -0,0 +1,318 @@
+import re
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from sqlalchemy import event
+
+# Process-local metrics in the Prometheus text format. Every observation is
+# made on the event loop thread (engine events run in SQLAlchemy's greenlet on
+# the loop, and executor work is timed by the coroutine awaiting it), so the
+# counters are plain ints and floats with no locks. Each worker process serves
+# its own series; Prometheus aggregates across them.
+
+CONTENT_TYPE = "text/plain; version=0.0.4"
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+STATEMENT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 1.0)
+COUNT_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100, 200)
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+def _labels(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+def _number(value: float) -> str:
+    return repr(float(value)) if not float(value).is_integer() else str(int(value))
+
+class Counter:
+    kind = "counter"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.series: Dict[tuple, float] = {}
+
+    def inc(self, *labelvalues: str, amount: float = 1):
+        self.series[labelvalues] = self.series.get(labelvalues, 0) + amount
+
+    def samples(self) -> List[str]:
+        return [
+            f"{self.name}{_labels(self.labelnames, values)} {_number(value)}"
+            for values, value in sorted(self.series.items())
+        ]
+
+class Histogram:
+    kind = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (), buckets=LATENCY_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(buckets)
+        # Per label values: [per-bucket counts (last is +Inf), sum]
+        self.series: Dict[tuple, list] = {}
+
+    def observe(self, value: float, *labelvalues: str):
+        series = self.series.get(labelvalues)
+        if series is None:
+            series = self.series[labelvalues] = [[0] * (len(self.buckets) + 1), 0.0]
+        # bisect_left: a value equal to a bound falls in that bucket (le)
+        series[0][bisect_left(self.buckets, value)] += 1
+        series[1] += value
+
+    def samples(self) -> List[str]:
+        lines = []
+        for values, (counts, total) in sorted(self.series.items()):
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += count
+                le = 'le="+Inf"' if bound == float("inf") else f'le="{_number(bound)}"'
+                lines.append(f"{self.name}_bucket{_labels(self.labelnames, values, le)} {cumulative}")
+            lines.append(f"{self.name}_sum{_labels(self.labelnames, values)} {_number(total)}")
+            lines.append(f"{self.name}_count{_labels(self.labelnames, values)} {cumulative}")
+        return lines
+
+class MetricsRegistry:
+    def __init__(self):
+        self.metrics = []
+
+    def counter(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Counter:
+        return self._register(Counter(name, documentation, labelnames))
+
+    def histogram(self, name: str, documentation: str, labelnames: Sequence[str] = (), buckets=LATENCY_BUCKETS) -> Histogram:
+        return self._register(Histogram(name, documentation, labelnames, buckets))
+
+    def _register(self, metric):
+        if any(existing.name == metric.name for existing in self.metrics):
+            raise ValueError(f"Metric {metric.name} is already registered")
+        self.metrics.append(metric)
+        return metric
+
+    def render(self) -> str:
+        lines = []
+        for metric in self.metrics:
+            lines.append(f"# HELP {metric.name} {metric.documentation}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            lines.extend(metric.samples())
+        return "\n".join(lines) + "\n"
+
+registry = MetricsRegistry()
+
+REQUEST_SECONDS = registry.histogram(
+    "http_request_duration_seconds",
+    "Time from receiving a request to sending the last byte of its response",
+    ("method", "route", "status")
+)
+REQUEST_DB_STATEMENTS = registry.histogram(
+    "http_request_db_statements",
+    "SQL statements executed per request",
+    ("method", "route"),
+    buckets=COUNT_BUCKETS
+)
+REQUEST_DB_SECONDS = registry.histogram(
+    "http_request_db_seconds",
+    "Time per request spent executing SQL statements",
+    ("method", "route")
+)
+SLOW_REQUESTS = registry.counter(
+    "http_slow_requests_total",
+    "Requests slower than SLOW_REQUEST_LOG_MS",
+    ("method", "route")
+)
+DB_STATEMENT_SECONDS = registry.histogram(
+    "db_statement_duration_seconds",
+    "Execution time of single SQL statements",
+    ("operation",),
+    buckets=STATEMENT_BUCKETS
+)
+DB_STATEMENT_ERRORS = registry.counter(
+    "db_statement_errors_total",
+    "SQL statements that raised",
+    ("operation",)
+)
+INFERENCE_SECONDS = registry.histogram(
+    "inference_duration_seconds",
+    "Time to run one model batch",
+    ("model", "outcome")
+)
+INFERENCE_BATCH_SIZE = registry.histogram(
+    "inference_batch_size",
+    "Inputs per model batch",
+    ("model",),
+    buckets=COUNT_BUCKETS
+)
+NOTIFICATION_SECONDS = registry.histogram(
+    "notification_send_duration_seconds",
+    "Time to hand one notification to its provider",
+    ("channel", "outcome")
+)
+
+class RequestStats:
+    # Work done on behalf of the current request. Tasks the request spawns
+    # inherit it along with the rest of the context.
+    __slots__ = ("db_statements", "db_seconds", "inference_seconds", "notification_seconds", "statements")
+
+    def __init__(self, breakdown: bool = False):
+        self.db_statements = 0
+        self.db_seconds = 0.0
+        self.inference_seconds = 0.0
+        self.notification_seconds = 0.0
+        # Statement text -> [executions, seconds], kept only for the slow-request log
+        self.statements: Optional[Dict[str, list]] = {} if breakdown else None
+
+request_stats: ContextVar[Optional[RequestStats]] = ContextVar("request_stats", default=None)
+
+@contextmanager
+def timed(histogram: Histogram, *labelvalues: str):
+    # Observes the block's duration with an "ok" or "error" outcome label
+    started = time.perf_counter()
+    outcome = "error"
+    try:
+        yield
+        outcome = "ok"
+    finally:
+        histogram.observe(time.perf_counter() - started, *labelvalues, outcome)
+
+@contextmanager
+def charged(field: str):
+    # Adds the block's duration to a RequestStats field of the current request
+    stats = request_stats.get()
+    if stats is None:
+        yield
+        return
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        setattr(stats, field, getattr(stats, field) + time.perf_counter() - started)
+
+_OPERATIONS = {"SELECT", "INSERT", "UPDATE", "DELETE"}
+
+def _operation(statement: str) -> str:
+    words = statement[:16].split(None, 1)
+    verb = words[0].upper() if words else ""
+    return verb if verb in _OPERATIONS else "OTHER"
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if context is not None:
+        context._metrics_started = time.perf_counter()
+
+def _record_statement(statement: str, started: Optional[float]):
+    elapsed = time.perf_counter() - started if started is not None else 0.0
+    stats = request_stats.get()
+    if stats is not None:
+        stats.db_statements += 1
+        stats.db_seconds += elapsed
+        if stats.statements is not None:
+            entry = stats.statements.get(statement)
+            if entry is None:
+                stats.statements[statement] = [1, elapsed]
+            else:
+                entry[0] += 1
+                entry[1] += elapsed
+    return elapsed
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    elapsed = _record_statement(statement, getattr(context, "_metrics_started", None))
+    DB_STATEMENT_SECONDS.observe(elapsed, _operation(statement))
+
+def _handle_error(exception_context):
+    statement = exception_context.statement or ""
+    started = getattr(exception_context.execution_context, "_metrics_started", None)
+    _record_statement(statement, started)
+    DB_STATEMENT_ERRORS.inc(_operation(statement))
+
+def instrument_engine(engine):
+    # Times every statement the engine runs and charges it to the current request
+    sync_engine = getattr(engine, "sync_engine", engine)
+    event.listen(sync_engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(sync_engine, "after_cursor_execute", _after_cursor_execute)
+    event.listen(sync_engine, "handle_error", _handle_error)
+
+_PLACEHOLDER_LISTS = re.compile(r"\((?:\s*(?:\?|%s|%\(\w+\)s|\$\d+|:\w+)\s*,)+\s*(?:\?|%s|%\(\w+\)s|\$\d+|:\w+)\s*\)")
+
+def _normalize(statement: str, width: int = 160) -> str:
+    # Collapses whitespace and expanded IN (...) lists so variants group together
+    text = _PLACEHOLDER_LISTS.sub("(...)", " ".join(statement.split()))
+    return text if len(text) <= width else text[:width - 3] + "..."
+
+class MetricsMiddleware:
+    # Pure ASGI middleware (not BaseHTTPMiddleware), so streamed responses pass
+    # through untouched and the timing covers the whole body. Requests are
+    # labelled by route template, not raw path, to keep the series bounded.
+    def __init__(self, app, slow_request_ms: Optional[float] = None, slow_request_top_statements: int = 5):
+        self.app = app
+        self.slow_request_ms = slow_request_ms
+        self.slow_request_top_statements = slow_request_top_statements
+        self.route_paths: Dict = {}
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        status = 500
+
+        async def send_with_status(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        stats = RequestStats(breakdown=self.slow_request_ms is not None)
+        token = request_stats.set(stats)
+        started = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            elapsed = time.perf_counter() - started
+            request_stats.reset(token)
+            self.record(scope, status, elapsed, stats)
+
+    def route_path(self, scope) -> str:
+        # The router leaves the matched endpoint in the scope
+        endpoint = scope.get("endpoint")
+        if endpoint is None:
+            return "<unmatched>"
+        path = self.route_paths.get(endpoint)
+        if path is None:
+            self.route_paths = {
+                route.endpoint: route.path
+                for route in scope["app"].routes if hasattr(route, "endpoint")
+            }
+            path = self.route_paths.get(endpoint, "<unmatched>")
+        return path
+
+    def record(self, scope, status: int, elapsed: float, stats: RequestStats):
+        method, route = scope["method"], self.route_path(scope)
+        REQUEST_SECONDS.observe(elapsed, method, route, str(status))
+        REQUEST_DB_STATEMENTS.observe(stats.db_statements, method, route)
+        REQUEST_DB_SECONDS.observe(stats.db_seconds, method, route)
+        if self.slow_request_ms is not None and elapsed * 1000 >= self.slow_request_ms:
+            SLOW_REQUESTS.inc(method, route)
+            print(self.slow_request_report(scope, status, elapsed, stats))
+
+    def slow_request_report(self, scope, status: int, elapsed: float, stats: RequestStats) -> str:
+        lines = [
+            f"Slow request: {scope['method']} {scope['path']} -> {status} in {elapsed * 1000:.1f} ms; "
+            f"{stats.db_statements} statements in {stats.db_seconds * 1000:.1f} ms, "
+            f"inference {stats.inference_seconds * 1000:.1f} ms, "
+            f"notifications {stats.notification_seconds * 1000:.1f} ms"
+        ]
+        grouped: Dict[str, list] = {}
+        for statement, (count, seconds) in stats.statements.items():
+            entry = grouped.setdefault(_normalize(statement), [0, 0.0])
+            entry[0] += count
+            entry[1] += seconds
+        top: List[Tuple[str, list]] = sorted(grouped.items(), key=lambda item: item[1][1], reverse=True)
+        for text, (count, seconds) in top[:self.slow_request_top_statements]:
+            lines.append(f"  {count:>4}x {seconds * 1000:>8.1f} ms  {text}")
+        return "\n".join(lines)
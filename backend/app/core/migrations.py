@@ -0,0 +1,159 @@
+from sqlalchemy import BigInteger, case, cast, func, inspect, literal_column, select
+from sqlalchemy.dialects import postgresql, sqlite
+from app.core.location_buffer import ensure_location_upsert_index
+from app.core.utils import CURRENCY_EXPONENTS
+from app.models.emergency import Emergency
+from app.models.location_track import LocationTrack
+from app.models.payment import Wallet, Transaction
+from app.models.schema_migration import SchemaMigration
+from app.models.volunteer import Volunteer
+from datetime import datetime
+from typing import Awaitable, Callable, List, NamedTuple
+
+# Schema changes that create_all cannot make on an existing database (it only
+# creates missing tables), applied once each, in order, at startup. Indexes
+# are declared on the models, so fresh databases already have them and their
+# migrations are no-ops there; migrations only reference them by name.
+
+class Migration(NamedTuple):
+    version: str
+    description: str
+    apply: Callable[..., Awaitable[None]]
+
+def create_index(model, name: str):
+    index = next(index for index in model.__table__.indexes if index.name == name)
+
+    async def apply(conn):
+        await conn.run_sync(lambda sync_conn: index.create(sync_conn, checkfirst=True))
+    return apply
+
+def _to_minor(column, currency):
+    # SQL twin of utils.to_minor_units for converting the legacy float amounts
+    factor = case(
+        *[(currency == code, 10 ** exponent) for code, exponent in CURRENCY_EXPONENTS.items()],
+        else_=100
+    )
+    return cast(func.round(func.coalesce(column, 0) * factor), BigInteger)
+
+def _column_names(sync_conn, table: str) -> set:
+    return {column["name"] for column in inspect(sync_conn).get_columns(table)}
+
+async def wallet_minor_units(conn):
+    # wallets.balance and transactions.amount were floats. Adds the integer
+    # minor-unit and ledger columns and converts the old values (the float
+    # columns stay, unused), then merges duplicate wallets so that user_id can
+    # be made unique.
+    wallets, transactions = Wallet.__table__, Transaction.__table__
+    for table, legacy, column in (
+        (wallets, "balance", "balance_minor"),
+        (transactions, "amount", "amount_minor"),
+    ):
+        existing = await conn.run_sync(_column_names, table.name)
+        if column not in existing:
+            await conn.exec_driver_sql(f"ALTER TABLE {table.name} ADD COLUMN {column} BIGINT NOT NULL DEFAULT 0")
+        if legacy in existing:
+            await conn.execute(table.update().values(
+                {column: _to_minor(literal_column(legacy), table.c.currency)}
+            ))
+    existing = await conn.run_sync(_column_names, "transactions")
+    for column, kind in (("balance_after_minor", "BIGINT"), ("idempotency_key", "VARCHAR")):
+        if column not in existing:
+            await conn.exec_driver_sql(f"ALTER TABLE transactions ADD COLUMN {column} {kind}")
+
+    keep = select(func.min(wallets.c.id)).group_by(wallets.c.user_id)
+    others = wallets.alias("others")
+    await conn.execute(wallets.update().where(
+        wallets.c.id.in_(keep.having(func.count() > 1))
+    ).values(
+        balance_minor=select(func.sum(others.c.balance_minor)).where(
+            others.c.user_id == wallets.c.user_id
+        ).scalar_subquery()
+    ))
+    await conn.execute(wallets.delete().where(wallets.c.id.notin_(keep)))
+    await conn.exec_driver_sql("DROP INDEX IF EXISTS ix_wallets_user_id")
+    await create_index(Wallet, "ux_wallets_user_id")(conn)
+    await create_index(Transaction, "ux_transactions_user_idempotency")(conn)
+
+async def canonical_emergency_timestamps(conn):
+    # SQLite only: rows written by the old CURRENT_TIMESTAMP default hold
+    # "YYYY-MM-DD HH:MM:SS" while SQLAlchemy binds six fractional digits, and
+    # the text comparison of the history cursor treats them as different
+    # instants. Rewrites them to the canonical form. (Existing tables keep
+    # the old column default; the app sets created_at itself on insert.)
+    if conn.dialect.name != "sqlite":
+        return
+    await conn.exec_driver_sql(
+        "UPDATE emergencies SET created_at = created_at || '.000000' WHERE length(created_at) = 19"
+    )
+
+async def emergency_idempotency_key(conn):
+    if "idempotency_key" not in await conn.run_sync(_column_names, "emergencies"):
+        await conn.exec_driver_sql("ALTER TABLE emergencies ADD COLUMN idempotency_key VARCHAR")
+    await create_index(Emergency, "ux_emergencies_user_idempotency")(conn)
+
+MIGRATIONS: List[Migration] = [
+    Migration(
+        "0001",
+        "Unique user_locations.user_id for the write-behind UPSERT",
+        ensure_location_upsert_index
+    ),
+    Migration(
+        "0002",
+        "Keyset index emergencies (user_id, created_at, id)",
+        create_index(Emergency, "ix_emergencies_user_created_id")
+    ),
+    Migration(
+        "0003",
+        "Partial index on active volunteers",
+        create_index(Volunteer, "ix_volunteers_active_user")
+    ),
+    Migration(
+        "0004",
+        "Integer minor-unit wallet balances and an idempotent transaction ledger",
+        wallet_minor_units
+    ),
+    Migration(
+        "0005",
+        "Canonical emergencies.created_at text format on SQLite",
+        canonical_emergency_timestamps
+    ),
+    Migration(
+        "0006",
+        "Idempotency key for SOS emergencies",
+        emergency_idempotency_key
+    ),
+    Migration(
+        "0007",
+        "Index emergencies.created_at for the partial first day of analytics",
+        create_index(Emergency, "ix_emergencies_created_at")
+    ),
+    Migration(
+        "0008",
+        "Partial index on location_tracks awaiting compaction",
+        create_index(LocationTrack, "ix_location_tracks_unsimplified")
+    ),
+]
+
+async def run_migrations(conn) -> List[str]:
+    # Runs inside the caller's transaction. Several workers starting at once
+    # may all apply a migration; they are idempotent and the version insert
+    # ignores duplicates.
+    await conn.run_sync(lambda sync_conn: SchemaMigration.__table__.create(sync_conn, checkfirst=True))
+    applied = set((await conn.execute(select(SchemaMigration.version))).scalars().all())
+    insert = postgresql.insert if conn.dialect.name == "postgresql" else sqlite.insert
+
+    ran = []
+    for migration in MIGRATIONS:
+        if migration.version in applied:
+            continue
+        await migration.apply(conn)
+        await conn.execute(
+            insert(SchemaMigration.__table__).values(
+                version=migration.version,
+                description=migration.description,
+                applied_at=datetime.utcnow()
+            ).on_conflict_do_nothing(index_elements=["version"])
+        )
+        print(f"Applied migration {migration.version}: {migration.description}")
+        ran.append(migration.version)
+    return ran
@@ -1,37 +1,144 @@
-from twilio.rest import Client
 from app.config import settings
-from typing import List, Optional
+from typing import List, Optional, Tuple
+import asyncio
+import random
+import httpx
+from app.core.metrics import NOTIFICATION_SECONDS, timed, charged
+
+class TwilioSMSProvider:
+    # Talks to the Twilio REST API over a pooled async HTTP client instead of
+    # the blocking twilio SDK, so sends never stall the event loop
+    def __init__(self, account_sid: str, auth_token: str, from_number: str, max_connections: int, timeout: float):
+        self.url = f"https://api.twilio.com/2010-04-01/Accounts/{account_sid}/Messages.json"
+        self.from_number = from_number
+        self.client = httpx.AsyncClient(
+            auth=(account_sid, auth_token),
+            timeout=timeout,
+            limits=httpx.Limits(
+                max_connections=max_connections,
+                max_keepalive_connections=max_connections
+            )
+        )
+    
+    async def send(self, to: str, message: str) -> bool:
+        response = await self.client.post(
+            self.url,
+            data={"To": to, "From": self.from_number, "Body": message}
+        )
+        response.raise_for_status()
+        return True
+    
+    async def close(self):
+        await self.client.aclose()
+
+class FakeSMSProvider:
+    # Local stand-in for tests and benchmarks: records messages instead of sending them
+    def __init__(self, latency: float = 0.0, failure_rate: float = 0.0):
+        self.latency = latency
+        self.failure_rate = failure_rate
+        self.sent: List[Tuple[str, str]] = []
+    
+    async def send(self, to: str, message: str) -> bool:
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        if self.failure_rate and random.random() < self.failure_rate:
+            raise RuntimeError("Simulated SMS provider failure")
+        self.sent.append((to, message))
+        return True
+    
+    async def close(self):
+        pass
+
+FCM_SEND_URL = "https://fcm.googleapis.com/fcm/send"
+SENDGRID_SEND_URL = "https://api.sendgrid.com/v3/mail/send"
 
 class NotificationService:
     def __init__(self):
-        self.twilio_client = None
+        self.sms_provider = self._build_sms_provider()
+        self._sms_slots = None
+        self.http = httpx.AsyncClient(timeout=settings.NOTIFICATION_HTTP_TIMEOUT_SECONDS)
+    
+    def _build_sms_provider(self):
+        if settings.SMS_PROVIDER == "fake":
+            return FakeSMSProvider(latency=settings.FAKE_SMS_LATENCY_MS / 1000.0)
         if settings.TWILIO_ACCOUNT_SID and settings.TWILIO_AUTH_TOKEN:
-            self.twilio_client = Client(
-                settings.TWILIO_ACCOUNT_SID, 
-                settings.TWILIO_AUTH_TOKEN
+            return TwilioSMSProvider(
+                settings.TWILIO_ACCOUNT_SID,
+                settings.TWILIO_AUTH_TOKEN,
+                settings.TWILIO_PHONE_NUMBER,
+                max_connections=settings.SMS_MAX_CONCURRENCY,
+                timeout=settings.SMS_SEND_TIMEOUT_SECONDS
             )
+        return None
     
     async def send_sms(self, to: str, message: str) -> bool:
-        if not self.twilio_client:
-            return False
-            
-        try:
-            self.twilio_client.messages.create(
-                body=message,
-                from_=settings.TWILIO_PHONE_NUMBER,
-                to=to
-            )
-            return True
-        except Exception as e:
-            print(f"SMS sending failed: {e}")
+        # Provider errors and timeouts propagate so the outbox records them
+        # and retries
+        if not self.sms_provider:
             return False
+        
+        # Process-wide cap on concurrent sends, shared by every SOS in flight
+        if self._sms_slots is None:
+            self._sms_slots = asyncio.Semaphore(settings.SMS_MAX_CONCURRENCY)
+        
+        async with self._sms_slots:
+            with timed(NOTIFICATION_SECONDS, "sms"), charged("notification_seconds"):
+                return await asyncio.wait_for(
+                    self.sms_provider.send(to, message),
+                    settings.SMS_SEND_TIMEOUT_SECONDS
+                )
+    
+    async def send_sms_many(self, messages: List[Tuple[str, str]]) -> List[bool]:
+        # Fan out concurrently; total time is roughly one round trip, not one per recipient
+        results = await asyncio.gather(
+            *(self.send_sms(to, message) for to, message in messages),
+            return_exceptions=True
+        )
+        for result in results:
+            if isinstance(result, Exception):
+                print(f"SMS sending failed: {result!r}")
+        return [result is True for result in results]
     
     async def send_push_notification(self, device_tokens: List[str], title: str, body: str) -> bool:
-        # Implement using Firebase Admin SDK or similar
-        pass
+        # Firebase Cloud Messaging HTTP API; errors propagate so the outbox can retry
+        if not settings.FCM_SERVER_KEY or not device_tokens:
+            return False
+        
+        with timed(NOTIFICATION_SECONDS, "push"), charged("notification_seconds"):
+            response = await self.http.post(
+                FCM_SEND_URL,
+                headers={"Authorization": f"key={settings.FCM_SERVER_KEY}"},
+                json={
+                    "registration_ids": device_tokens,
+                    "priority": "high",
+                    "notification": {"title": title, "body": body}
+                }
+            )
+            response.raise_for_status()
+        return response.json().get("success", 0) > 0
     
     async def send_email(self, to: str, subject: str, body: str) -> bool:
-        # Implement using SendGrid or similar
-        pass
+        # SendGrid v3 mail API; errors propagate so the outbox can retry
+        if not settings.SENDGRID_API_KEY or not settings.EMAIL_FROM_ADDRESS:
+            return False
+        
+        with timed(NOTIFICATION_SECONDS, "email"), charged("notification_seconds"):
+            response = await self.http.post(
+                SENDGRID_SEND_URL,
+                headers={"Authorization": f"Bearer {settings.SENDGRID_API_KEY}"},
+                json={
+                    "personalizations": [{"to": [{"email": to}]}],
+                    "from": {"email": settings.EMAIL_FROM_ADDRESS},
+                    "subject": subject,
+                    "content": [{"type": "text/plain", "value": body}]
+                }
+            )
+            response.raise_for_status()
+        return True
+    
+    async def close(self):
+        if self.sms_provider:
+            await self.sms_provider.close()
+        await self.http.aclose()
 
-notification_service = NotificationService()
\ No newline at end of file
+notification_service = NotificationService()
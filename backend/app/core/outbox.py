@@ -0,0 +1,154 @@
+from sqlalchemy import select, update, and_
+from app.config import settings
+from app.core.database import async_session
+from app.core.notifications import notification_service
+from app.models.notification import NotificationOutbox
+from datetime import datetime, timedelta
+from typing import List, Optional
+import asyncio
+import random
+import uuid
+
+class OutboxDispatcher:
+    # Background delivery of NotificationOutbox rows. Workers claim due rows in
+    # batches by stamping them with a claim token and a lease, so several
+    # workers (or API processes) never deliver the same row twice, and a worker
+    # that dies mid-batch only delays its rows until the lease runs out.
+    # Failures are retried with exponential backoff and jitter; rows that keep
+    # failing are parked as "dead" for inspection.
+    def __init__(self, session_factory, service, workers: int, batch_size: int,
+                 poll_interval: float, max_attempts: int, backoff_base: float,
+                 backoff_max: float, lease_seconds: float):
+        self.session_factory = session_factory
+        self.service = service
+        self.workers = workers
+        self.batch_size = batch_size
+        self.poll_interval = poll_interval
+        self.max_attempts = max_attempts
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.lease_seconds = lease_seconds
+        self.tasks: List[asyncio.Task] = []
+        self.wakeup: Optional[asyncio.Event] = None
+
+    def start(self):
+        self.wakeup = asyncio.Event()
+        self.tasks = [asyncio.create_task(self._run()) for _ in range(self.workers)]
+
+    async def stop(self):
+        for task in self.tasks:
+            task.cancel()
+        await asyncio.gather(*self.tasks, return_exceptions=True)
+        self.tasks = []
+
+    def notify(self):
+        # Called after a commit that enqueued messages, so they go out now
+        # rather than on the next poll
+        if self.wakeup is not None:
+            self.wakeup.set()
+
+    def backoff(self, attempts: int) -> float:
+        delay = min(self.backoff_max, self.backoff_base * 2 ** (attempts - 1))
+        return delay * random.uniform(0.5, 1.0)
+
+    async def _run(self):
+        while True:
+            try:
+                delivered = await self.drain_once()
+            except Exception as e:
+                print(f"Outbox delivery failed: {e}")
+                delivered = 0
+            if delivered:
+                continue
+            try:
+                await asyncio.wait_for(self.wakeup.wait(), self.poll_interval)
+            except asyncio.TimeoutError:
+                pass
+            self.wakeup.clear()
+
+    async def drain_once(self) -> int:
+        entries = await self._claim()
+        if not entries:
+            return 0
+        results = await asyncio.gather(
+            *(self._deliver(entry) for entry in entries),
+            return_exceptions=True
+        )
+        await self._record(entries, results)
+        return len(entries)
+
+    async def _claim(self) -> List[NotificationOutbox]:
+        now = datetime.utcnow()
+        token = str(uuid.uuid4())
+        async with self.session_factory() as db:
+            due = NotificationOutbox.due_query(now, self.batch_size)
+            candidates = (await db.execute(due)).scalars().all()
+            if not candidates:
+                return []
+
+            # Rows another worker claimed in the meantime no longer match
+            # next_attempt_at <= now and are skipped
+            await db.execute(
+                update(NotificationOutbox).where(and_(
+                    NotificationOutbox.id.in_(candidates),
+                    NotificationOutbox.status.in_(("pending", "sending")),
+                    NotificationOutbox.next_attempt_at <= now
+                )).values(
+                    status="sending",
+                    claim_token=token,
+                    attempts=NotificationOutbox.attempts + 1,
+                    next_attempt_at=now + timedelta(seconds=self.lease_seconds)
+                ).execution_options(synchronize_session=False)
+            )
+            await db.commit()
+
+            result = await db.execute(
+                select(NotificationOutbox).where(NotificationOutbox.claim_token == token)
+            )
+            return result.scalars().all()
+
+    async def _deliver(self, entry: NotificationOutbox) -> bool:
+        if entry.channel == "sms":
+            return await self.service.send_sms(entry.recipient, entry.body)
+        if entry.channel == "push":
+            return await self.service.send_push_notification([entry.recipient], entry.title or "Emergency Alert", entry.body)
+        if entry.channel == "email":
+            return await self.service.send_email(entry.recipient, entry.title or "Emergency Alert", entry.body)
+        raise ValueError(f"Unknown notification channel {entry.channel!r}")
+
+    async def _record(self, entries: List[NotificationOutbox], results: list):
+        now = datetime.utcnow()
+        async with self.session_factory() as db:
+            for entry, result in zip(entries, results):
+                values = {"claim_token": None}
+                if result is True:
+                    values.update(status="sent", sent_at=now, last_error=None)
+                else:
+                    error = repr(result) if isinstance(result, BaseException) else "Provider reported failure"
+                    values["last_error"] = error[:500]
+                    if entry.attempts >= self.max_attempts:
+                        values["status"] = "dead"
+                    else:
+                        values.update(
+                            status="pending",
+                            next_attempt_at=now + timedelta(seconds=self.backoff(entry.attempts))
+                        )
+                await db.execute(
+                    update(NotificationOutbox).where(and_(
+                        NotificationOutbox.id == entry.id,
+                        NotificationOutbox.claim_token == entry.claim_token
+                    )).values(**values).execution_options(synchronize_session=False)
+                )
+            await db.commit()
+
+outbox_dispatcher = OutboxDispatcher(
+    async_session,
+    notification_service,
+    workers=settings.OUTBOX_WORKERS,
+    batch_size=settings.OUTBOX_BATCH_SIZE,
+    poll_interval=settings.OUTBOX_POLL_INTERVAL_SECONDS,
+    max_attempts=settings.OUTBOX_MAX_ATTEMPTS,
+    backoff_base=settings.OUTBOX_BACKOFF_BASE_SECONDS,
+    backoff_max=settings.OUTBOX_BACKOFF_MAX_SECONDS,
+    lease_seconds=settings.OUTBOX_LEASE_SECONDS
+)
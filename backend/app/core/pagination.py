@@ -0,0 +1,20 @@
+import base64
+import json
+from datetime import datetime
+from typing import Tuple
+
+class InvalidCursorError(ValueError):
+    pass
+
+def encode_cursor(created_at: datetime, row_id: str) -> str:
+    # Opaque keyset cursor: the (created_at, id) of the last row returned
+    raw = json.dumps([created_at.isoformat(), row_id], separators=(",", ":")).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+def decode_cursor(cursor: str) -> Tuple[datetime, str]:
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        created_at, row_id = json.loads(raw)
+        return datetime.fromisoformat(created_at), str(row_id)
+    except (ValueError, TypeError) as e:
+        raise InvalidCursorError(f"Invalid cursor: {e}")
@@ -0,0 +1,348 @@
+import asyncio
+import os
+import sys
+import threading
+import time
+from contextvars import ContextVar
+from typing import Dict, List, Optional, Tuple
+
+from starlette.routing import Match
+
+# On-demand sampling profiler. A background thread snapshots every thread's
+# Python stack with sys._current_frames() at a fixed interval, so profiled
+# code runs unmodified and nothing is traced per call. Samples taken on the
+# event loop thread are labelled with the route of the task running at that
+# moment, and in wall mode the await chains of suspended requests are sampled
+# too, so time spent waiting on the database, a model or a provider shows up
+# under the request that waited. The sampler holds the GIL while it walks the
+# stacks; its interval stretches to keep that under max_overhead of wall time.
+# Profiles are per process: each worker profiles only its own requests.
+
+MODES = ("wall", "cpu")
+MAX_INTERVAL = 0.5
+# The sampler can only run once the loop thread drops the GIL, which it does
+# at blocking calls and, otherwise, every switch interval (5 ms by default).
+# Shortening that while a session runs lets samples land inside short CPU
+# bursts instead of piling up at the next select(); bursts shorter than it
+# are still charged to the select() that follows them.
+SAMPLING_SWITCH_INTERVAL = 0.0005
+
+class ProfilerBusyError(RuntimeError):
+    pass
+
+# Scope of the profiled request the current task (and the tasks it spawns) serves
+profiled_scope: ContextVar[Optional[dict]] = ContextVar("profiled_scope", default=None)
+
+def cpu_mode_available() -> bool:
+    return hasattr(time, "pthread_getcpuclockid")
+
+def _current_tasks() -> dict:
+    # Loop -> task running on it. Read from the sampler thread without a lock;
+    # a dict lookup is atomic under the GIL.
+    return getattr(asyncio.tasks, "_current_tasks", {})
+
+def _short_path(filename: str) -> str:
+    for marker in ("site-packages" + os.sep, "dist-packages" + os.sep):
+        if marker in filename:
+            return filename.split(marker, 1)[1]
+    cwd = os.getcwd() + os.sep
+    if filename.startswith(cwd):
+        return filename[len(cwd):]
+    return filename
+
+class ProfileSession:
+    def __init__(
+        self,
+        mode: str,
+        interval: float,
+        routes: Optional[List] = None,
+        max_requests: Optional[int] = None,
+        route_paths: Optional[Dict] = None,
+        max_stacks: int = 10000,
+        max_depth: int = 128,
+        max_overhead: float = 0.02
+    ):
+        self.mode = mode
+        self.requested_interval = interval
+        self.interval = interval
+        self.routes = routes
+        self.max_requests = max_requests
+        self.filtered = routes is not None or max_requests is not None
+        self.route_paths = route_paths or {}
+        self.max_stacks = max_stacks
+        self.max_depth = max_depth
+        self.max_overhead = max_overhead
+
+        # Stack (root first) -> samples in wall mode, CPU microseconds in cpu mode
+        self.stacks: Dict[Tuple[str, ...], int] = {}
+        self.code_labels: Dict[object, str] = {}
+        self.thread_names: Dict[int, str] = {}
+        self.cpu_clocks: Dict[int, Tuple[int, int]] = {}
+        self.samples = 0
+        self.dropped = 0
+        self.ticks = 0
+        self.sampling_seconds = 0.0
+        self.started_at = None
+        self.stopped_at = None
+
+        # Request task -> its ASGI scope; written on the loop thread only
+        self.tasks: Dict[asyncio.Task, dict] = {}
+        self.admitted = 0
+        self.completed = 0
+        self.finished = asyncio.Event()
+
+        self.loop = None
+        self.loop_thread_id = None
+        self.stopping = threading.Event()
+        self.thread = None
+
+    # Request tracking (event loop thread)
+
+    def admit(self, scope) -> bool:
+        if not self.filtered:
+            return True
+        if self.max_requests is not None and self.admitted >= self.max_requests:
+            return False
+        if self.routes is not None and not any(route.matches(scope)[0] == Match.FULL for route in self.routes):
+            return False
+        self.admitted += 1
+        return True
+
+    def track(self, task, scope):
+        # Tasks spawned by a profiled request; dropped when they finish
+        self.tasks[task] = scope
+        task.add_done_callback(self.untrack)
+
+    def untrack(self, task):
+        self.tasks.pop(task, None)
+
+    def request_finished(self):
+        if not self.filtered:
+            return
+        self.completed += 1
+        if self.max_requests is not None and self.completed >= self.max_requests:
+            self.finished.set()
+
+    # Sampling (sampler thread)
+
+    def run(self):
+        sampler_id = threading.get_ident()
+        average_cost = 0.0
+        while not self.stopping.wait(self.interval):
+            started = time.perf_counter()
+            try:
+                self.sample(sampler_id)
+            except Exception as e:
+                # A sampler bug must never take the process down; stop sampling
+                print(f"Profiler sampling failed: {e!r}")
+                return
+            cost = time.perf_counter() - started
+            self.sampling_seconds += cost
+            self.ticks += 1
+            # Stretch the interval so sampling stays under max_overhead
+            average_cost = cost if self.ticks == 1 else 0.8 * average_cost + 0.2 * cost
+            self.interval = min(MAX_INTERVAL, max(self.requested_interval, average_cost / self.max_overhead))
+
+    def sample(self, sampler_id: int):
+        frames = sys._current_frames()
+        running = _current_tasks().get(self.loop)
+        if len(self.thread_names) != len(frames):
+            self.thread_names = {thread.ident: thread.name for thread in threading.enumerate()}
+
+        for thread_id, frame in frames.items():
+            if thread_id == sampler_id:
+                continue
+            weight = self.thread_weight(thread_id)
+            if weight <= 0:
+                continue
+            if thread_id == self.loop_thread_id:
+                scope = self.tasks.get(running)
+                if scope is None and self.filtered:
+                    continue  # another request's work
+                root = ("(loop)", self.request_label(scope, running))
+            else:
+                if self.filtered:
+                    continue  # threads cannot be attributed to a request
+                root = (f"(thread {self.thread_names.get(thread_id, thread_id)})",)
+            self.add(root + self.frame_stack(frame), weight)
+
+        if self.mode == "wall":
+            for task, scope in list(self.tasks.items()):
+                if task is running or task.done():
+                    continue
+                stack = self.await_stack(task)
+                if stack:
+                    self.add(("(awaiting)", self.request_label(scope, task)) + stack, 1)
+
+    def thread_weight(self, thread_id: int) -> int:
+        if self.mode == "wall":
+            return 1
+        # CPU microseconds the thread used since the previous sample
+        try:
+            clock = self.cpu_clocks.get(thread_id, (None, None))[0]
+            if clock is None:
+                clock = time.pthread_getcpuclockid(thread_id)
+            now = time.clock_gettime_ns(clock) // 1000
+        except (OSError, OverflowError):
+            self.cpu_clocks.pop(thread_id, None)
+            return 0
+        previous = self.cpu_clocks.get(thread_id, (clock, now))[1]
+        self.cpu_clocks[thread_id] = (clock, now)
+        return now - previous
+
+    def request_label(self, scope, task) -> str:
+        if scope is None:
+            return "(background task)" if task is not None else "(no task)"
+        path = self.route_paths.get(scope.get("endpoint"), "(routing)")
+        return f"{scope['method']} {path}"
+
+    def code_label(self, code) -> str:
+        label = self.code_labels.get(code)
+        if label is None:
+            name = getattr(code, "co_qualname", code.co_name)
+            label = f"{name} ({_short_path(code.co_filename)}:{code.co_firstlineno})".replace(";", ":")
+            if len(self.code_labels) < self.max_stacks:
+                self.code_labels[code] = label
+        return label
+
+    def frame_stack(self, frame) -> Tuple[str, ...]:
+        # Walks leaf to root; deep stacks keep their leaf-most frames
+        labels: List[str] = []
+        while frame is not None and len(labels) < self.max_depth:
+            labels.append(self.code_label(frame.f_code))
+            frame = frame.f_back
+        if frame is not None:
+            labels.append("(truncated)")
+        labels.reverse()
+        return tuple(labels)
+
+    def await_stack(self, task) -> Optional[Tuple[str, ...]]:
+        # The suspended coroutine chain, outermost first, ending in what it
+        # awaits. The loop may resume the task mid-walk; such samples are
+        # skipped.
+        labels: List[str] = []
+        try:
+            awaitable = task.get_coro()
+            while awaitable is not None and len(labels) < 4 * self.max_depth:
+                frame = getattr(awaitable, "cr_frame", None) or getattr(awaitable, "gi_frame", None)
+                if frame is None:
+                    labels.append(f"(await {type(awaitable).__name__})")
+                    break
+                labels.append(self.code_label(frame.f_code))
+                awaitable = getattr(awaitable, "cr_await", None) or getattr(awaitable, "gi_yieldfrom", None)
+        except Exception:
+            return None
+        if len(labels) > self.max_depth:
+            labels = ["(truncated)"] + labels[-self.max_depth:]
+        return tuple(labels)
+
+    def add(self, stack: Tuple[str, ...], weight: int):
+        self.samples += 1
+        if stack not in self.stacks and len(self.stacks) >= self.max_stacks:
+            # Memory cap: new stacks are pooled once the table is full
+            self.dropped += 1
+            stack = stack[:2] + ("(stack table full)",)
+        self.stacks[stack] = self.stacks.get(stack, 0) + weight
+
+    # Results
+
+    @property
+    def unit(self) -> str:
+        return "samples" if self.mode == "wall" else "cpu-microseconds"
+
+    @property
+    def elapsed(self) -> float:
+        if self.started_at is None:
+            return 0.0
+        return (self.stopped_at or time.perf_counter()) - self.started_at
+
+    def collapsed(self) -> str:
+        # One "root;...;leaf weight" line per stack, as read by flamegraph.pl,
+        # inferno and speedscope
+        return "".join(f"{';'.join(stack)} {weight}\n" for stack, weight in sorted(self.stacks.items()))
+
+    def summary(self) -> dict:
+        elapsed = self.elapsed
+        return {
+            "mode": self.mode,
+            "unit": self.unit,
+            "seconds": round(elapsed, 3),
+            "samples": self.samples,
+            "stacks": len(self.stacks),
+            "dropped": self.dropped,
+            "interval_ms": round(elapsed / self.ticks * 1000, 3) if self.ticks else None,
+            "overhead": round(self.sampling_seconds / elapsed, 4) if elapsed else 0.0,
+            "requests": self.completed if self.filtered else None,
+        }
+
+class Profiler:
+    # At most one session at a time per process
+    def __init__(self):
+        self.session: Optional[ProfileSession] = None
+        self._previous_task_factory = None
+        self._previous_switch_interval = None
+
+    def start(self, session: ProfileSession) -> ProfileSession:
+        if self.session is not None:
+            raise ProfilerBusyError("A profile is already running")
+        loop = asyncio.get_running_loop()
+        session.loop = loop
+        session.loop_thread_id = threading.get_ident()
+        session.started_at = time.perf_counter()
+        # Tasks spawned while serving a profiled request belong to it too
+        self._previous_task_factory = loop.get_task_factory()
+        loop.set_task_factory(self._task_factory)
+        self._previous_switch_interval = sys.getswitchinterval()
+        sys.setswitchinterval(min(self._previous_switch_interval, SAMPLING_SWITCH_INTERVAL))
+        session.thread = threading.Thread(target=session.run, name="profiler", daemon=True)
+        self.session = session
+        session.thread.start()
+        return session
+
+    async def stop(self):
+        session = self.session
+        if session is None:
+            return
+        session.stopping.set()
+        await asyncio.get_running_loop().run_in_executor(None, session.thread.join)
+        session.stopped_at = time.perf_counter()
+        sys.setswitchinterval(self._previous_switch_interval)
+        session.loop.set_task_factory(self._previous_task_factory)
+        self._previous_task_factory = None
+        self.session = None
+
+    def _task_factory(self, loop, coro, **kwargs):
+        if self._previous_task_factory is not None:
+            task = self._previous_task_factory(loop, coro, **kwargs)
+        else:
+            task = asyncio.Task(coro, loop=loop, **kwargs)
+        scope = profiled_scope.get()
+        if scope is not None and self.session is not None:
+            self.session.track(task, scope)
+        return task
+
+profiler = Profiler()
+
+class ProfilerMiddleware:
+    # Tags requests for the running profile session; a single attribute check
+    # when no profile is running
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        session = profiler.session
+        if session is None or scope["type"] != "http" or not session.admit(scope):
+            await self.app(scope, receive, send)
+            return
+
+        # The request may run in a longer-lived task (e.g. an in-process test
+        # client's), so it is untracked here rather than when the task ends
+        task = asyncio.current_task()
+        token = profiled_scope.set(scope)
+        session.tasks[task] = scope
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            session.untrack(task)
+            profiled_scope.reset(token)
+            session.request_finished()
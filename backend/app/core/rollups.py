@@ -0,0 +1,236 @@
+from sqlalchemy import select, delete, func, event, inspect, literal, union, union_all
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.orm import Session
+from app.core.database import async_session, utc_date
+from app.models.emergency import Emergency, EmergencyDailyRollup
+from collections import Counter
+from datetime import datetime, date, time, timedelta, timezone
+from typing import Optional, Tuple
+import argparse
+import asyncio
+import sys
+
+# Incremental maintenance of emergency_daily_rollups. Every flush that inserts,
+# deletes or re-keys an Emergency (e.g. confirms it) applies the matching +1/-1
+# deltas with an UPSERT inside the same transaction, so the rollup commits or
+# rolls back together with the rows it counts. Bulk UPDATE/DELETE statements
+# bypass the ORM and therefore the rollup; run `backfill` after those.
+
+RollupKey = Tuple[date, str, str, bool]
+
+def rollup_key(user_id, detection_type, is_confirmed, created_at: datetime) -> RollupKey:
+    if created_at.tzinfo is not None:
+        created_at = created_at.astimezone(timezone.utc)
+    return (created_at.date(), user_id, detection_type or "", bool(is_confirmed))
+
+def _previous(state, name: str):
+    history = state.attrs[name].history
+    if history.deleted:
+        return history.deleted[0]
+    return history.unchanged[0] if history.unchanged else state.attrs[name].value
+
+@event.listens_for(Session, "before_flush")
+def _stamp_new_emergencies(session, flush_context, instances):
+    # The rollup key needs created_at before the INSERT, so it is set here
+    # rather than left to the server default
+    for obj in session.new:
+        if isinstance(obj, Emergency):
+            if obj.created_at is None:
+                obj.created_at = datetime.utcnow()
+            if obj.is_confirmed is None:
+                obj.is_confirmed = False
+
+@event.listens_for(Session, "after_flush")
+def _apply_rollup_deltas(session, flush_context):
+    deltas = Counter()
+    for obj in session.new:
+        if isinstance(obj, Emergency):
+            deltas[rollup_key(obj.user_id, obj.detection_type, obj.is_confirmed, obj.created_at)] += 1
+    for obj in session.dirty:
+        if isinstance(obj, Emergency):
+            state = inspect(obj)
+            old = rollup_key(*(
+                _previous(state, name)
+                for name in ("user_id", "detection_type", "is_confirmed", "created_at")
+            ))
+            new = rollup_key(obj.user_id, obj.detection_type, obj.is_confirmed, obj.created_at)
+            if old != new:
+                deltas[old] -= 1
+                deltas[new] += 1
+    for obj in session.deleted:
+        if isinstance(obj, Emergency):
+            deltas[rollup_key(*(
+                _previous(inspect(obj), name)
+                for name in ("user_id", "detection_type", "is_confirmed", "created_at")
+            ))] -= 1
+
+    deltas = {key: delta for key, delta in deltas.items() if delta}
+    if not deltas:
+        return
+    connection = session.connection()
+    table = EmergencyDailyRollup.__table__
+    insert = postgresql.insert if connection.dialect.name == "postgresql" else sqlite.insert
+    stmt = insert(table).values([
+        {"day": day, "user_id": user_id, "detection_type": detection_type,
+         "is_confirmed": is_confirmed, "count": delta}
+        for (day, user_id, detection_type, is_confirmed), delta in deltas.items()
+    ])
+    connection.execute(stmt.on_conflict_do_update(
+        index_elements=["day", "user_id", "detection_type", "is_confirmed"],
+        set_={"count": table.c.count + stmt.excluded.count}
+    ))
+
+def _split_window(since: datetime) -> Tuple[datetime, datetime]:
+    # (since, start of the next UTC day), both UTC. Whole days from there on
+    # are read from the rollup; the part of since's own day is counted from
+    # emergencies, so the window starts exactly at `since`
+    if since.tzinfo is None:
+        since = since.replace(tzinfo=timezone.utc)
+    since = since.astimezone(timezone.utc)
+    next_day = datetime.combine(since.date() + timedelta(days=1), time(), tzinfo=timezone.utc)
+    return since, next_day
+
+def _partial_day(since: datetime, next_day: datetime, user_id: Optional[str]):
+    conditions = [Emergency.created_at >= since, Emergency.created_at < next_day]
+    if user_id is not None:
+        conditions.append(Emergency.user_id == user_id)
+    return conditions
+
+def rollup_counts(since: datetime, user_id: Optional[str] = None):
+    # Emergencies created at or after `since` (UTC), grouped by
+    # (detection_type, is_confirmed)
+    since, next_day = _split_window(since)
+    detection_type = func.coalesce(Emergency.detection_type, literal(""))
+    is_confirmed = func.coalesce(Emergency.is_confirmed, literal(False))
+    whole_days = select(
+        EmergencyDailyRollup.detection_type,
+        EmergencyDailyRollup.is_confirmed,
+        EmergencyDailyRollup.count
+    ).where(
+        EmergencyDailyRollup.day >= next_day.date()
+    )
+    if user_id is not None:
+        whole_days = whole_days.where(EmergencyDailyRollup.user_id == user_id)
+    first_day = select(
+        detection_type.label("detection_type"),
+        is_confirmed.label("is_confirmed"),
+        func.count().label("count")
+    ).where(
+        *_partial_day(since, next_day, user_id)
+    ).group_by(
+        detection_type,
+        is_confirmed
+    )
+    rows = union_all(whole_days, first_day).subquery()
+    return select(
+        rows.c.detection_type,
+        rows.c.is_confirmed,
+        func.sum(rows.c.count)
+    ).group_by(
+        rows.c.detection_type,
+        rows.c.is_confirmed
+    )
+
+def active_users(since: datetime):
+    # Number of distinct users with an emergency at or after `since` (UTC)
+    since, next_day = _split_window(since)
+    users = union(
+        select(EmergencyDailyRollup.user_id).where(
+            EmergencyDailyRollup.day >= next_day.date(),
+            EmergencyDailyRollup.count > 0
+        ),
+        select(Emergency.user_id).where(*_partial_day(since, next_day, None))
+    ).subquery()
+    return select(func.count()).select_from(users)
+
+def summarize_counts(rows) -> dict:
+    # Folds rollup_counts() rows into the totals the analytics endpoints return
+    total = confirmed = 0
+    by_type = Counter()
+    for detection_type, is_confirmed, count in rows:
+        count = int(count or 0)
+        total += count
+        if is_confirmed:
+            confirmed += count
+        if detection_type:
+            by_type[detection_type] += count
+    return {"total": total, "confirmed": confirmed, "by_type": dict(by_type)}
+
+def _raw_counts():
+    return select(
+        utc_date(Emergency.created_at).label("day"),
+        Emergency.user_id,
+        func.coalesce(Emergency.detection_type, literal("")).label("detection_type"),
+        func.coalesce(Emergency.is_confirmed, literal(False)).label("is_confirmed"),
+        func.count().label("count")
+    ).where(
+        Emergency.created_at.isnot(None)
+    ).group_by(
+        utc_date(Emergency.created_at),
+        Emergency.user_id,
+        func.coalesce(Emergency.detection_type, literal("")),
+        func.coalesce(Emergency.is_confirmed, literal(False))
+    )
+
+async def backfill(db) -> int:
+    # Rebuilds the rollup from emergencies in one transaction
+    await db.execute(delete(EmergencyDailyRollup))
+    raw = _raw_counts().subquery()
+    await db.execute(
+        EmergencyDailyRollup.__table__.insert().from_select(
+            ["day", "user_id", "detection_type", "is_confirmed", "count"],
+            select(raw.c.day, raw.c.user_id, raw.c.detection_type, raw.c.is_confirmed, raw.c.count)
+        )
+    )
+    await db.commit()
+    result = await db.execute(select(func.count()).select_from(EmergencyDailyRollup))
+    return result.scalar()
+
+async def backfill_if_empty(db):
+    # First start after the rollup table was added
+    has_rollups = (await db.execute(select(EmergencyDailyRollup.day).limit(1))).first()
+    if has_rollups is None and (await db.execute(select(Emergency.id).limit(1))).first():
+        rows = await backfill(db)
+        print(f"Backfilled emergency_daily_rollups: {rows} rows")
+
+def _normalize(day, user_id, detection_type, is_confirmed) -> RollupKey:
+    if isinstance(day, str):
+        day = date.fromisoformat(day)
+    return (day, user_id, detection_type or "", bool(is_confirmed))
+
+async def check(db) -> list:
+    # Differences between the rollup and a fresh GROUP BY over emergencies,
+    # as (key, expected, actual) tuples
+    expected = {
+        _normalize(*row[:4]): row[4]
+        for row in (await db.execute(_raw_counts())).all()
+    }
+    actual = {
+        _normalize(row.day, row.user_id, row.detection_type, row.is_confirmed): row.count
+        for row in (await db.execute(
+            select(EmergencyDailyRollup).where(EmergencyDailyRollup.count != 0)
+        )).scalars().all()
+    }
+    return [
+        (key, expected.get(key, 0), actual.get(key, 0))
+        for key in sorted(set(expected) | set(actual), key=repr)
+        if expected.get(key, 0) != actual.get(key, 0)
+    ]
+
+async def _main(command: str) -> int:
+    async with async_session() as db:
+        if command == "backfill":
+            rows = await backfill(db)
+            print(f"Rebuilt emergency_daily_rollups: {rows} rows")
+            return 0
+        mismatches = await check(db)
+        for key, expected, actual in mismatches:
+            print(f"{key}: emergencies={expected} rollup={actual}")
+        print(f"{len(mismatches)} mismatched rollup rows")
+        return 1 if mismatches else 0
+
+if __name__ == "__main__":
+    # python -m app.core.rollups backfill|check
+    parser = argparse.ArgumentParser(description="Maintain emergency_daily_rollups")
+    parser.add_argument("command", choices=("backfill", "check"))
+    sys.exit(asyncio.run(_main(parser.parse_args().command)))
@@ -1,10 +1,82 @@
 from datetime import datetime, timedelta
-from typing import Optional
+from typing import Callable, List, NamedTuple, Optional
+from fastapi import Depends, HTTPException, status
+from fastapi.security import OAuth2PasswordBearer
 from jose import JWTError, jwt
 from passlib.context import CryptContext
+from sqlalchemy import event, inspect
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
 from app.config import settings
+from app.core.cache import LRUCache
+from app.core.database import get_db
+from app.models.user import User as UserModel
+from concurrent.futures import ThreadPoolExecutor
+import asyncio
+import hashlib
+import heapq
+import time
 
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+# Hashes below BCRYPT_ROUNDS count as outdated and are upgraded on next login
+pwd_context = CryptContext(
+    schemes=["bcrypt"],
+    deprecated="auto",
+    bcrypt__default_rounds=settings.BCRYPT_ROUNDS,
+    bcrypt__min_rounds=settings.BCRYPT_ROUNDS
+)
+
+# bcrypt is deliberately slow (~100-300 ms) and releases the GIL, so it runs on
+# its own small pool instead of the event loop or the default executor. At
+# most PASSWORD_HASH_MAX_PENDING hashes may wait; beyond that callers are
+# turned away, so a login storm cannot queue up unbounded work.
+password_executor = ThreadPoolExecutor(
+    max_workers=settings.PASSWORD_HASH_WORKERS,
+    thread_name_prefix="password-hash"
+)
+_password_slots: Optional[asyncio.Semaphore] = None
+
+class PasswordHasherBusyError(RuntimeError):
+    pass
+
+class RevokedTokens:
+    # Digests of revoked tokens, each kept until its token's exp and never
+    # evicted for space: dropping one early would let a revoked token back in.
+    # Expired entries are purged oldest-first as new ones arrive, so the set
+    # holds at most the tokens revoked within one token lifetime. Per process,
+    # like token_cache; a revocation is not seen by other workers.
+    def __init__(self, clock: Callable[[], float] = time.time):
+        self.clock = clock
+        self.expiries: dict = {}
+        self.heap: List[tuple] = []
+
+    def __len__(self):
+        return len(self.expiries)
+
+    def __contains__(self, key):
+        if key not in self.expiries:
+            return False
+        expires_at = self.expiries[key]
+        return expires_at is None or expires_at > self.clock()
+
+    def add(self, key: bytes, expires_at: Optional[float]):
+        self.purge()
+        self.expiries[key] = expires_at
+        if expires_at is not None:
+            heapq.heappush(self.heap, (expires_at, key))
+
+    def purge(self):
+        now = self.clock()
+        while self.heap and self.heap[0][0] <= now:
+            expires_at, key = heapq.heappop(self.heap)
+            if self.expiries.get(key) == expires_at:
+                del self.expiries[key]
+
+# Verified token payloads keyed by a digest of the token, held until the
+# token's own exp. Devices reuse one long-lived token for thousands of calls,
+# so the HS256 verification only runs the first time each token is seen.
+token_cache = LRUCache(max_entries=settings.TOKEN_CACHE_MAX_ENTRIES, clock=time.time)
+revoked_tokens = RevokedTokens()
+revocation_checks: List[Callable[[dict], bool]] = []
 
 def verify_password(plain_password: str, hashed_password: str) -> bool:
     return pwd_context.verify(plain_password, hashed_password)
@@ -12,6 +84,24 @@ def verify_password(plain_password: str, hashed_password: str) -> bool:
 def get_password_hash(password: str) -> str:
     return pwd_context.hash(password)
 
+async def _run_password_job(func, *args):
+    global _password_slots
+    if _password_slots is None:
+        _password_slots = asyncio.Semaphore(settings.PASSWORD_HASH_MAX_PENDING)
+    if _password_slots.locked():
+        raise PasswordHasherBusyError("Too many password hashes in progress")
+    async with _password_slots:
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(password_executor, func, *args)
+
+async def hash_password_async(password: str) -> str:
+    return await _run_password_job(pwd_context.hash, password)
+
+async def verify_and_update_password(plain_password: str, hashed_password: str):
+    # Returns (valid, new_hash); new_hash is set when the stored hash uses an
+    # outdated scheme or cost and should replace it
+    return await _run_password_job(pwd_context.verify_and_update, plain_password, hashed_password)
+
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None) -> str:
     to_encode = data.copy()
     if expires_delta:
@@ -22,9 +112,143 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None) -
     encoded_jwt = jwt.encode(to_encode, settings.SECRET_KEY, algorithm="HS256")
     return encoded_jwt
 
-def decode_access_token(token: str):
+def _token_key(token: str) -> bytes:
+    return hashlib.sha256(token.encode("utf-8")).digest()
+
+def register_revocation_check(check: Callable[[dict], bool]):
+    # `check(payload)` returning True rejects the token; it runs on cache hits too
+    revocation_checks.append(check)
+
+def revoke_token(token: str):
+    key = _token_key(token)
+    token_cache.invalidate(key)
+    try:
+        exp = jwt.get_unverified_claims(token).get("exp")
+    except JWTError:
+        return
+    # Only remembered until the token would have expired anyway
+    revoked_tokens.add(key, exp)
+
+def _decode_and_verify(token: str):
     try:
         payload = jwt.decode(token, settings.SECRET_KEY, algorithms=["HS256"])
         return payload
     except JWTError:
-        return None
\ No newline at end of file
+        return None
+
+def decode_access_token(token: str):
+    key = _token_key(token)
+    payload = token_cache.get(key)
+    if payload is None:
+        if key in revoked_tokens:
+            return None
+        payload = _decode_and_verify(token)
+        if payload is None:
+            return None
+        if payload.get("exp") is not None:
+            token_cache.set(key, payload, expires_at=payload["exp"])
+    
+    if any(check(payload) for check in revocation_checks):
+        return None
+    return payload
+
+oauth2_scheme = OAuth2PasswordBearer(tokenUrl=f"{settings.API_V1_STR}/auth/token")
+
+class Principal(NamedTuple):
+    # Immutable snapshot of the authenticated user, safe to share between
+    # concurrent requests (a cached ORM instance is not)
+    id: str
+    email: str
+    full_name: Optional[str]
+    phone_number: Optional[str]
+    is_active: bool
+    is_admin: bool
+
+    @classmethod
+    def from_user(cls, user) -> "Principal":
+        return cls(
+            user.id,
+            user.email,
+            user.full_name,
+            user.phone_number,
+            bool(user.is_active),
+            bool(user.is_admin)
+        )
+
+# Principals by token subject (email), so authenticated endpoints do not hit
+# the users table on every call. principal_generation is bumped on every
+# invalidation; a lookup that started before one does not cache its result,
+# which may predate the change.
+principal_cache = LRUCache(
+    max_entries=settings.PRINCIPAL_CACHE_MAX_ENTRIES,
+    ttl=settings.PRINCIPAL_CACHE_TTL_SECONDS
+)
+principal_generation = 0
+
+def invalidate_principal(email: str):
+    global principal_generation
+    principal_generation += 1
+    principal_cache.invalidate(email)
+
+@event.listens_for(Session, "after_flush")
+def _collect_changed_principals(session, flush_context):
+    changed = session.info.setdefault("changed_principals", set())
+    for obj in list(session.dirty) + list(session.deleted):
+        if isinstance(obj, UserModel):
+            changed.add(obj.email)
+            # An email change must also evict the entry under the old subject
+            changed.update(v for v in inspect(obj).attrs.email.history.deleted if v)
+
+@event.listens_for(Session, "after_commit")
+def _invalidate_changed_principals(session):
+    # Evict only after commit, so a concurrent request cannot re-cache the
+    # pre-commit row between the flush and the commit
+    for email in session.info.pop("changed_principals", ()):
+        invalidate_principal(email)
+
+@event.listens_for(Session, "after_rollback")
+def _discard_changed_principals(session):
+    session.info.pop("changed_principals", None)
+
+async def get_user_from_token(db: AsyncSession, token: str) -> Optional[Principal]:
+    # Resolve a bearer token to its principal, or None if it is invalid
+    payload = decode_access_token(token)
+    if not payload:
+        return None
+
+    email: str = payload.get("sub")
+    if email is None:
+        return None
+
+    principal = principal_cache.get(email)
+    if principal is None:
+        generation = principal_generation
+        user = await UserModel.get_by_email(db, email)
+        if user is None:
+            return None
+        principal = Principal.from_user(user)
+        if generation == principal_generation:
+            principal_cache.set(email, principal)
+    return principal
+
+async def get_current_user(
+    token: str = Depends(oauth2_scheme),
+    db: AsyncSession = Depends(get_db)
+) -> Principal:
+    credentials_exception = HTTPException(
+        status_code=status.HTTP_401_UNAUTHORIZED,
+        detail="Could not validate credentials",
+        headers={"WWW-Authenticate": "Bearer"},
+    )
+    user = await get_user_from_token(db, token)
+    if user is None:
+        raise credentials_exception
+    return user
+
+async def get_current_admin_user(current_user: Principal = Depends(get_current_user)) -> Principal:
+    if not current_user.is_admin:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Admin privileges required"
+        )
+    return current_user
@@ -0,0 +1,195 @@
+import math
+from datetime import datetime
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+from app.core.utils import haversine_many, smallest_k, EARTH_RADIUS_KM
+from app.config import settings
+
+KM_PER_DEG_LAT = math.pi * EARTH_RADIUS_KM / 180.0
+MAX_SEARCH_KM = math.pi * EARTH_RADIUS_KM
+
+class IndexedVolunteer:
+    __slots__ = ("user_id", "latitude", "longitude", "qualifications", "last_updated", "cell")
+
+    def __init__(self, user_id: str, latitude: float, longitude: float,
+                 qualifications: Optional[List[str]] = None,
+                 last_updated: Optional[datetime] = None):
+        self.user_id = user_id
+        self.latitude = latitude
+        self.longitude = longitude
+        self.qualifications = qualifications or []
+        self.last_updated = last_updated
+        self.cell = None
+
+class VolunteerIndex:
+    # Uniform lat/lng grid over the active volunteers. Each cell maps user_id to
+    # the volunteer's last known position, so a radius or k-nearest lookup only
+    # visits the cells overlapping the search area instead of every volunteer.
+    # `version` counts local changes and `changed` holds the version of each
+    # user's latest one, so a refresh can tell which users it must not revert.
+    def __init__(self, cell_deg: float = 0.05):
+        self.cell_deg = cell_deg
+        self.n_cols = int(math.ceil(360.0 / cell_deg))
+        self.cells: Dict[Tuple[int, int], Dict[str, IndexedVolunteer]] = {}
+        self.entries: Dict[str, IndexedVolunteer] = {}
+        self.version = 0
+        self.changed: Dict[str, int] = {}
+
+    def __len__(self):
+        return len(self.entries)
+
+    def __contains__(self, user_id):
+        return user_id in self.entries
+
+    def _cell(self, latitude: float, longitude: float) -> Tuple[int, int]:
+        row = int(math.floor(latitude / self.cell_deg))
+        col = int(math.floor((longitude + 180.0) / self.cell_deg)) % self.n_cols
+        return row, col
+
+    def _place(self, entry: IndexedVolunteer):
+        cell = self._cell(entry.latitude, entry.longitude)
+        if cell == entry.cell:
+            return
+        self._unplace(entry)
+        self.cells.setdefault(cell, {})[entry.user_id] = entry
+        entry.cell = cell
+
+    def _unplace(self, entry: IndexedVolunteer):
+        if entry.cell is None:
+            return
+        bucket = self.cells.get(entry.cell)
+        if bucket is not None:
+            bucket.pop(entry.user_id, None)
+            if not bucket:
+                del self.cells[entry.cell]
+        entry.cell = None
+
+    def _touch(self, user_id: str):
+        self.version += 1
+        self.changed[user_id] = self.version
+
+    def upsert(self, user_id: str, latitude: float, longitude: float,
+               qualifications: Optional[List[str]] = None,
+               last_updated: Optional[datetime] = None):
+        entry = self.entries.get(user_id)
+        if entry is None:
+            entry = IndexedVolunteer(user_id, latitude, longitude, qualifications, last_updated)
+            self.entries[user_id] = entry
+        else:
+            entry.latitude = latitude
+            entry.longitude = longitude
+            if qualifications is not None:
+                entry.qualifications = qualifications
+            if last_updated is not None:
+                entry.last_updated = last_updated
+        self._place(entry)
+        self._touch(user_id)
+        return entry
+
+    def remove(self, user_id: str):
+        entry = self.entries.pop(user_id, None)
+        if entry is not None:
+            self._unplace(entry)
+        self._touch(user_id)
+
+    def move(self, user_id: str, latitude: float, longitude: float,
+             last_updated: Optional[datetime] = None) -> bool:
+        # Location writes for users that are not active volunteers are ignored
+        if user_id not in self.entries:
+            return False
+        self.upsert(user_id, latitude, longitude, last_updated=last_updated)
+        return True
+
+    def replace(self, entries: Iterable[IndexedVolunteer], since_version: Optional[int] = None):
+        # Rebuild off to the side and swap, so readers never see a half-built
+        # grid. since_version is `version` as of when `entries` was read: users
+        # upserted, moved or removed after that keep their live state, which
+        # is newer than the snapshot. None takes the snapshot as is.
+        newer = set() if since_version is None else {
+            user_id for user_id, version in self.changed.items() if version > since_version
+        }
+        fresh = VolunteerIndex(self.cell_deg)
+        for entry in entries:
+            if entry.user_id not in newer:
+                fresh.upsert(entry.user_id, entry.latitude, entry.longitude,
+                             entry.qualifications, entry.last_updated)
+        for user_id in newer:
+            live = self.entries.get(user_id)
+            if live is not None:
+                fresh.upsert(live.user_id, live.latitude, live.longitude,
+                             live.qualifications, live.last_updated)
+        self.cells, self.entries = fresh.cells, fresh.entries
+        self.changed = {user_id: self.changed[user_id] for user_id in newer}
+
+    def _candidate_cells(self, latitude: float, longitude: float, radius_km: float):
+        dlat = radius_km / KM_PER_DEG_LAT
+        lat_lo = max(latitude - dlat, -90.0)
+        lat_hi = min(latitude + dlat, 90.0)
+        row_lo = int(math.floor(lat_lo / self.cell_deg))
+        row_hi = int(math.floor(lat_hi / self.cell_deg))
+
+        cos_lat = math.cos(math.radians(max(abs(lat_lo), abs(lat_hi))))
+        if cos_lat < 1e-9 or radius_km / (KM_PER_DEG_LAT * cos_lat) >= 180.0:
+            n_cols = self.n_cols
+            col_lo = 0
+        else:
+            dlon = radius_km / (KM_PER_DEG_LAT * cos_lat)
+            col_lo = int(math.floor((longitude - dlon + 180.0) / self.cell_deg))
+            col_hi = int(math.floor((longitude + dlon + 180.0) / self.cell_deg))
+            n_cols = min(col_hi - col_lo + 1, self.n_cols)
+
+        # Very wide searches touch more grid cells than are occupied
+        if (row_hi - row_lo + 1) * n_cols > len(self.cells):
+            return list(self.cells.values())
+
+        buckets = []
+        for row in range(row_lo, row_hi + 1):
+            for offset in range(n_cols):
+                bucket = self.cells.get((row, (col_lo + offset) % self.n_cols))
+                if bucket:
+                    buckets.append(bucket)
+        return buckets
+
+    def candidates(self, latitude: float, longitude: float, radius_km: float) -> List[IndexedVolunteer]:
+        # Superset of the volunteers within radius_km; callers apply the exact distance filter
+        found = []
+        for bucket in self._candidate_cells(latitude, longitude, radius_km):
+            found.extend(bucket.values())
+        return found
+
+    def within(self, latitude: float, longitude: float, radius_km: float,
+               limit: Optional[int] = None,
+               qualifications: Optional[List[str]] = None) -> List[Tuple[float, IndexedVolunteer]]:
+        # Closest volunteers within radius_km, sorted by distance
+        entries = self.candidates(latitude, longitude, radius_km)
+        if qualifications:
+            required = set(qualifications)
+            entries = [entry for entry in entries if required.issubset(entry.qualifications)]
+        if not entries:
+            return []
+
+        count = len(entries)
+        lats = np.fromiter((entry.latitude for entry in entries), dtype=np.float64, count=count)
+        lons = np.fromiter((entry.longitude for entry in entries), dtype=np.float64, count=count)
+        distances = haversine_many(latitude, longitude, lats, lons)
+
+        inside = np.flatnonzero(distances <= radius_km)
+        order = inside[smallest_k(distances[inside], limit)]
+        return [(float(distances[i]), entries[i]) for i in order]
+
+    def nearest(self, latitude: float, longitude: float, k: int,
+                max_radius_km: float = MAX_SEARCH_KM,
+                qualifications: Optional[List[str]] = None) -> List[Tuple[float, IndexedVolunteer]]:
+        # Grow the search radius until it holds k volunteers; everything closer
+        # than the k-th match is then guaranteed to be inside the radius
+        radius_km = min(self.cell_deg * KM_PER_DEG_LAT, max_radius_km)
+        while True:
+            matches = self.within(latitude, longitude, radius_km, limit=k,
+                                  qualifications=qualifications)
+            if len(matches) >= k or radius_km >= max_radius_km:
+                return matches
+            radius_km = min(radius_km * 2, max_radius_km)
+
+volunteer_index = VolunteerIndex(cell_deg=settings.VOLUNTEER_INDEX_CELL_DEG)
@@ -0,0 +1,97 @@
+import math
+from decimal import Decimal, InvalidOperation
+from typing import Optional
+
+import numpy as np
+
+EARTH_RADIUS_KM = 6371.0
+
+# ISO 4217 minor-unit exponents that differ from the usual 2
+CURRENCY_EXPONENTS = {"JPY": 0, "KRW": 0, "VND": 0, "BHD": 3, "KWD": 3, "OMR": 3, "TND": 3}
+
+def currency_exponent(currency: str) -> int:
+    return CURRENCY_EXPONENTS.get(currency.upper(), 2)
+
+def to_minor_units(amount, currency: str) -> int:
+    # Exact integer amount in the currency's minor unit (cents for USD).
+    # Amounts finer than the minor unit are rejected rather than rounded.
+    try:
+        value = Decimal(str(amount)).scaleb(currency_exponent(currency))
+    except InvalidOperation:
+        raise ValueError(f"Invalid amount {amount!r}")
+    if not value.is_finite() or value != value.to_integral_value():
+        raise ValueError(f"{amount} is not a whole number of {currency} minor units")
+    return int(value)
+
+def from_minor_units(amount_minor: int, currency: str) -> Decimal:
+    # Exact, with the currency's number of decimal places (1250 USD -> 12.50)
+    return Decimal(amount_minor).scaleb(-currency_exponent(currency))
+
+def haversine(lat1, lon1, lat2, lon2):
+    # Calculate distance between two points on Earth in kilometers
+    lat1_rad = math.radians(lat1)
+    lon1_rad = math.radians(lon1)
+    lat2_rad = math.radians(lat2)
+    lon2_rad = math.radians(lon2)
+
+    dlon = lon2_rad - lon1_rad
+    dlat = lat2_rad - lat1_rad
+
+    a = math.sin(dlat / 2)**2 + math.cos(lat1_rad) * math.cos(lat2_rad) * math.sin(dlon / 2)**2
+    c = 2 * math.atan2(math.sqrt(a), math.sqrt(1 - a))
+
+    return EARTH_RADIUS_KM * c
+
+def haversine_many(lat, lon, lats: np.ndarray, lons: np.ndarray) -> np.ndarray:
+    # Distances in kilometers from one point to whole arrays of points
+    lat_rad = math.radians(lat)
+    lats_rad = np.radians(lats)
+    dlat = lats_rad - lat_rad
+    dlon = np.radians(lons) - math.radians(lon)
+
+    a = np.sin(dlat / 2)**2 + math.cos(lat_rad) * np.cos(lats_rad) * np.sin(dlon / 2)**2
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(np.minimum(a, 1.0)))
+
+def smallest_k(values: np.ndarray, k: Optional[int] = None) -> np.ndarray:
+    # Indices of the k smallest values in ascending order. argpartition keeps
+    # this O(n + k log k) instead of sorting every candidate.
+    if k is None or k >= len(values):
+        return np.argsort(values, kind="stable")
+    if k <= 0:
+        return np.empty(0, dtype=np.intp)
+    part = np.argpartition(values, k - 1)[:k]
+    return part[np.argsort(values[part], kind="stable")]
+
+def simplify_track(lats: np.ndarray, lons: np.ndarray, tolerance_m: float) -> np.ndarray:
+    # Douglas-Peucker on a local equirectangular projection. Returns a boolean
+    # mask of the points to keep; the first and last point are always kept.
+    n = len(lats)
+    keep = np.ones(n, dtype=bool)
+    if n < 3:
+        return keep
+    keep[1:-1] = False
+
+    radius_m = EARTH_RADIUS_KM * 1000.0
+    lat0 = math.radians(float(np.mean(lats)))
+    x = np.radians(lons.astype(np.float64)) * math.cos(lat0) * radius_m
+    y = np.radians(lats.astype(np.float64)) * radius_m
+
+    stack = [(0, n - 1)]
+    while stack:
+        start, end = stack.pop()
+        if end - start < 2:
+            continue
+        dx, dy = x[end] - x[start], y[end] - y[start]
+        px, py = x[start + 1:end] - x[start], y[start + 1:end] - y[start]
+        length = math.hypot(dx, dy)
+        if length == 0:
+            distances = np.hypot(px, py)
+        else:
+            distances = np.abs(dx * py - dy * px) / length
+        i = int(np.argmax(distances))
+        if distances[i] > tolerance_m:
+            split = start + 1 + i
+            keep[split] = True
+            stack.append((start, split))
+            stack.append((split, end))
+    return keep
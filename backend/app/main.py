@@ -9,10 +9,22 @@ from app.api import (
     history, 
     volunteer, 
     payment, 
-    admin
+    admin,
+    metrics,
+    profiling
 )
-from app.core.database import engine, Base
+from app.core.database import engine, Base, async_session
+from app.core.ai_models import ai_models
+from app.core.notifications import notification_service
+from app.core.outbox import outbox_dispatcher
+from app.core.location_buffer import location_buffer
+from app.core.migrations import run_migrations
+from app.core.location_history import location_history
+from app.core.rollups import backfill_if_empty
+from app.core.metrics import MetricsMiddleware
+from app.core.profiler import ProfilerMiddleware
 from app.config import settings
+import asyncio
 
 app = FastAPI(title=settings.PROJECT_NAME)
 
@@ -25,11 +37,53 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+if settings.PROFILER_ENABLED:
+    app.add_middleware(ProfilerMiddleware)
+
+# Outermost, so the timings include the other middleware
+if settings.METRICS_ENABLED:
+    app.add_middleware(
+        MetricsMiddleware,
+        slow_request_ms=settings.SLOW_REQUEST_LOG_MS,
+        slow_request_top_statements=settings.SLOW_REQUEST_LOG_TOP_STATEMENTS
+    )
+
 # Create database tables
 @app.on_event("startup")
 async def startup():
     async with engine.begin() as conn:
         await conn.run_sync(Base.metadata.create_all)
+        await run_migrations(conn)
+    
+    async with async_session() as db:
+        await backfill_if_empty(db)
+        await volunteer.load_volunteer_index(db)
+    asyncio.create_task(refresh_volunteer_index())
+    outbox_dispatcher.start()
+    location_buffer.start()
+    location_history.start()
+    
+    # Start inference workers before traffic arrives rather than on first use
+    if settings.INFERENCE_WORKERS > 0:
+        await ai_models.load_models()
+
+@app.on_event("shutdown")
+async def shutdown():
+    await location_buffer.stop()
+    await location_history.stop()
+    await outbox_dispatcher.stop()
+    await ai_models.close()
+    await notification_service.close()
+
+async def refresh_volunteer_index():
+    # Picks up volunteer changes written by other worker processes
+    while True:
+        await asyncio.sleep(settings.VOLUNTEER_INDEX_REFRESH_SECONDS)
+        try:
+            async with async_session() as db:
+                await volunteer.load_volunteer_index(db)
+        except Exception as e:
+            print(f"Volunteer index refresh failed: {e}")
 
 # Include all API routers
 app.include_router(auth.router, prefix=settings.API_V1_STR)
@@ -41,6 +95,13 @@ app.include_router(history.router, prefix=settings.API_V1_STR)
 app.include_router(volunteer.router, prefix=settings.API_V1_STR)
 app.include_router(payment.router, prefix=settings.API_V1_STR)
 app.include_router(admin.router, prefix=settings.API_V1_STR)
+if settings.PROFILER_ENABLED:
+    app.include_router(profiling.router, prefix=settings.API_V1_STR)
+
+# Scraped at the conventional path, outside the versioned API; only served
+# once a scrape token is configured
+if settings.METRICS_ENABLED and settings.METRICS_TOKEN:
+    app.include_router(metrics.router)
 
 @app.get("/")
 async def root():
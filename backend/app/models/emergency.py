@@ -1,11 +1,11 @@
-from sqlalchemy import Column, String, Boolean, DateTime, JSON, ForeignKey
-from sqlalchemy.sql import func
-from app.core.database import Base
+from sqlalchemy import Column, String, Boolean, Date, DateTime, Integer, JSON, ForeignKey, Index, literal, select, tuple_
+from app.core.database import Base, utc_now
+import uuid
 
 class Emergency(Base):
     __tablename__ = "emergencies"
     
-    id = Column(String, primary_key=True, index=True)
+    id = Column(String, primary_key=True, index=True, default=lambda: str(uuid.uuid4()))
     user_id = Column(String, ForeignKey("users.id"), index=True)
     detection_type = Column(String)  # "audio", "manual", etc.
     detection_data = Column(JSON)    # Raw detection data
@@ -14,7 +14,17 @@ class Emergency(Base):
     location_lng = Column(String)
     additional_info = Column(String)
     resolved_at = Column(DateTime(timezone=True))
-    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    idempotency_key = Column(String)
+    created_at = Column(DateTime(timezone=True), server_default=utc_now())
+    
+    __table_args__ = (
+        # Serves the keyset-paginated history, newest first
+        Index("ix_emergencies_user_created_id", "user_id", "created_at", "id"),
+        # A retried SOS with the same key replays the first emergency
+        Index("ux_emergencies_user_idempotency", "user_id", "idempotency_key", unique=True),
+        # The first, partial day of the admin analytics window
+        Index("ix_emergencies_created_at", "created_at"),
+    )
     
     @classmethod
     async def get_by_user(cls, db, user_id: str, since=None):
@@ -24,8 +34,49 @@ class Emergency(Base):
         result = await db.execute(stmt.order_by(cls.created_at.desc()))
         return result.scalars().all()
     
-    async def save(self, db):
+    @classmethod
+    async def get_by_idempotency_key(cls, db, user_id: str, idempotency_key: str):
+        result = await db.execute(
+            select(cls).where(cls.user_id == user_id, cls.idempotency_key == idempotency_key)
+        )
+        return result.scalars().first()
+    
+    @classmethod
+    def history_query(cls, user_id: str, since=None, after=None, columns=None):
+        # Newest first, keyed on (created_at, id) so a page resumes exactly
+        # after the last row of the previous one however many rows came in since.
+        # `after` is that last row's (created_at, id).
+        stmt = select(*(columns or [cls])).where(cls.user_id == user_id)
+        if since:
+            stmt = stmt.where(cls.created_at >= since)
+        if after:
+            created_at, row_id = after
+            stmt = stmt.where(tuple_(cls.created_at, cls.id) < tuple_(
+                literal(created_at, cls.created_at.type),
+                literal(row_id, cls.id.type)
+            ))
+        return stmt.order_by(cls.created_at.desc(), cls.id.desc())
+    
+    async def save(self, db, flush: bool = False):
+        # Joins the request's unit of work: the row is written when the
+        # request commits, or right away with flush=True (e.g. when a later
+        # statement needs it to exist)
         db.add(self)
-        await db.commit()
-        await db.refresh(self)
-        return self
\ No newline at end of file
+        if flush:
+            await db.flush()
+        return self
+
+class EmergencyDailyRollup(Base):
+    # Emergencies per UTC day, user, detection type and confirmation state,
+    # kept current by app/core/rollups.py so analytics never scan emergencies
+    __tablename__ = "emergency_daily_rollups"
+    
+    day = Column(Date, primary_key=True)
+    user_id = Column(String, primary_key=True)
+    detection_type = Column(String, primary_key=True)  # "" when unknown
+    is_confirmed = Column(Boolean, primary_key=True)
+    count = Column(Integer, nullable=False, default=0)
+    
+    __table_args__ = (
+        Index("ix_emergency_daily_rollups_user_day", "user_id", "day"),
+    )
\ No newline at end of file
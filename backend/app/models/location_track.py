@@ -0,0 +1,54 @@
+from sqlalchemy import Column, String, Integer, BigInteger, Boolean, LargeBinary, ForeignKey, Index, select, and_, text
+from app.core.database import Base
+import uuid
+
+class LocationTrack(Base):
+    # One user's trajectory over one time bucket, stored column-wise:
+    # little-endian float32 latitudes/longitudes and uint32 millisecond deltas
+    # (the first relative to bucket_start_ms, the rest to the previous point)
+    __tablename__ = "location_tracks"
+
+    id = Column(String, primary_key=True, index=True, default=lambda: str(uuid.uuid4()))
+    user_id = Column(String, ForeignKey("users.id"))
+    bucket_start_ms = Column(BigInteger)
+    point_count = Column(Integer)
+    simplified = Column(Boolean, default=False)
+    latitudes = Column(LargeBinary)
+    longitudes = Column(LargeBinary)
+    time_deltas = Column(LargeBinary)
+
+    __table_args__ = (
+        Index("ux_location_tracks_user_bucket", "user_id", "bucket_start_ms", unique=True),
+        # Partial: compaction only ever looks for buckets not yet simplified
+        Index(
+            "ix_location_tracks_unsimplified",
+            "bucket_start_ms",
+            sqlite_where=text("simplified = 0"),
+            postgresql_where=text("NOT simplified")
+        ),
+    )
+
+    @classmethod
+    def compaction_query(cls, cutoff_ms: int, bucket_ms: int, limit: int):
+        # Buckets that closed before cutoff_ms and still hold every point
+        return select(cls).where(and_(
+            cls.simplified == False,
+            cls.bucket_start_ms <= cutoff_ms - bucket_ms
+        )).order_by(
+            cls.bucket_start_ms
+        ).limit(limit)
+
+    @classmethod
+    def range_query(cls, user_id: str, start_ms: int, end_ms: int, bucket_ms: int):
+        # Raw blob columns of the buckets overlapping [start_ms, end_ms)
+        table = cls.__table__
+        return select(
+            table.c.bucket_start_ms,
+            table.c.latitudes,
+            table.c.longitudes,
+            table.c.time_deltas
+        ).where(and_(
+            table.c.user_id == user_id,
+            table.c.bucket_start_ms > start_ms - bucket_ms,
+            table.c.bucket_start_ms < end_ms
+        ))
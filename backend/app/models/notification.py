@@ -0,0 +1,98 @@
+from sqlalchemy import Column, String, Integer, DateTime, ForeignKey, Index, select
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.sql import func
+from app.core.database import Base
+from datetime import datetime
+from typing import List, Optional, Tuple
+import hashlib
+import uuid
+
+class NotificationOutbox(Base):
+    __tablename__ = "notification_outbox"
+    
+    id = Column(String, primary_key=True, index=True, default=lambda: str(uuid.uuid4()))
+    channel = Column(String)  # "sms", "push", "email"
+    recipient = Column(String)
+    title = Column(String)
+    body = Column(String)
+    emergency_id = Column(String, ForeignKey("emergencies.id"), index=True)
+    dedup_key = Column(String, unique=True)
+    status = Column(String, default="pending")  # "pending", "sending", "sent", "dead"
+    attempts = Column(Integer, default=0)
+    next_attempt_at = Column(DateTime(timezone=True))
+    claim_token = Column(String)
+    last_error = Column(String)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    sent_at = Column(DateTime(timezone=True))
+    
+    __table_args__ = (
+        Index("ix_notification_outbox_due", "status", "next_attempt_at"),
+    )
+    
+    @classmethod
+    def due_query(cls, now: datetime, limit: int):
+        # Ids of messages whose next attempt (or expired lease) is due, oldest first
+        return select(cls.id).where(
+            cls.status.in_(("pending", "sending")),
+            cls.next_attempt_at <= now
+        ).order_by(
+            cls.next_attempt_at
+        ).limit(limit)
+    
+    @classmethod
+    async def count_for_emergency(cls, db, emergency_id: str) -> int:
+        result = await db.execute(
+            select(func.count(cls.id)).where(cls.emergency_id == emergency_id)
+        )
+        return result.scalar()
+    
+    @staticmethod
+    def make_dedup_key(channel: str, recipient: str, idempotency_key: str) -> str:
+        # One message per recipient per enqueue call; a retried call that
+        # carries the same idempotency key maps onto the same rows
+        return hashlib.sha256(f"{channel}|{recipient}|{idempotency_key}".encode("utf-8")).hexdigest()
+    
+    @classmethod
+    async def enqueue(
+        cls,
+        db,
+        messages: List[Tuple[str, str, Optional[str], str]],
+        emergency_id: Optional[str] = None,
+        idempotency_key: Optional[str] = None
+    ) -> List[str]:
+        # messages are (channel, recipient, title, body). Rows join the caller's
+        # transaction and are only delivered once it commits. Without an
+        # idempotency key every call queues new messages, even with the same
+        # content; with one, a retry is skipped by ON CONFLICT DO NOTHING and
+        # returns the ids queued the first time, so it never fails (or rolls
+        # back its Emergency) on the unique dedup key.
+        now = datetime.utcnow()
+        scope = idempotency_key or str(uuid.uuid4())
+        rows = {}
+        for channel, recipient, title, body in messages:
+            dedup_key = cls.make_dedup_key(channel, recipient, scope)
+            rows.setdefault(dedup_key, {
+                "id": str(uuid.uuid4()),
+                "channel": channel,
+                "recipient": recipient,
+                "title": title,
+                "body": body,
+                "emergency_id": emergency_id,
+                "dedup_key": dedup_key,
+                "status": "pending",
+                "attempts": 0,
+                "next_attempt_at": now,
+                "created_at": now
+            })
+        if not rows:
+            return []
+        
+        dialect = db.bind.dialect.name
+        insert = postgresql.insert if dialect == "postgresql" else sqlite.insert
+        stmt = insert(cls.__table__).values(list(rows.values()))
+        await db.execute(stmt.on_conflict_do_nothing(index_elements=["dedup_key"]))
+        
+        result = await db.execute(
+            select(cls.id).where(cls.dedup_key.in_(list(rows)))
+        )
+        return result.scalars().all()
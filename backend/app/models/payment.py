@@ -1,17 +1,25 @@
-from sqlalchemy import Column, String, Float, DateTime, ForeignKey
+from sqlalchemy import Column, String, BigInteger, DateTime, ForeignKey, Index, select
+from sqlalchemy.dialects import postgresql, sqlite
 from sqlalchemy.sql import func
 from app.core.database import Base
+from typing import Optional
+import uuid
 
 class Wallet(Base):
     __tablename__ = "wallets"
     
-    id = Column(String, primary_key=True, index=True)
-    user_id = Column(String, ForeignKey("users.id"), index=True)
-    balance = Column(Float, default=0.0)
+    id = Column(String, primary_key=True, index=True, default=lambda: str(uuid.uuid4()))
+    user_id = Column(String, ForeignKey("users.id"))
+    balance_minor = Column(BigInteger, nullable=False, default=0)  # e.g. cents
     currency = Column(String, default="USD")
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     updated_at = Column(DateTime(timezone=True), onupdate=func.now())
     
+    __table_args__ = (
+        # One wallet per user; also the conflict target of credit()
+        Index("ux_wallets_user_id", "user_id", unique=True),
+    )
+    
     @classmethod
     async def get_by_user(cls, db, user_id: str):
         result = await db.execute(
@@ -19,27 +27,96 @@ class Wallet(Base):
         )
         return result.scalars().first()
     
-    async def save(self, db):
+    @classmethod
+    async def credit(cls, db, user_id: str, amount_minor: int, currency: str) -> Optional[int]:
+        # Adds amount_minor to the user's wallet, creating it if needed, in one
+        # atomic UPSERT (balance = balance + amount) so concurrent deposits
+        # never read-modify-write a stale balance. Returns the new balance, or
+        # None if the wallet holds a different currency. Runs in the caller's
+        # transaction.
+        table = cls.__table__
+        dialect = db.bind.dialect.name
+        insert = postgresql.insert if dialect == "postgresql" else sqlite.insert
+        stmt = insert(table).values(
+            id=str(uuid.uuid4()),
+            user_id=user_id,
+            balance_minor=amount_minor,
+            currency=currency
+        )
+        stmt = stmt.on_conflict_do_update(
+            index_elements=["user_id"],
+            set_={"balance_minor": table.c.balance_minor + stmt.excluded.balance_minor, "updated_at": func.now()},
+            where=table.c.currency == stmt.excluded.currency
+        )
+        if dialect == "postgresql":
+            return (await db.execute(stmt.returning(table.c.balance_minor))).scalar()
+
+        # SQLite (without RETURNING support in SQLAlchemy 1.4): the UPSERT took
+        # the database write lock, so the read below sees exactly this update
+        result = await db.execute(stmt)
+        if result.rowcount == 0:
+            return None
+        return (await db.execute(select(cls.balance_minor).where(cls.user_id == user_id))).scalar()
+    
+    async def save(self, db, flush: bool = False):
+        # Joins the request's unit of work: the row is written when the
+        # request commits, or right away with flush=True (e.g. when a later
+        # statement needs it to exist)
         db.add(self)
-        await db.commit()
-        await db.refresh(self)
+        if flush:
+            await db.flush()
         return self
 
 class Transaction(Base):
+    # Append-only ledger: rows are inserted and never updated. A wallet's
+    # balance_minor always equals the sum of its user's completed amounts.
     __tablename__ = "transactions"
     
-    id = Column(String, primary_key=True, index=True)
+    id = Column(String, primary_key=True, index=True, default=lambda: str(uuid.uuid4()))
     user_id = Column(String, ForeignKey("users.id"), index=True)
-    amount = Column(Float)
+    amount_minor = Column(BigInteger, nullable=False)
+    balance_after_minor = Column(BigInteger)
     currency = Column(String, default="USD")
     payment_method = Column(String)
     status = Column(String)  # "pending", "completed", "failed"
     transaction_type = Column(String)  # "deposit", "withdrawal", "payment"
     reference = Column(String)
+    idempotency_key = Column(String)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     
-    async def save(self, db):
+    __table_args__ = (
+        # A retried request with the same key replays the first result
+        Index("ux_transactions_user_idempotency", "user_id", "idempotency_key", unique=True),
+    )
+    
+    @classmethod
+    async def append(cls, db, **values) -> Optional[str]:
+        # Inserts a ledger entry in the caller's transaction and returns its
+        # id, or None when the user already has an entry with this
+        # idempotency_key. Skipping the duplicate with ON CONFLICT DO NOTHING
+        # (rather than catching an IntegrityError) keeps the connection usable
+        # so the caller can roll back and replay the earlier result.
+        values.setdefault("id", str(uuid.uuid4()))
+        insert = postgresql.insert if db.bind.dialect.name == "postgresql" else sqlite.insert
+        result = await db.execute(
+            insert(cls.__table__).values(**values).on_conflict_do_nothing(
+                index_elements=["user_id", "idempotency_key"]
+            )
+        )
+        return values["id"] if result.rowcount else None
+    
+    @classmethod
+    async def get_by_idempotency_key(cls, db, user_id: str, idempotency_key: str):
+        result = await db.execute(
+            select(cls).where(cls.user_id == user_id, cls.idempotency_key == idempotency_key)
+        )
+        return result.scalars().first()
+    
+    async def save(self, db, flush: bool = False):
+        # Joins the request's unit of work: the row is written when the
+        # request commits, or right away with flush=True (e.g. when a later
+        # statement needs it to exist)
         db.add(self)
-        await db.commit()
-        await db.refresh(self)
+        if flush:
+            await db.flush()
         return self
\ No newline at end of file
@@ -0,0 +1,10 @@
+from sqlalchemy import Column, String, DateTime
+from app.core.database import Base
+
+class SchemaMigration(Base):
+    # Versions applied by app/core/migrations.py
+    __tablename__ = "schema_migrations"
+    
+    version = Column(String, primary_key=True)
+    description = Column(String)
+    applied_at = Column(DateTime(timezone=True))
@@ -0,0 +1,62 @@
+from sqlalchemy import Column, String, Boolean, DateTime, JSON, ForeignKey, Index, select
+from sqlalchemy.sql import func
+from app.core.database import Base
+import uuid
+
+class User(Base):
+    __tablename__ = "users"
+    
+    id = Column(String, primary_key=True, index=True, default=lambda: str(uuid.uuid4()))
+    email = Column(String, unique=True, index=True)
+    hashed_password = Column(String)
+    full_name = Column(String)
+    phone_number = Column(String)
+    emergency_contacts = Column(JSON, default=[])  # [{"name": ..., "phone": ...}]
+    is_active = Column(Boolean, default=True)
+    is_admin = Column(Boolean, default=False)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    updated_at = Column(DateTime(timezone=True), onupdate=func.now())
+    
+    @classmethod
+    async def get(cls, db, user_id: str):
+        return await db.get(cls, user_id)
+    
+    @classmethod
+    async def get_by_email(cls, db, email: str):
+        result = await db.execute(
+            select(cls).where(cls.email == email)
+        )
+        return result.scalars().first()
+    
+    async def save(self, db, flush: bool = False):
+        # Joins the request's unit of work: the row is written when the
+        # request commits, or right away with flush=True (e.g. when a later
+        # statement needs it to exist)
+        db.add(self)
+        if flush:
+            await db.flush()
+        return self
+
+class UserLocation(Base):
+    # Latest known position of each user, written in bulk by
+    # app/core/location_buffer.py
+    __tablename__ = "user_locations"
+    
+    id = Column(String, primary_key=True, index=True, default=lambda: str(uuid.uuid4()))
+    user_id = Column(String, ForeignKey("users.id"), nullable=False)
+    latitude = Column(String)
+    longitude = Column(String)
+    accuracy = Column(String)
+    timestamp = Column(DateTime(timezone=True))
+    
+    __table_args__ = (
+        # One row per user; also the conflict target of the buffer's UPSERT
+        Index("ux_user_locations_user_id", "user_id", unique=True),
+    )
+    
+    @classmethod
+    async def get_by_user(cls, db, user_id: str):
+        result = await db.execute(
+            select(cls).where(cls.user_id == user_id)
+        )
+        return result.scalars().first()
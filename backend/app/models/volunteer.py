@@ -1,11 +1,12 @@
-from sqlalchemy import Column, String, Boolean, DateTime, JSON
+from sqlalchemy import Column, String, Boolean, DateTime, JSON, Index, select, text
 from sqlalchemy.sql import func
 from app.core.database import Base
+import uuid
 
 class Volunteer(Base):
     __tablename__ = "volunteers"
     
-    id = Column(String, primary_key=True, index=True)
+    id = Column(String, primary_key=True, index=True, default=lambda: str(uuid.uuid4()))
     user_id = Column(String, index=True)
     is_active = Column(Boolean, default=True)
     qualifications = Column(JSON, default=[])
@@ -13,6 +14,27 @@ class Volunteer(Base):
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     updated_at = Column(DateTime(timezone=True), onupdate=func.now())
     
+    __table_args__ = (
+        # Partial: the nearby index only ever loads active volunteers
+        Index(
+            "ix_volunteers_active_user",
+            "user_id",
+            sqlite_where=text("is_active = 1"),
+            postgresql_where=text("is_active")
+        ),
+    )
+    
+    @classmethod
+    def active_with_locations(cls):
+        # Active volunteers joined to their latest known location
+        from app.models.user import UserLocation
+        return select(cls, UserLocation).join(
+            UserLocation,
+            cls.user_id == UserLocation.user_id
+        ).where(
+            cls.is_active == True
+        )
+    
     @classmethod
     async def get_by_user(cls, db, user_id: str):
         result = await db.execute(
@@ -20,8 +42,11 @@ class Volunteer(Base):
         )
         return result.scalars().first()
     
-    async def save(self, db):
+    async def save(self, db, flush: bool = False):
+        # Joins the request's unit of work: the row is written when the
+        # request commits, or right away with flush=True (e.g. when a later
+        # statement needs it to exist)
         db.add(self)
-        await db.commit()
-        await db.refresh(self)
+        if flush:
+            await db.flush()
         return self
\ No newline at end of file
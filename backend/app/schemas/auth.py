@@ -9,6 +9,15 @@ class UserCreate(UserBase):
     password: str
     phone_number: str
 
+class User(UserBase):
+    # Public view of an account, as returned by /auth/register
+    id: str
+    is_active: bool
+    phone_number: Optional[str] = None
+
+    class Config:
+        orm_mode = True
+
 class UserInDB(UserBase):
     id: str
     is_active: bool
@@ -1,7 +1,13 @@
 from pydantic import BaseModel
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Optional
 
 class DistressDetectionResult(BaseModel):
     is_distress: bool
     confidence: float
-    details: List[Dict[str, Any]]
\ No newline at end of file
+    details: List[Dict[str, Any]]
+
+class DistressStreamEvent(BaseModel):
+    event: str  # "distress", "clear"
+    emergency_id: Optional[str] = None
+    stream_offset_seconds: float
+    result: DistressDetectionResult
@@ -1,10 +1,10 @@
 from pydantic import BaseModel
 from datetime import datetime
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Optional
 
 class EmergencyHistory(BaseModel):
     id: str
-    detection_type: str
+    detection_type: Optional[str]
     is_confirmed: bool
     created_at: datetime
     location_lat: Optional[str]
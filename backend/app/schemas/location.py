@@ -1,14 +1,61 @@
-from pydantic import BaseModel
-from datetime import datetime
+from pydantic import BaseModel, validator
+from datetime import datetime, timezone
+from typing import List, Optional
+import math
 
 class LocationUpdate(BaseModel):
     latitude: str
     longitude: str
     accuracy: str
     timestamp: datetime
+    
+    @validator("latitude", "longitude")
+    def check_coordinate(cls, value, field):
+        # Kept as strings, but rejected here (422) rather than after the fix
+        # has been buffered and published
+        limit = 90.0 if field.name == "latitude" else 180.0
+        try:
+            number = float(value)
+        except ValueError:
+            raise ValueError("must be a number")
+        if not math.isfinite(number) or abs(number) > limit:
+            raise ValueError(f"must be between -{limit:g} and {limit:g}")
+        return value
+    
+    @validator("timestamp")
+    def to_utc(cls, value):
+        # Naive timestamps are UTC; all fixes are compared as aware UTC
+        if value.tzinfo is None:
+            return value.replace(tzinfo=timezone.utc)
+        return value.astimezone(timezone.utc)
 
 class LocationResponse(BaseModel):
     success: bool
     latitude: str
     longitude: str
-    timestamp: datetime
\ No newline at end of file
+    timestamp: datetime
+
+class LocationBatchUpdate(BaseModel):
+    fixes: List[LocationUpdate]
+
+class LocationBatchResponse(BaseModel):
+    success: bool
+    accepted: int
+    latitude: str
+    longitude: str
+    timestamp: datetime
+
+class LocationStreamEvent(BaseModel):
+    user_id: str
+    latitude: str
+    longitude: str
+    accuracy: Optional[str] = None
+    timestamp: datetime
+
+class LocationTrackResponse(BaseModel):
+    # Column-oriented: timestamps are epoch milliseconds (UTC)
+    user_id: str
+    points: int
+    timestamps: List[int]
+    latitudes: List[float]
+    longitudes: List[float]
\ No newline at end of file
@@ -9,4 +9,6 @@ class NotificationCreate(BaseModel):
 
 class NotificationResponse(BaseModel):
     success: bool
-    notification_type: str
\ No newline at end of file
+    notification_type: str
+    notification_id: Optional[str] = None
+    status: Optional[str] = None  # "queued"
\ No newline at end of file
@@ -8,8 +8,9 @@ class PaymentCreate(BaseModel):
 class PaymentResponse(BaseModel):
     success: bool
     transaction_id: str
-    new_balance: float
+    new_balance: str  # exact decimal, e.g. "12.50"; a float would round
+    replayed: bool = False  # True when an Idempotency-Key repeated an earlier payment
 
 class WalletBalance(BaseModel):
-    balance: float
+    balance: str  # exact decimal, like PaymentResponse.new_balance
     currency: str
\ No newline at end of file
@@ -9,4 +9,5 @@ class SOSCreate(BaseModel):
 class SOSResponse(BaseModel):
     success: bool
     emergency_id: str
-    notifications_sent: int
\ No newline at end of file
+    notifications_sent: int  # accepted for delivery by the notification outbox
+    replayed: bool = False  # True when an Idempotency-Key repeated an earlier SOS
\ No newline at end of file
@@ -7,6 +7,10 @@ class VolunteerCreate(BaseModel):
     qualifications: List[str] = []
     availability: Dict[str, List[str]] = {}
 
+class VolunteerStatusUpdate(BaseModel):
+    is_active: bool
+    qualifications: Optional[List[str]] = None
+
 class VolunteerResponse(BaseModel):
     success: bool
     volunteer_id: str
@@ -0,0 +1,401 @@
+"""End-to-end load test: mixed API traffic against a seeded SQLite database.
+
+Starts the FastAPI app from app/main.py in-process (ASGI transport, no
+network) on a fresh SQLite file, with the AI models replaced by a
+fixed-latency stub and SMS sent to the fake provider. Seeds users, volunteers,
+locations and emergency history, then virtual users send a weighted mix of
+SOS triggers, location updates, nearby-volunteer queries, distress uploads
+and history/analytics reads. Reports throughput and p50/p95/p99 latency per
+route and saves them as JSON. --compare checks a run against an earlier one
+and exits non-zero on a regression.
+
+Client and server share one event loop, so absolute latencies include the
+client's overhead; compare runs made on the same machine with the same flags.
+
+    python benchmarks/bench_api_load.py --duration 30 --concurrency 64 --out load.json
+    python benchmarks/bench_api_load.py --duration 30 --compare load.json --max-regression 0.2
+    python benchmarks/bench_api_load.py --mix sos=1,location_update=10 --inference-ms 40
+"""
+import argparse
+import asyncio
+import io
+import json
+import os
+import platform
+import random
+import subprocess
+import sys
+import tempfile
+import time
+import uuid
+import wave
+from datetime import datetime, timedelta, timezone
+from types import SimpleNamespace
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+# The app reads its settings at import time, so app modules are imported in
+# main() once the environment below is in place
+
+CITIES = [
+    (13.08, 80.27),   # Chennai
+    (12.97, 77.59),   # Bengaluru
+    (19.07, 72.88),   # Mumbai
+    (28.61, 77.21),   # Delhi
+]
+
+DEFAULT_MIX = {
+    "location_update": 35,
+    "location_batch": 5,
+    "location_latest": 5,
+    "nearby": 20,
+    "sos": 5,
+    "distress": 5,
+    "history": 15,
+    "analytics": 10,
+}
+
+SAMPLING_RATE = 16000
+
+def parse_mix(text):
+    mix = dict(DEFAULT_MIX)
+    if text:
+        mix = {}
+        for part in text.split(","):
+            name, _, weight = part.partition("=")
+            if name not in DEFAULT_MIX:
+                raise SystemExit(f"Unknown route {name!r}, expected one of {', '.join(DEFAULT_MIX)}")
+            mix[name] = float(weight or 1)
+    return {name: weight for name, weight in mix.items() if weight > 0}
+
+def near_city(rng):
+    lat, lng = rng.choice(CITIES)
+    return lat + rng.gauss(0, 0.05), lng + rng.gauss(0, 0.05)
+
+def make_clip(rng, seconds):
+    # Noisy tone as 16-bit mono WAV; distinct clips so uploads miss the inference cache
+    t = np.arange(int(SAMPLING_RATE * seconds)) / SAMPLING_RATE
+    signal = 0.3 * np.sin(2 * np.pi * rng.uniform(200, 800) * t) + 0.05 * np.random.default_rng(rng.getrandbits(32)).standard_normal(len(t))
+    buffer = io.BytesIO()
+    with wave.open(buffer, "wb") as wav:
+        wav.setnchannels(1)
+        wav.setsampwidth(2)
+        wav.setframerate(SAMPLING_RATE)
+        wav.writeframes((np.clip(signal, -1, 1) * 32767).astype("<i2").tobytes())
+    return buffer.getvalue()
+
+def stub_models(ai_models, inference_ms):
+    # Stand-in for the Hugging Face pipelines: fixed latency per batch, same
+    # output shape, and the real cache and micro-batching in front of it
+    async def run_distress_batch(audio_files):
+        await asyncio.sleep(inference_ms / 1000.0)
+        return [[{"label": "distress", "score": 0.1}, {"label": "normal", "score": 0.9}] for _ in audio_files]
+
+    ai_models.sampling_rate = SAMPLING_RATE
+    ai_models.model_versions = {"distress": "stub", "emotion": "stub"}
+    ai_models.loaded = True
+    ai_models.distress_scheduler.run_batch = run_distress_batch
+
+async def seed(args, rng):
+    from app.core.database import engine, async_session, Base
+    from app.core.migrations import run_migrations
+    from app.models.emergency import Emergency
+    from app.models.user import User, UserLocation
+    from app.models.volunteer import Volunteer
+
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+        await run_migrations(conn)
+
+    users = []
+    now = datetime.utcnow()
+    async with async_session() as db:
+        for i in range(args.users):
+            user = User(
+                id=str(uuid.uuid4()),
+                email=f"load{i}@example.com",
+                hashed_password="!",
+                full_name=f"Load User {i}",
+                phone_number=f"+1555{i:07d}",
+                emergency_contacts=[
+                    {"name": f"Contact {n}", "phone": f"+1666{i:05d}{n:02d}"} for n in range(args.contacts)
+                ]
+            )
+            lat, lng = near_city(rng)
+            db.add(user)
+            db.add(UserLocation(user_id=user.id, latitude=str(lat), longitude=str(lng), accuracy="10", timestamp=now))
+            if rng.random() < args.volunteer_fraction:
+                db.add(Volunteer(user_id=user.id, is_active=rng.random() < 0.8,
+                                 qualifications=rng.sample(["first_aid", "cpr", "doctor", "driver"], 2),
+                                 availability={}))
+            users.append(SimpleNamespace(id=user.id, email=user.email))
+        await db.commit()
+
+        rows = [
+            {
+                "id": str(uuid.uuid4()),
+                "user_id": user.id,
+                "detection_type": rng.choice(["manual", "audio", "audio_stream"]),
+                "is_confirmed": rng.random() < 0.3,
+                "location_lat": "13.08",
+                "location_lng": "80.27",
+                "created_at": now - timedelta(seconds=rng.uniform(0, 60 * 86400))
+            }
+            for user in users for _ in range(args.history_per_user)
+        ]
+        for start in range(0, len(rows), 5000):
+            await db.execute(Emergency.__table__.insert(), rows[start:start + 5000])
+        await db.commit()
+    return users
+
+class Recorder:
+    def __init__(self):
+        self.samples = {}
+        self.errors = {}
+        self.first_error = {}
+        self.recording = False
+
+    def record(self, route, seconds, error=None):
+        if not self.recording:
+            return
+        self.samples.setdefault(route, []).append(seconds)
+        if error is not None:
+            self.errors[route] = self.errors.get(route, 0) + 1
+            self.first_error.setdefault(route, error)
+
+def percentile(ordered, q):
+    # Nearest-rank percentile of an already sorted list
+    if not ordered:
+        return 0.0
+    return ordered[min(len(ordered) - 1, max(0, int(round(q / 100.0 * len(ordered) + 0.5)) - 1))]
+
+def summarize(recorder, elapsed):
+    routes = {}
+    for route, samples in sorted(recorder.samples.items()):
+        ordered = sorted(samples)
+        routes[route] = {
+            "requests": len(ordered),
+            "errors": recorder.errors.get(route, 0),
+            "throughput_rps": len(ordered) / elapsed,
+            "mean_ms": sum(ordered) / len(ordered) * 1000,
+            "p50_ms": percentile(ordered, 50) * 1000,
+            "p95_ms": percentile(ordered, 95) * 1000,
+            "p99_ms": percentile(ordered, 99) * 1000,
+            "max_ms": ordered[-1] * 1000,
+        }
+        if route in recorder.first_error:
+            routes[route]["first_error"] = recorder.first_error[route]
+    everything = sorted(s for samples in recorder.samples.values() for s in samples)
+    total = {
+        "requests": len(everything),
+        "errors": sum(recorder.errors.values()),
+        "throughput_rps": len(everything) / elapsed,
+        "p50_ms": percentile(everything, 50) * 1000,
+        "p95_ms": percentile(everything, 95) * 1000,
+        "p99_ms": percentile(everything, 99) * 1000,
+    }
+    return routes, total
+
+def print_report(routes, total):
+    print(f"{'route':<18} {'requests':>9} {'errors':>7} {'req/s':>9} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'max ms':>8}")
+    for route, stats in routes.items():
+        print(f"{route:<18} {stats['requests']:>9} {stats['errors']:>7} {stats['throughput_rps']:>9.1f} "
+              f"{stats['p50_ms']:>8.1f} {stats['p95_ms']:>8.1f} {stats['p99_ms']:>8.1f} {stats['max_ms']:>8.1f}")
+    print(f"{'total':<18} {total['requests']:>9} {total['errors']:>7} {total['throughput_rps']:>9.1f} "
+          f"{total['p50_ms']:>8.1f} {total['p95_ms']:>8.1f} {total['p99_ms']:>8.1f}")
+    for route, stats in routes.items():
+        if "first_error" in stats:
+            print(f"  {route}: {stats['first_error']}")
+
+def compare(baseline, routes, max_regression):
+    # A route regresses when its p95 grows by more than max_regression, its
+    # throughput drops by more than max_regression, or it starts failing
+    regressions = []
+    print(f"\n{'route':<18} {'p95 before':>11} {'p95 now':>9} {'change':>8} {'req/s before':>13} {'req/s now':>10}")
+    for route, now in routes.items():
+        before = baseline["routes"].get(route)
+        if before is None:
+            continue
+        change = now["p95_ms"] / before["p95_ms"] - 1 if before["p95_ms"] else 0.0
+        print(f"{route:<18} {before['p95_ms']:>11.1f} {now['p95_ms']:>9.1f} {change:>+8.0%} "
+              f"{before['throughput_rps']:>13.1f} {now['throughput_rps']:>10.1f}")
+        if change > max_regression:
+            regressions.append(f"{route}: p95 {before['p95_ms']:.1f} -> {now['p95_ms']:.1f} ms")
+        if now["throughput_rps"] < before["throughput_rps"] * (1 - max_regression):
+            regressions.append(f"{route}: {before['throughput_rps']:.1f} -> {now['throughput_rps']:.1f} req/s")
+        if now["errors"] and not before["errors"]:
+            regressions.append(f"{route}: {now['errors']} errors (none before)")
+    return regressions
+
+def git_revision():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            cwd=os.path.dirname(os.path.abspath(__file__)),
+            capture_output=True, text=True, timeout=5
+        ).stdout.strip() or None
+    except Exception:
+        return None
+
+async def run(args):
+    import httpx
+    from app.main import app
+    from app.config import settings
+    from app.core.ai_models import ai_models
+    from app.core.database import engine
+    from app.core.notifications import notification_service
+    from app.core.security import create_access_token
+
+    rng = random.Random(args.seed)
+    stub_models(ai_models, args.inference_ms)
+    print(f"Seeding {args.users} users ({args.history_per_user} emergencies each) ...")
+    try:
+        users = await seed(args, rng)
+    except BaseException:
+        # aiosqlite's worker threads would keep the process alive
+        await engine.dispose()
+        raise
+    tokens = {user.id: create_access_token(data={"sub": user.email}) for user in users}
+    clips = [make_clip(rng, args.clip_seconds) for _ in range(args.distress_clips)]
+    mix = parse_mix(args.mix)
+    names, weights = list(mix), list(mix.values())
+    prefix = settings.API_V1_STR
+
+    def fix(lat, lng, at):
+        return {"latitude": f"{lat:.6f}", "longitude": f"{lng:.6f}", "accuracy": "8", "timestamp": at.isoformat()}
+
+    async def request(client, route, user):
+        headers = {"Authorization": f"Bearer {tokens[user.id]}"}
+        now = datetime.now(timezone.utc)
+        lat, lng = near_city(rng)
+        if route == "location_update":
+            return await client.post(f"{prefix}/location/update", json=fix(lat, lng, now), headers=headers)
+        if route == "location_batch":
+            fixes = [fix(lat + n * 1e-4, lng, now - timedelta(seconds=10 - n)) for n in range(10)]
+            return await client.post(f"{prefix}/location/batch", json={"fixes": fixes}, headers=headers)
+        if route == "location_latest":
+            return await client.get(f"{prefix}/location/user/{rng.choice(users).id}", headers=headers)
+        if route == "nearby":
+            params = {"latitude": lat, "longitude": lng, "radius_km": 5, "limit": 20}
+            return await client.get(f"{prefix}/volunteer/nearby", params=params, headers=headers)
+        if route == "sos":
+            body = {"location_lat": f"{lat:.6f}", "location_lng": f"{lng:.6f}", "additional_info": "load test"}
+            return await client.post(f"{prefix}/sos/trigger", json=body, headers=headers)
+        if route == "distress":
+            files = {"audio_file": ("clip.wav", rng.choice(clips), "audio/wav")}
+            return await client.post(f"{prefix}/distress/predict", files=files, headers=headers)
+        if route == "history":
+            return await client.get(f"{prefix}/history/emergencies", params={"days": 30, "limit": 50}, headers=headers)
+        if route == "analytics":
+            return await client.get(f"{prefix}/history/analytics", params={"days": 30}, headers=headers)
+        raise ValueError(route)
+
+    recorder = Recorder()
+
+    async def virtual_user(client, deadline):
+        while time.perf_counter() < deadline:
+            route = rng.choices(names, weights)[0]
+            started = time.perf_counter()
+            try:
+                response = await request(client, route, rng.choice(users))
+                error = None if response.status_code < 400 else f"HTTP {response.status_code}: {response.text[:200]}"
+            except Exception as e:
+                error = repr(e)
+            recorder.record(route, time.perf_counter() - started, error)
+            if args.think_ms:
+                await asyncio.sleep(rng.expovariate(1000.0 / args.think_ms))
+
+    await app.router.startup()
+    try:
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://load-test",
+                                     timeout=args.timeout) as client:
+            if args.warmup:
+                print(f"Warming up for {args.warmup:.0f}s ...")
+                deadline = time.perf_counter() + args.warmup
+                await asyncio.gather(*(virtual_user(client, deadline) for _ in range(args.concurrency)))
+            print(f"Running {args.concurrency} virtual users for {args.duration:.0f}s ...")
+            recorder.recording = True
+            sms_before = len(getattr(notification_service.sms_provider, "sent", []))
+            started = time.perf_counter()
+            await asyncio.gather(*(virtual_user(client, started + args.duration) for _ in range(args.concurrency)))
+            elapsed = time.perf_counter() - started
+            recorder.recording = False
+            # Messages still queued in the outbox at this point are not counted
+            sms_delivered = len(getattr(notification_service.sms_provider, "sent", [])) - sms_before
+    finally:
+        await app.router.shutdown()
+        await engine.dispose()
+
+    routes, total = summarize(recorder, elapsed)
+    total["sms_delivered"] = sms_delivered
+    return routes, total
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--duration", type=float, default=30.0, help="measured seconds")
+    parser.add_argument("--warmup", type=float, default=5.0, help="unmeasured seconds before the run")
+    parser.add_argument("--concurrency", type=int, default=32, help="virtual users")
+    parser.add_argument("--think-ms", type=float, default=0.0, help="mean pause between a user's requests")
+    parser.add_argument("--timeout", type=float, default=30.0)
+    parser.add_argument("--mix", help="route weights, e.g. sos=5,location_update=35 (default: %s)"
+                        % ",".join(f"{k}={v}" for k, v in DEFAULT_MIX.items()))
+    parser.add_argument("--users", type=int, default=500)
+    parser.add_argument("--contacts", type=int, default=3, help="emergency contacts per user")
+    parser.add_argument("--volunteer-fraction", type=float, default=0.3)
+    parser.add_argument("--history-per-user", type=int, default=40)
+    parser.add_argument("--inference-ms", type=float, default=25.0, help="stub model latency per batch")
+    parser.add_argument("--sms-latency-ms", type=int, default=50, help="fake SMS provider latency")
+    parser.add_argument("--distress-clips", type=int, default=64)
+    parser.add_argument("--clip-seconds", type=float, default=1.0)
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--db", help="SQLite file to create (default: a temporary file)")
+    parser.add_argument("--out", help="write the results to this JSON file")
+    parser.add_argument("--compare", help="JSON results of an earlier run to check against")
+    parser.add_argument("--max-regression", type=float, default=0.2, help="tolerated relative p95/throughput change")
+    args = parser.parse_args()
+
+    db_path = args.db or os.path.join(tempfile.mkdtemp(), "load.db")
+    if os.path.exists(db_path):
+        raise SystemExit(f"{db_path} already exists; the load test needs a fresh database")
+    os.environ.update(
+        DATABASE_URL=f"sqlite+aiosqlite:///{db_path}",
+        DATABASE_ECHO="false",
+        SMS_PROVIDER="fake",
+        FAKE_SMS_LATENCY_MS=str(args.sms_latency_ms),
+        INFERENCE_WORKERS="0",
+    )
+
+    routes, total = asyncio.run(run(args))
+    print_report(routes, total)
+    print(f"SMS delivered by the outbox during the run: {total['sms_delivered']}")
+
+    results = {
+        "meta": {
+            "started_at": datetime.now(timezone.utc).isoformat(),
+            "git_revision": git_revision(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "args": vars(args),
+        },
+        "total": total,
+        "routes": routes,
+    }
+    if args.out:
+        with open(args.out, "w") as f:
+            json.dump(results, f, indent=2, default=str)
+        print(f"Results written to {args.out}")
+
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        regressions = compare(baseline, routes, args.max_regression)
+        for regression in regressions:
+            print(f"REGRESSION {regression}")
+        if regressions:
+            sys.exit(1)
+        print("No regressions")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,119 @@
+"""Accuracy and latency of each INFERENCE_BACKEND against the fp32 torch baseline.
+
+    python benchmarks/bench_backends.py --audio-dir samples/ --backends torch torch_int8 onnx
+    python benchmarks/bench_backends.py --json backends.json
+
+Accuracy is reported as top-1 label agreement with the `torch` backend and
+the largest absolute difference in any label score, so a backend can be
+picked per deployment by setting INFERENCE_BACKEND.
+"""
+import argparse
+import glob
+import json
+import os
+import statistics
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from app.config import settings
+from app.core.audio import decode_audio
+from app.core.inference_backends import BACKENDS, build_pipeline
+
+DEFAULT_TEXTS = [
+    "Help me, someone is following me",
+    "I am so scared right now, please come quickly",
+    "Everything is fine, just checking in",
+    "There has been an accident on the highway",
+    "I'm really happy the volunteers arrived so fast",
+    "Why is nobody answering, this is terrible",
+]
+
+def load_clips(audio_dir, sampling_rate, count, seconds):
+    if audio_dir:
+        clips = []
+        for path in sorted(glob.glob(os.path.join(audio_dir, "*"))):
+            with open(path, "rb") as f:
+                clips.append(decode_audio(f.read(), sampling_rate))
+        return clips
+    # Synthetic clips: voiced tones under noise, good enough for agreement and timing
+    rng = np.random.default_rng(0)
+    t = np.arange(int(seconds * sampling_rate)) / sampling_rate
+    return [
+        (0.3 * np.sin(2 * np.pi * rng.uniform(100, 900) * t) + 0.05 * rng.standard_normal(len(t))).astype(np.float32)
+        for _ in range(count)
+    ]
+
+def top_scores(prediction):
+    return {p["label"]: p["score"] for p in prediction}
+
+def run(classifier, inputs, warmup):
+    for item in inputs[:warmup]:
+        classifier(item)
+    outputs, samples = [], []
+    for item in inputs:
+        start = time.perf_counter()
+        outputs.append(classifier(item))
+        samples.append((time.perf_counter() - start) * 1000)
+    samples.sort()
+    return outputs, {
+        "p50_ms": statistics.median(samples),
+        "p95_ms": samples[max(0, int(len(samples) * 0.95) - 1)],
+        "mean_ms": statistics.mean(samples),
+    }
+
+def compare(reference, outputs):
+    agree, max_diff = 0, 0.0
+    for ref, out in zip(reference, outputs):
+        ref, out = top_scores(ref), top_scores(out)
+        agree += max(ref, key=ref.get) == max(out, key=out.get)
+        for label, score in ref.items():
+            max_diff = max(max_diff, abs(score - out.get(label, 0.0)))
+    return {"top1_agreement": agree / len(reference), "max_score_diff": max_diff}
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--backends", nargs="+", default=list(BACKENDS), choices=BACKENDS)
+    parser.add_argument("--audio-dir")
+    parser.add_argument("--clips", type=int, default=20)
+    parser.add_argument("--clip-seconds", type=float, default=3.0)
+    parser.add_argument("--warmup", type=int, default=2)
+    parser.add_argument("--json", help="write results to this file")
+    args = parser.parse_args()
+
+    tasks = [
+        ("distress", "audio-classification", settings.HF_MODEL_NAME),
+        ("emotion", "text-classification", settings.EMOTION_MODEL_NAME),
+    ]
+    results = {}
+    for name, task, model_name in tasks:
+        reference = None
+        inputs = None
+        for backend in ["torch"] + [b for b in args.backends if b != "torch"]:
+            start = time.perf_counter()
+            classifier = build_pipeline(task, model_name, backend)
+            load_s = time.perf_counter() - start
+            if inputs is None:
+                if task == "audio-classification":
+                    inputs = load_clips(args.audio_dir, classifier.feature_extractor.sampling_rate,
+                                        args.clips, args.clip_seconds)
+                else:
+                    inputs = DEFAULT_TEXTS
+
+            outputs, latency = run(classifier, inputs, args.warmup)
+            if reference is None:
+                reference = outputs
+            entry = dict(latency, load_s=load_s, **compare(reference, outputs))
+            results.setdefault(name, {})[backend] = entry
+            print(f"{name:<9} {backend:<11} p50 {entry['p50_ms']:8.1f} ms  p95 {entry['p95_ms']:8.1f} ms  "
+                  f"top1 {entry['top1_agreement']:.3f}  max diff {entry['max_score_diff']:.4f}  load {load_s:.1f}s")
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(results, f, indent=2)
+
+if __name__ == "__main__":
+    main()
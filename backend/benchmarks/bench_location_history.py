@@ -0,0 +1,123 @@
+"""Memory and read throughput of the location history store.
+
+Compares the packed per-bucket arrays with one Python object per fix, times
+range reads from in-memory buckets and from stored blobs, and reports how
+much Douglas-Peucker simplification shrinks a track.
+
+    python benchmarks/bench_location_history.py --users 200 --hours 6 --interval 5
+"""
+import argparse
+import math
+import os
+import random
+import sys
+import time
+import tracemalloc
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from app.core.location_history import LocationHistoryStore, decode_track, encode_track, slice_track, to_epoch_ms
+from app.core.utils import simplify_track
+
+class Fix:
+    # Stand-in for an ORM row per point
+    def __init__(self, user_id, latitude, longitude, timestamp):
+        self.user_id = user_id
+        self.latitude = latitude
+        self.longitude = longitude
+        self.timestamp = timestamp
+
+def walk(rng, start, hours, interval):
+    # A responder moving at street speed with GPS jitter
+    lat, lng = 13.08 + rng.gauss(0, 0.1), 80.27 + rng.gauss(0, 0.1)
+    heading = rng.uniform(0, 2 * math.pi)
+    for i in range(int(hours * 3600 / interval)):
+        heading += rng.gauss(0, 0.2)
+        lat += math.cos(heading) * 0.00005 * interval + rng.gauss(0, 0.00002)
+        lng += math.sin(heading) * 0.00005 * interval + rng.gauss(0, 0.00002)
+        yield start + timedelta(seconds=i * interval), lat, lng
+
+def measure(build):
+    tracemalloc.start()
+    before = tracemalloc.take_snapshot()
+    value = build()
+    after = tracemalloc.take_snapshot()
+    tracemalloc.stop()
+    used = sum(stat.size_diff for stat in after.compare_to(before, "filename"))
+    return value, used
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--users", type=int, default=200)
+    parser.add_argument("--hours", type=float, default=6)
+    parser.add_argument("--interval", type=float, default=5, help="seconds between fixes")
+    parser.add_argument("--reads", type=int, default=2000)
+    parser.add_argument("--tolerance", type=float, default=10.0, help="simplification tolerance in metres")
+    args = parser.parse_args()
+
+    rng = random.Random(1)
+    start = datetime(2024, 1, 1)
+    tracks = {f"user{u}": list(walk(rng, start, args.hours, args.interval)) for u in range(args.users)}
+    points = sum(len(t) for t in tracks.values())
+
+    def build_store():
+        store = LocationHistoryStore(None, 3600, 300, 86400, args.tolerance, 60)
+        for user_id, fixes in tracks.items():
+            for timestamp, lat, lng in fixes:
+                store.append(user_id, lat, lng, timestamp)
+        return store
+
+    def build_objects():
+        return [Fix(user_id, lat, lng, ts) for user_id, fixes in tracks.items() for ts, lat, lng in fixes]
+
+    store, store_bytes = measure(build_store)
+    _, object_bytes = measure(build_objects)
+    print(f"{points} points for {args.users} users")
+    print(f"  packed buckets : {store_bytes / 2**20:8.2f} MiB  {store_bytes / points:6.1f} B/point")
+    print(f"  object per fix : {object_bytes / 2**20:8.2f} MiB  {object_bytes / points:6.1f} B/point")
+
+    users = list(tracks)
+    windows = []
+    for _ in range(args.reads):
+        offset = rng.uniform(0, max(0.0, args.hours - 1)) * 3600
+        window_start = start + timedelta(seconds=offset)
+        windows.append((rng.choice(users), to_epoch_ms(window_start), to_epoch_ms(window_start + timedelta(hours=1))))
+
+    began = time.perf_counter()
+    returned = 0
+    for user_id, lo, hi in windows:
+        for track in store.read_memory(user_id, lo, hi):
+            returned += len(track[0])
+    elapsed = time.perf_counter() - began
+    print(f"in-memory reads : {args.reads / elapsed:8.0f} windows/s  {returned / elapsed / 1e6:6.2f} M points/s")
+
+    blobs = {
+        key: (bucket.start_ms, *encode_track(bucket.start_ms, *bucket.columns()))
+        for key, bucket in store.buckets.items()
+    }
+    stored_bytes = sum(len(b[1]) + len(b[2]) + len(b[3]) for b in blobs.values())
+    print(f"stored blobs    : {stored_bytes / 2**20:8.2f} MiB  {stored_bytes / points:6.1f} B/point")
+
+    bucket_ms = store.bucket_ms
+    began = time.perf_counter()
+    returned = 0
+    for user_id, lo, hi in windows:
+        for bucket_start in range(lo - lo % bucket_ms, hi, bucket_ms):
+            blob = blobs.get((user_id, bucket_start))
+            if blob is not None:
+                returned += len(slice_track(decode_track(*blob), lo, hi)[0])
+    elapsed = time.perf_counter() - began
+    print(f"blob reads      : {args.reads / elapsed:8.0f} windows/s  {returned / elapsed / 1e6:6.2f} M points/s")
+
+    kept = 0
+    began = time.perf_counter()
+    for bucket in store.buckets.values():
+        _, lats, lngs = bucket.columns()
+        kept += int(simplify_track(lats, lngs, args.tolerance).sum())
+    elapsed = time.perf_counter() - began
+    print(f"simplified      : {kept}/{points} points kept ({kept / points:.1%}) at {args.tolerance} m "
+          f"in {elapsed:.2f}s")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,89 @@
+"""Overhead of the metrics middleware and the per-statement engine hooks.
+
+Times a trivial endpoint with and without MetricsMiddleware (driven in-process
+over ASGI, so the difference is the middleware's own cost), and a cheap SQL
+statement on an in-memory SQLite engine with and without instrument_engine.
+
+    python benchmarks/bench_metrics_overhead.py --requests 20000 --statements 50000
+"""
+import argparse
+import asyncio
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from fastapi import FastAPI
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import create_async_engine
+
+from app.core.metrics import MetricsMiddleware, instrument_engine, registry
+
+def build_app(with_metrics: bool) -> FastAPI:
+    app = FastAPI()
+
+    @app.get("/items/{item_id}")
+    async def get_item(item_id: int):
+        return {"id": item_id}
+
+    if with_metrics:
+        app.add_middleware(MetricsMiddleware)
+    return app
+
+async def drive(app, requests: int) -> float:
+    # Minimal ASGI client: no HTTP library, so only the app and middleware are timed
+    async def receive():
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(message):
+        pass
+
+    started = time.perf_counter()
+    for n in range(requests):
+        scope = {
+            "type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1",
+            "method": "GET", "scheme": "http", "path": f"/items/{n}", "raw_path": f"/items/{n}".encode(),
+            "root_path": "", "query_string": b"", "headers": [], "server": ("bench", 80), "client": ("bench", 1),
+        }
+        await app(scope, receive, send)
+    return (time.perf_counter() - started) / requests
+
+async def run_statements(instrumented: bool, statements: int) -> float:
+    engine = create_async_engine("sqlite+aiosqlite://", future=True)
+    if instrumented:
+        instrument_engine(engine)
+    try:
+        async with engine.connect() as conn:
+            await conn.execute(text("SELECT 1"))
+            started = time.perf_counter()
+            for _ in range(statements):
+                await conn.execute(text("SELECT 1"))
+            return (time.perf_counter() - started) / statements
+    finally:
+        await engine.dispose()
+
+async def main(args):
+    plain, measured = build_app(False), build_app(True)
+    # Warm up routing, pydantic and the middleware's route table
+    await drive(plain, 200)
+    await drive(measured, 200)
+    without = await drive(plain, args.requests)
+    with_metrics = await drive(measured, args.requests)
+    print(f"{'request':<24} {without * 1e6:>8.1f} us without  {with_metrics * 1e6:>8.1f} us with  "
+          f"(+{(with_metrics - without) * 1e6:.1f} us)")
+
+    without = await run_statements(False, args.statements)
+    with_hooks = await run_statements(True, args.statements)
+    print(f"{'SQL statement':<24} {without * 1e6:>8.1f} us without  {with_hooks * 1e6:>8.1f} us with  "
+          f"(+{(with_hooks - without) * 1e6:.1f} us)")
+
+    started = time.perf_counter()
+    body = registry.render()
+    print(f"{'render /metrics':<24} {(time.perf_counter() - started) * 1e3:>8.2f} ms for {len(body.splitlines())} lines")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--requests", type=int, default=20000)
+    parser.add_argument("--statements", type=int, default=50000)
+    asyncio.run(main(parser.parse_args()))
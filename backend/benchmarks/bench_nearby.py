@@ -0,0 +1,97 @@
+"""Latency of /volunteer/nearby lookups: full scan vs. the grid index.
+
+    python benchmarks/bench_nearby.py --volunteers 200000 --queries 200
+"""
+import argparse
+import os
+import random
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from app.core.spatial_index import VolunteerIndex
+from app.core.utils import haversine
+
+# Rough bounding boxes of a few dense metro areas plus a uniform background
+CITIES = [
+    (13.08, 80.27),   # Chennai
+    (12.97, 77.59),   # Bengaluru
+    (19.07, 72.88),   # Mumbai
+    (28.61, 77.21),   # Delhi
+]
+
+def random_point(rng):
+    if rng.random() < 0.9:
+        lat, lng = rng.choice(CITIES)
+        return lat + rng.gauss(0, 0.15), lng + rng.gauss(0, 0.15)
+    return rng.uniform(8.0, 35.0), rng.uniform(68.0, 97.0)
+
+def full_scan(points, latitude, longitude, radius_km):
+    nearby = []
+    for user_id, lat, lng in points:
+        distance = haversine(latitude, longitude, lat, lng)
+        if distance <= radius_km:
+            nearby.append((distance, user_id))
+    return nearby
+
+def timed(fn, queries):
+    samples = []
+    for query in queries:
+        start = time.perf_counter()
+        fn(*query)
+        samples.append((time.perf_counter() - start) * 1000)
+    samples.sort()
+    return {
+        "p50_ms": statistics.median(samples),
+        "p95_ms": samples[int(len(samples) * 0.95) - 1],
+        "max_ms": samples[-1],
+    }
+
+def report(name, stats):
+    print(f"{name:<28} p50 {stats['p50_ms']:9.3f} ms   p95 {stats['p95_ms']:9.3f} ms   max {stats['max_ms']:9.3f} ms")
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--volunteers", type=int, default=100_000)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--radius-km", type=float, default=5.0)
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--cell-deg", type=float, default=0.05)
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    points = [(f"user-{i}",) + random_point(rng) for i in range(args.volunteers)]
+
+    start = time.perf_counter()
+    index = VolunteerIndex(cell_deg=args.cell_deg)
+    skills = [["first_aid"], ["cpr"], ["first_aid", "cpr"], []]
+    for user_id, lat, lng in points:
+        index.upsert(user_id, lat, lng, rng.choice(skills))
+    build_s = time.perf_counter() - start
+    print(f"{args.volunteers} volunteers, {len(index.cells)} occupied cells, built in {build_s:.2f}s")
+
+    queries = [random_point(rng) + (args.radius_km,) for _ in range(args.queries)]
+
+    # Sanity check: the index must return exactly what the full scan returns
+    for lat, lng, radius in queries[:20]:
+        expected = sorted(user_id for _, user_id in full_scan(points, lat, lng, radius))
+        actual = sorted(entry.user_id for _, entry in index.within(lat, lng, radius))
+        assert expected == actual, "index and full scan disagree"
+
+    report(f"full scan r={args.radius_km}km", timed(lambda *q: full_scan(points, *q), queries[:max(1, args.queries // 10)]))
+    report(f"grid index r={args.radius_km}km", timed(index.within, queries))
+    report(f"grid index k={args.k}", timed(lambda lat, lng, _: index.nearest(lat, lng, args.k), queries))
+    report(f"grid index r=25km limit=20", timed(lambda lat, lng, _: index.within(lat, lng, 25.0, limit=20), queries))
+    report(f"grid index r=25km +quals", timed(
+        lambda lat, lng, _: index.within(lat, lng, 25.0, limit=20, qualifications=["first_aid"]), queries))
+
+    start = time.perf_counter()
+    for user_id, lat, lng in points[:10_000]:
+        index.move(user_id, lat + 0.001, lng + 0.001)
+    print(f"location update sync: {(time.perf_counter() - start) / 10_000 * 1e6:.2f} us/move")
+
+if __name__ == "__main__":
+    main()
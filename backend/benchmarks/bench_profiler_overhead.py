@@ -0,0 +1,84 @@
+"""Cost of a running profile session on an event loop under load.
+
+Runs concurrent tasks that mix CPU work (JSON round trips) with short awaits,
+unprofiled and under a wall and a cpu profile session, and reports the
+throughput lost, the sampler's own measured overhead and the size of the
+collected profile. The modes are interleaved over several rounds and compared
+by median, so drift in machine speed does not masquerade as overhead.
+
+    python benchmarks/bench_profiler_overhead.py --seconds 3 --rounds 5 --tasks 50
+    python benchmarks/bench_profiler_overhead.py --interval-ms 1 --max-overhead 0.05
+"""
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from app.core.profiler import ProfileSession, cpu_mode_available, profiler
+
+PAYLOAD = {"user_id": "u" * 36, "points": [[13.08 + i * 1e-4, 80.27, i] for i in range(200)]}
+
+async def worker(deadline: float, counter: list):
+    while time.perf_counter() < deadline:
+        json.loads(json.dumps(PAYLOAD))
+        counter[0] += 1
+        await asyncio.sleep(0.0005)
+
+async def run_load(seconds: float, tasks: int) -> float:
+    counter = [0]
+    deadline = time.perf_counter() + seconds
+    await asyncio.gather(*(worker(deadline, counter) for _ in range(tasks)))
+    return counter[0] / seconds
+
+async def run_mode(mode, args):
+    if mode == "off":
+        return await run_load(args.seconds, args.tasks), None
+    session = profiler.start(ProfileSession(
+        mode,
+        args.interval_ms / 1000.0,
+        max_overhead=args.max_overhead
+    ))
+    try:
+        throughput = await run_load(args.seconds, args.tasks)
+    finally:
+        await profiler.stop()
+    return throughput, session
+
+async def main(args):
+    await run_load(1.0, args.tasks)  # warm-up
+    modes = ["off", "wall"] + (["cpu"] if cpu_mode_available() else [])
+    results = {mode: [] for mode in modes}
+    sessions = {}
+    for _ in range(args.rounds):
+        for mode in modes:
+            throughput, session = await run_mode(mode, args)
+            results[mode].append(throughput)
+            sessions[mode] = session
+
+    baseline = statistics.median(results["off"])
+    print(f"median of {args.rounds} rounds of {args.seconds:g}s")
+    print(f"{'mode':<6} {'ops/s':>9} {'slowdown':>9} {'interval ms':>12} {'overhead':>9} {'samples':>8} {'stacks':>7} {'KiB':>7}")
+    for mode in modes:
+        throughput = statistics.median(results[mode])
+        line = f"{mode:<6} {throughput:>9.0f} {1 - throughput / baseline:>9.1%}"
+        session = sessions[mode]
+        if session is not None:
+            summary = session.summary()
+            profile_kib = len(session.collapsed().encode()) / 1024
+            line += (f" {summary['interval_ms'] or 0:>12.2f} {summary['overhead']:>9.2%} {summary['samples']:>8}"
+                     f" {summary['stacks']:>7} {profile_kib:>7.1f}")
+        print(line)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--seconds", type=float, default=3.0, help="per mode and round")
+    parser.add_argument("--rounds", type=int, default=5)
+    parser.add_argument("--tasks", type=int, default=50)
+    parser.add_argument("--interval-ms", type=float, default=10.0)
+    parser.add_argument("--max-overhead", type=float, default=0.02)
+    asyncio.run(main(parser.parse_args()))
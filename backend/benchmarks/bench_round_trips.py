@@ -0,0 +1,128 @@
+"""Database round trips per endpoint: commit+refresh per object vs. one unit of work.
+
+Replays the persistence of add_funds, register_volunteer and trigger_sos
+against a scratch SQLite database and counts the statements and commits
+each one sends.
+
+    python benchmarks/bench_round_trips.py --iterations 200
+"""
+import argparse
+import asyncio
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from sqlalchemy import Column, String, Table, event
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+from sqlalchemy.orm import sessionmaker
+
+from app.core.database import Base
+from app.models.emergency import Emergency
+from app.models.notification import NotificationOutbox
+from app.models.payment import Transaction, Wallet
+from app.models.volunteer import Volunteer
+import app.core.rollups  # noqa: F401  keeps emergency_daily_rollups current, as in the API
+
+if "users" not in Base.metadata.tables:
+    # Only the key is needed to satisfy the foreign keys
+    Table("users", Base.metadata, Column("id", String, primary_key=True))
+
+async def legacy_save(obj, db):
+    # save() before the unit of work: add, commit, refresh
+    db.add(obj)
+    await db.commit()
+    await db.refresh(obj)
+    return obj
+
+async def add_funds(db, user_id, legacy):
+    wallet = await Wallet.get_by_user(db, user_id)
+    if legacy:
+        if not wallet:
+            wallet = await legacy_save(Wallet(user_id=user_id, balance_minor=0), db)
+        await legacy_save(Transaction(user_id=user_id, amount_minor=1000, status="completed", transaction_type="deposit"), db)
+        wallet.balance_minor += 1000
+        await legacy_save(wallet, db)
+    else:
+        if not wallet:
+            wallet = await Wallet(user_id=user_id, balance_minor=0).save(db)
+        await Transaction(user_id=user_id, amount_minor=1000, status="completed", transaction_type="deposit").save(db)
+        wallet.balance_minor += 1000
+        await db.commit()
+
+async def register_volunteer(db, user_id, legacy):
+    volunteer = Volunteer(user_id=user_id, is_active=True, qualifications=["first_aid"], availability={})
+    if legacy:
+        await legacy_save(volunteer, db)
+    else:
+        await volunteer.save(db)
+        await db.commit()
+
+async def trigger_sos(db, user_id, legacy):
+    emergency = Emergency(user_id=user_id, detection_type="manual", is_confirmed=True,
+                          location_lat="13.08", location_lng="80.27")
+    if legacy:
+        await legacy_save(emergency, db)
+    else:
+        await emergency.save(db, flush=True)
+    await NotificationOutbox.enqueue(
+        db,
+        [("sms", f"+1555000{i:04d}", None, "EMERGENCY") for i in range(3)],
+        emergency_id=emergency.id
+    )
+    await db.commit()
+
+FLOWS = [
+    ("add_funds (new wallet)", add_funds, True),
+    ("add_funds (existing)", add_funds, False),
+    ("register_volunteer", register_volunteer, True),
+    ("trigger_sos", trigger_sos, True),
+]
+
+async def run(args):
+    path = os.path.join(tempfile.mkdtemp(), "round_trips.db")
+    engine = create_async_engine(f"sqlite+aiosqlite:///{path}")
+    session_factory = sessionmaker(engine, expire_on_commit=False, class_=AsyncSession)
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+
+    counts = {"statements": 0, "commits": 0}
+
+    @event.listens_for(engine.sync_engine, "before_cursor_execute")
+    def count_statement(*_):
+        counts["statements"] += 1
+
+    @event.listens_for(engine.sync_engine, "commit")
+    def count_commit(*_):
+        counts["commits"] += 1
+
+    print(f"{'endpoint':<24} {'mode':<14} {'statements':>10} {'commits':>8} {'ms/call':>8}")
+    for name, flow, fresh_user in FLOWS:
+        for legacy in (True, False):
+            mode = "commit+refresh" if legacy else "unit of work"
+            prefix = f"{name}-{mode}"
+            if not fresh_user:
+                # Wallets must already exist for the steady-state case
+                async with session_factory() as db:
+                    for i in range(args.iterations):
+                        await Wallet(user_id=f"{prefix}-{i}", balance_minor=0).save(db)
+                    await db.commit()
+            counts.update(statements=0, commits=0)
+            started = time.perf_counter()
+            for i in range(args.iterations):
+                async with session_factory() as db:
+                    await flow(db, f"{prefix}-{i}", legacy)
+            elapsed = time.perf_counter() - started
+            print(f"{name:<24} {mode:<14} {counts['statements'] / args.iterations:>10.1f} "
+                  f"{counts['commits'] / args.iterations:>8.1f} {elapsed / args.iterations * 1000:>8.2f}")
+    await engine.dispose()
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--iterations", type=int, default=200)
+    asyncio.run(run(parser.parse_args()))
+
+if __name__ == "__main__":
+    main()
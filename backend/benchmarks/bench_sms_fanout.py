@@ -0,0 +1,50 @@
+"""SOS SMS fan-out: sequential sends vs. the bounded concurrent fan-out.
+
+    python benchmarks/bench_sms_fanout.py --contacts 10 --latency-ms 150 --sos 20
+"""
+import argparse
+import asyncio
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from app.config import settings
+from app.core.notifications import NotificationService, FakeSMSProvider
+
+async def sequential(service, messages):
+    sent = 0
+    for to, message in messages:
+        if await service.send_sms(to, message):
+            sent += 1
+    return sent
+
+async def concurrent(service, messages):
+    return sum(await service.send_sms_many(messages))
+
+async def measure(name, fn, service, messages, sos_count):
+    start = time.perf_counter()
+    results = await asyncio.gather(*(fn(service, messages) for _ in range(sos_count)))
+    elapsed = time.perf_counter() - start
+    print(f"{name:<11} {sos_count} SOS x {len(messages)} contacts: {elapsed * 1000:8.1f} ms total, "
+          f"{sum(results)} sent, {elapsed / sos_count * 1000:7.1f} ms per SOS (amortized)")
+
+async def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--contacts", type=int, default=10)
+    parser.add_argument("--latency-ms", type=float, default=150.0)
+    parser.add_argument("--sos", type=int, default=1, help="concurrent SOS triggers")
+    parser.add_argument("--concurrency", type=int, default=settings.SMS_MAX_CONCURRENCY)
+    args = parser.parse_args()
+
+    settings.SMS_MAX_CONCURRENCY = args.concurrency
+    service = NotificationService()
+    service.sms_provider = FakeSMSProvider(latency=args.latency_ms / 1000.0)
+    messages = [(f"+1555000{i:04d}", "EMERGENCY: benchmark") for i in range(args.contacts)]
+
+    await measure("sequential", sequential, service, messages, args.sos)
+    await measure("concurrent", concurrent, service, messages, args.sos)
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,42 @@
+"""decode_access_token with the verified-token cache vs. a full jwt.decode per call.
+
+    python benchmarks/bench_token_cache.py --calls 100000 --tokens 100
+"""
+import argparse
+import os
+import random
+import sys
+import time
+from datetime import timedelta
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from app.core.security import create_access_token, decode_access_token, _decode_and_verify, token_cache
+
+def run(name, decode, tokens, calls, rng):
+    order = [rng.choice(tokens) for _ in range(calls)]
+    start = time.perf_counter()
+    for token in order:
+        assert decode(token) is not None
+    elapsed = time.perf_counter() - start
+    print(f"{name:<10} {calls} calls over {len(tokens)} tokens: {elapsed:7.3f}s  "
+          f"{elapsed / calls * 1e6:7.2f} us/call  {calls / elapsed:10.0f} calls/s")
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--calls", type=int, default=100_000)
+    parser.add_argument("--tokens", type=int, default=100, help="distinct device tokens")
+    args = parser.parse_args()
+
+    rng = random.Random(1)
+    tokens = [
+        create_access_token({"sub": f"user{i}@example.com"}, expires_delta=timedelta(days=7))
+        for i in range(args.tokens)
+    ]
+    run("uncached", _decode_and_verify, tokens, args.calls, rng)
+    token_cache.clear()
+    run("cached", decode_access_token, tokens, args.calls, rng)
+    print(token_cache.stats())
+
+if __name__ == "__main__":
+    main()
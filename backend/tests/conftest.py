@@ -0,0 +1,34 @@
+import asyncio
+import os
+import sys
+import tempfile
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+os.environ["DATABASE_URL"] = f"sqlite+aiosqlite:///{tempfile.mkdtemp()}/app.db"
+
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+from sqlalchemy.orm import sessionmaker
+
+@pytest.fixture
+def engine(tmp_path):
+    # A fresh file database per test; the default pool for file databases
+    # opens a connection per checkout, so the engine can be driven from
+    # asyncio.run() and from a TestClient's loop alike
+    from app.core.database import Base
+    import app.models.emergency, app.models.location_track, app.models.notification
+    import app.models.payment, app.models.user, app.models.volunteer
+
+    engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path}/test.db", future=True)
+
+    async def create():
+        async with engine.begin() as conn:
+            await conn.run_sync(Base.metadata.create_all)
+    asyncio.run(create())
+    yield engine
+    asyncio.run(engine.dispose())
+
+@pytest.fixture
+def session_factory(engine):
+    return sessionmaker(engine, expire_on_commit=False, class_=AsyncSession)
@@ -0,0 +1,50 @@
+import asyncio
+
+from sqlalchemy import text
+
+from app.core.migrations import canonical_emergency_timestamps
+from app.core.pagination import decode_cursor, encode_cursor
+from app.models.emergency import Emergency
+
+async def page_through(session_factory, user_id: str, limit: int = 1):
+    # Follows next cursors the way /history/emergencies hands them out
+    seen, cursor = [], None
+    async with session_factory() as db:
+        while True:
+            after = decode_cursor(cursor) if cursor else None
+            stmt = Emergency.history_query(user_id, after=after, columns=[Emergency.id, Emergency.created_at])
+            rows = (await db.execute(stmt.limit(limit))).all()
+            if not rows:
+                return seen
+            seen.extend(row.id for row in rows)
+            assert len(seen) <= 20, f"cursor does not advance: {seen}"
+            cursor = encode_cursor(rows[-1].created_at, rows[-1].id)
+
+def test_server_defaulted_rows_page_without_repeats(engine, session_factory):
+    async def run():
+        async with engine.begin() as conn:
+            for n in range(5):
+                await conn.execute(text(
+                    "INSERT INTO emergencies (id, user_id, detection_type) VALUES (:id, 'u1', 'manual')"
+                ), {"id": f"e{n}"})
+        return await page_through(session_factory, "u1")
+
+    seen = asyncio.run(run())
+    assert sorted(seen) == ["e0", "e1", "e2", "e3", "e4"]
+
+def test_legacy_timestamps_page_without_repeats(engine, session_factory):
+    # Rows written by the old CURRENT_TIMESTAMP default, next to one written
+    # by SQLAlchemy in the same second
+    async def run():
+        async with engine.begin() as conn:
+            for n, created_at in enumerate(["2026-01-01 10:00:00", "2026-01-01 10:00:00", "2026-01-01 09:59:59"]):
+                await conn.execute(text(
+                    "INSERT INTO emergencies (id, user_id, created_at) VALUES (:id, 'u1', :created_at)"
+                ), {"id": f"e{n}", "created_at": created_at})
+            await conn.execute(text(
+                "INSERT INTO emergencies (id, user_id, created_at) VALUES ('e3', 'u1', '2026-01-01 10:00:00.250000')"
+            ))
+            await canonical_emergency_timestamps(conn)
+        return await page_through(session_factory, "u1")
+
+    assert asyncio.run(run()) == ["e3", "e1", "e0", "e2"]
@@ -0,0 +1,34 @@
+import asyncio
+from datetime import datetime, timedelta
+
+from sqlalchemy import select
+
+from app.core.location_history import LocationHistoryStore
+from app.models.location_track import LocationTrack
+
+def test_late_points_reopen_a_simplified_bucket(session_factory):
+    store = LocationHistoryStore(
+        session_factory, bucket_seconds=3600, seal_after=0,
+        simplify_after=0, tolerance_m=5.0, flush_interval=60
+    )
+    start = datetime.utcnow().replace(minute=0, second=0, microsecond=0) - timedelta(days=2)
+
+    async def simplified_flags():
+        async with session_factory() as db:
+            return (await db.execute(select(LocationTrack.simplified))).scalars().all()
+
+    async def run():
+        for minute in range(10):
+            store.append("u1", 13.0 + minute * 0.001, 80.0, start + timedelta(minutes=minute))
+        await store.persist()
+        assert await store.compact() == 1
+        assert await simplified_flags() == [True]
+
+        # A fix that arrives after the bucket was compacted
+        store.append("u1", 13.5, 80.5, start + timedelta(minutes=30))
+        await store.persist()
+        assert await simplified_flags() == [False]
+        assert await store.compact() == 1
+        assert await store.compact() == 0
+
+    asyncio.run(run())
@@ -0,0 +1,49 @@
+import asyncio
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from app.api import profiling
+from app.core.database import get_db
+from app.core.security import create_access_token, principal_cache
+from app.models.user import User
+
+def build_client(session_factory) -> TestClient:
+    app = FastAPI()
+    app.include_router(profiling.router)
+
+    async def test_db():
+        async with session_factory() as session:
+            yield session
+    app.dependency_overrides[get_db] = test_db
+    return TestClient(app)
+
+def add_user(session_factory, email: str, is_admin: bool) -> str:
+    async def add():
+        async with session_factory() as db:
+            db.add(User(email=email, hashed_password="!", is_admin=is_admin))
+            await db.commit()
+    asyncio.run(add())
+    principal_cache.clear()
+    return create_access_token(data={"sub": email})
+
+def test_profile_requires_a_token(session_factory):
+    response = build_client(session_factory).post("/admin/profile")
+    assert response.status_code == 401
+
+def test_profile_rejects_non_admin(session_factory):
+    token = add_user(session_factory, "user@example.com", is_admin=False)
+    response = build_client(session_factory).post(
+        "/admin/profile?seconds=0.1",
+        headers={"Authorization": f"Bearer {token}"}
+    )
+    assert response.status_code == 403
+
+def test_profile_admits_admin(session_factory):
+    # An invalid mode is rejected after the admin check, without profiling
+    token = add_user(session_factory, "admin@example.com", is_admin=True)
+    response = build_client(session_factory).post(
+        "/admin/profile?mode=bogus",
+        headers={"Authorization": f"Bearer {token}"}
+    )
+    assert response.status_code == 422
@@ -0,0 +1,159 @@
+"""The hot endpoint queries keep using their indexes.
+
+Builds the schema in SQLite, seeds enough synthetic rows for ANALYZE to give
+the planner realistic statistics, and checks the EXPLAIN QUERY PLAN of each
+query (built by the same model helpers the endpoints use): it must name the
+expected index and must not scan a table in full, except where noted.
+"""
+import asyncio
+import random
+import re
+import uuid
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import select
+
+from app.core.migrations import run_migrations
+from app.core.rollups import active_users, backfill, rollup_counts
+from app.models.emergency import Emergency
+from app.models.location_track import LocationTrack
+from app.models.notification import NotificationOutbox
+from app.models.payment import Transaction, Wallet
+from app.models.user import UserLocation
+from app.models.volunteer import Volunteer
+
+USERS = 2000
+EMERGENCIES = 20000
+DETECTION_TYPES = ["audio", "manual", "audio_stream", "fall"]
+FULL_SCAN = re.compile(r"^SCAN (?:TABLE )?(\w+)$")
+SUBQUERY = re.compile(r"^(?:CO-ROUTINE|MATERIALIZE) (\w+)$")
+NOW = datetime.utcnow()
+SINCE = NOW - timedelta(days=30)
+USER_ID = "user7"
+
+# (name, statement, index the plan must use, tables it may scan in full)
+HOT_QUERIES = [
+    ("history page", Emergency.history_query(USER_ID, SINCE).limit(51),
+     "ix_emergencies_user_created_id", ()),
+    ("history page after cursor",
+     Emergency.history_query(USER_ID, SINCE, after=(NOW - timedelta(days=3), "m")).limit(51),
+     "ix_emergencies_user_created_id", ()),
+    ("user analytics", rollup_counts(SINCE, user_id=USER_ID),
+     "ix_emergency_daily_rollups_user_day", ()),
+    ("user analytics first day", rollup_counts(SINCE, user_id=USER_ID),
+     "ix_emergencies_user_created_id", ()),
+    ("admin analytics first day", rollup_counts(SINCE), "ix_emergencies_created_at", ()),
+    ("admin active users", active_users(SINCE), "ix_emergencies_created_at", ()),
+    ("volunteer index load", Volunteer.active_with_locations(),
+     "ix_volunteers_active_user", ("user_locations",)),
+    ("outbox due messages", NotificationOutbox.due_query(NOW, 50),
+     "ix_notification_outbox_due", ()),
+    ("location history range",
+     LocationTrack.range_query(USER_ID, int(SINCE.timestamp() * 1000), int(NOW.timestamp() * 1000), 3600 * 1000),
+     "ux_location_tracks_user_bucket", ()),
+    ("location history compaction",
+     LocationTrack.compaction_query(int(NOW.timestamp() * 1000) - 86400 * 1000, 3600 * 1000, 500),
+     "ix_location_tracks_unsimplified", ()),
+    ("latest location", select(UserLocation).where(UserLocation.user_id == USER_ID),
+     "ux_user_locations_user_id", ()),
+    ("wallet", select(Wallet).where(Wallet.user_id == USER_ID), "ux_wallets_user_id", ()),
+    ("payment replay",
+     select(Transaction).where(Transaction.user_id == USER_ID, Transaction.idempotency_key == "k"),
+     "ux_transactions_user_idempotency", ()),
+]
+
+async def insert_chunks(conn, table, rows, chunk=5000):
+    for start in range(0, len(rows), chunk):
+        await conn.execute(table.insert(), rows[start:start + chunk])
+
+async def seed(engine, session_factory):
+    rng = random.Random(1)
+    users = [f"user{i}" for i in range(USERS)]
+    async with engine.begin() as conn:
+        await run_migrations(conn)
+
+        emergency_ids = [str(uuid.uuid4()) for _ in range(EMERGENCIES)]
+        await insert_chunks(conn, Emergency.__table__, [
+            {
+                "id": emergency_id,
+                "user_id": rng.choice(users),
+                "detection_type": rng.choice(DETECTION_TYPES),
+                "is_confirmed": rng.random() < 0.3,
+                "created_at": NOW - timedelta(seconds=rng.uniform(0, 365 * 86400)),
+            }
+            for emergency_id in emergency_ids
+        ])
+        await insert_chunks(conn, UserLocation.__table__, [
+            {"id": str(uuid.uuid4()), "user_id": user_id, "latitude": "13.08", "longitude": "80.27",
+             "accuracy": "10", "timestamp": NOW}
+            for user_id in users
+        ])
+        await insert_chunks(conn, Volunteer.__table__, [
+            {"id": str(uuid.uuid4()), "user_id": user_id, "is_active": rng.random() < 0.2,
+             "qualifications": [], "availability": {}}
+            for user_id in rng.sample(users, len(users) // 2)
+        ])
+        await insert_chunks(conn, Wallet.__table__, [
+            {"id": str(uuid.uuid4()), "user_id": user_id, "balance_minor": 0} for user_id in users
+        ])
+        await insert_chunks(conn, NotificationOutbox.__table__, [
+            {"id": str(uuid.uuid4()), "channel": "sms", "recipient": f"+1555{i:07d}", "body": "EMERGENCY",
+             "emergency_id": rng.choice(emergency_ids), "dedup_key": str(uuid.uuid4()),
+             "status": "sent" if rng.random() < 0.98 else "pending", "attempts": 1,
+             "next_attempt_at": NOW - timedelta(seconds=rng.uniform(0, 30 * 86400))}
+            for i in range(EMERGENCIES // 4)
+        ])
+        await insert_chunks(conn, LocationTrack.__table__, [
+            {"id": str(uuid.uuid4()), "user_id": user_id,
+             "bucket_start_ms": int((NOW - timedelta(hours=h)).timestamp()) // 3600 * 3600000,
+             "point_count": 0, "simplified": h > 24, "latitudes": b"", "longitudes": b"", "time_deltas": b""}
+            for user_id in users[:USERS // 10] for h in range(48)
+        ])
+
+    async with session_factory() as db:
+        await backfill(db)
+
+    async with engine.begin() as conn:
+        await conn.exec_driver_sql("ANALYZE")
+
+async def explain(engine, stmt):
+    async with engine.connect() as conn:
+        compiled = stmt.compile(dialect=conn.dialect, compile_kwargs={"render_postcompile": True})
+        params = tuple(compiled.params[name] for name in compiled.positiontup)
+        rows = (await conn.exec_driver_sql(f"EXPLAIN QUERY PLAN {compiled}", params)).all()
+    return [row[-1] for row in rows]
+
+@pytest.fixture(scope="module")
+def plans(tmp_path_factory):
+    from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+    from sqlalchemy.orm import sessionmaker
+    from app.core.database import Base
+
+    engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path_factory.mktemp('plans')}/plans.db", future=True)
+
+    async def run():
+        async with engine.begin() as conn:
+            await conn.run_sync(Base.metadata.create_all)
+        await seed(engine, sessionmaker(engine, expire_on_commit=False, class_=AsyncSession))
+        try:
+            return {name: await explain(engine, stmt) for name, stmt, _, _ in HOT_QUERIES}
+        finally:
+            await engine.dispose()
+    return asyncio.run(run())
+
+@pytest.mark.parametrize(
+    "name, expected_index, allowed_scans",
+    [(name, index, scans) for name, _, index, scans in HOT_QUERIES],
+    ids=[query[0] for query in HOT_QUERIES]
+)
+def test_query_uses_index(plans, name, expected_index, allowed_scans):
+    plan = plans[name]
+    # Reading back a subquery's own rows is not a table scan
+    subqueries = {match.group(1) for match in (SUBQUERY.search(line.strip()) for line in plan) if match}
+    assert any(expected_index in line for line in plan), f"{name} does not use {expected_index}: {plan}"
+    full_scans = [
+        match.group(1) for match in (FULL_SCAN.search(line.strip()) for line in plan)
+        if match and match.group(1) not in allowed_scans and match.group(1) not in subqueries
+    ]
+    assert not full_scans, f"{name} scans {', '.join(full_scans)} in full: {plan}"
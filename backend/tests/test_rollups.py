@@ -0,0 +1,32 @@
+import asyncio
+from datetime import datetime, timedelta
+
+from app.core.rollups import active_users, check, rollup_counts, summarize_counts
+from app.models.emergency import Emergency
+
+def test_window_starts_at_since_not_at_midnight(session_factory):
+    # The rollup has whole days; the part of the first day before `since`
+    # must not be counted
+    since = datetime(2026, 3, 10, 15, 30)
+    created = {
+        "u1": [since - timedelta(hours=2), since + timedelta(minutes=5), since + timedelta(days=2)],
+        "u2": [since - timedelta(minutes=1)],
+        "u3": [since - timedelta(days=1)],
+    }
+
+    async def run():
+        async with session_factory() as db:
+            for user_id, timestamps in created.items():
+                for created_at in timestamps:
+                    db.add(Emergency(user_id=user_id, detection_type="manual", created_at=created_at))
+            await db.commit()
+            assert await check(db) == []
+            counts = summarize_counts((await db.execute(rollup_counts(since))).all())
+            user_counts = summarize_counts((await db.execute(rollup_counts(since, user_id="u1"))).all())
+            active = (await db.execute(active_users(since))).scalar()
+        return counts, user_counts, active
+
+    counts, user_counts, active = asyncio.run(run())
+    assert counts == {"total": 2, "confirmed": 0, "by_type": {"manual": 2}}
+    assert user_counts["total"] == 2
+    assert active == 1
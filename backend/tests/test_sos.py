@@ -0,0 +1,80 @@
+import asyncio
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from sqlalchemy import func, select
+
+from app.api import sos
+from app.core.database import get_db
+from app.core.notifications import NotificationService, FakeSMSProvider
+from app.core.security import create_access_token, principal_cache
+from app.models.emergency import Emergency
+from app.models.notification import NotificationOutbox
+from app.models.user import User
+
+def build_client(session_factory) -> TestClient:
+    app = FastAPI()
+    app.include_router(sos.router)
+
+    async def test_db():
+        async with session_factory() as session:
+            yield session
+    app.dependency_overrides[get_db] = test_db
+    return TestClient(app)
+
+def add_user(session_factory, email: str) -> str:
+    async def add():
+        async with session_factory() as db:
+            db.add(User(
+                email=email,
+                hashed_password="!",
+                full_name="Test User",
+                emergency_contacts=[{"name": "A", "phone": "+15550001"}, {"name": "B", "phone": "+15550002"}]
+            ))
+            await db.commit()
+    asyncio.run(add())
+    principal_cache.clear()
+    return create_access_token(data={"sub": email})
+
+def count(session_factory, column):
+    async def run():
+        async with session_factory() as db:
+            return (await db.execute(select(func.count(column)))).scalar()
+    return asyncio.run(run())
+
+def test_retried_sos_replays_the_first_emergency(session_factory):
+    token = add_user(session_factory, "sos@example.com")
+    client = build_client(session_factory)
+    headers = {"Authorization": f"Bearer {token}", "Idempotency-Key": "tap-1"}
+    body = {"location_lat": "1.0", "location_lng": "2.0"}
+
+    first = client.post("/sos/trigger", json=body, headers=headers).json()
+    retry = client.post("/sos/trigger", json=body, headers=headers).json()
+
+    assert first["replayed"] is False and retry["replayed"] is True
+    assert retry["emergency_id"] == first["emergency_id"]
+    assert first["notifications_sent"] == retry["notifications_sent"] == 2
+    assert count(session_factory, Emergency.id) == 1
+    assert count(session_factory, NotificationOutbox.id) == 2
+
+def test_sos_without_key_is_not_deduplicated(session_factory):
+    token = add_user(session_factory, "nokey@example.com")
+    client = build_client(session_factory)
+    headers = {"Authorization": f"Bearer {token}"}
+    body = {"location_lat": "1.0", "location_lng": "2.0"}
+
+    first = client.post("/sos/trigger", json=body, headers=headers).json()
+    second = client.post("/sos/trigger", json=body, headers=headers).json()
+
+    assert first["emergency_id"] != second["emergency_id"]
+    assert count(session_factory, NotificationOutbox.id) == 4
+
+def test_sms_provider_errors_reach_the_caller():
+    # The outbox records the exception as last_error rather than a bare False
+    service = NotificationService()
+    service.sms_provider = FakeSMSProvider(failure_rate=1.0)
+
+    with pytest.raises(RuntimeError, match="Simulated SMS provider failure"):
+        asyncio.run(service.send_sms("+15550001", "hi"))
+    assert asyncio.run(service.send_sms_many([("+15550001", "hi")])) == [False]
@@ -0,0 +1,74 @@
+import asyncio
+from datetime import datetime
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from app.api import volunteer
+from app.core.database import get_db
+from app.core.location_buffer import location_buffer
+from app.core.security import create_access_token, principal_cache
+from app.core.spatial_index import IndexedVolunteer, VolunteerIndex, volunteer_index
+from app.models.user import User
+from app.models.volunteer import Volunteer
+
+def test_refresh_keeps_changes_made_after_its_snapshot():
+    index = VolunteerIndex()
+    index.upsert("moved", 13.0, 80.0)
+    index.upsert("removed", 13.0, 80.0)
+
+    # The refresh reads the database, and meanwhile fixes and status changes
+    # arrive for some of the volunteers it is about to overwrite
+    since_version = index.version
+    snapshot = [
+        IndexedVolunteer("moved", 13.0, 80.0),
+        IndexedVolunteer("removed", 13.0, 80.0),
+        IndexedVolunteer("joined", 14.0, 81.0),
+    ]
+    index.move("moved", 20.0, 85.0)
+    index.remove("removed")
+    index.replace(snapshot, since_version=since_version)
+
+    assert (index.entries["moved"].latitude, index.entries["moved"].longitude) == (20.0, 85.0)
+    assert "removed" not in index
+    assert "joined" in index
+    assert [entry.user_id for _, entry in index.within(20.0, 85.0, 1.0)] == ["moved"]
+
+    # The next refresh reads a snapshot that includes those changes
+    index.replace([IndexedVolunteer("removed", 13.0, 80.0)], since_version=index.version)
+    assert sorted(index.entries) == ["removed"]
+
+def test_going_off_duty_leaves_the_index(session_factory):
+    app = FastAPI()
+    app.include_router(volunteer.router)
+
+    async def test_db():
+        async with session_factory() as session:
+            yield session
+    app.dependency_overrides[get_db] = test_db
+    client = TestClient(app)
+
+    async def add():
+        async with session_factory() as db:
+            user = User(email="vol@example.com", hashed_password="!")
+            db.add(user)
+            await db.flush()
+            db.add(Volunteer(user_id=user.id, is_active=True, qualifications=["first_aid"]))
+            await db.commit()
+            return user.id
+    user_id = asyncio.run(add())
+    principal_cache.clear()
+    headers = {"Authorization": f"Bearer {create_access_token(data={'sub': 'vol@example.com'})}"}
+    location_buffer.add(user_id, "13.08", "80.27", "5", datetime.utcnow())
+
+    try:
+        response = client.put("/volunteer/status", json={"is_active": True}, headers=headers)
+        assert response.status_code == 200
+        assert user_id in volunteer_index
+
+        response = client.put("/volunteer/status", json={"is_active": False}, headers=headers)
+        assert response.status_code == 200
+        assert user_id not in volunteer_index
+    finally:
+        location_buffer.pending.pop(user_id, None)
+        volunteer_index.remove(user_id)